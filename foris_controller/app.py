@@ -59,6 +59,8 @@ def set_app_info(program_options):
 
     app_info["mqtt_credentials"] = getattr(program_options, "passwd_file", None)
     app_info["mqtt_announcer_period"] = getattr(program_options, "announcer_period", None)
+    app_info["mqtt_workers"] = getattr(program_options, "workers", None)
+    app_info["mqtt_protocol"] = getattr(program_options, "protocol", None)
 
     app_info["zeroconf_devices"] = getattr(program_options, "zeroconf_devices", [])
     app_info["zeroconf_port"] = getattr(program_options, "zeroconf_port", 11884)
@@ -17,22 +17,26 @@
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
 #
 
+import hashlib
+import heapq
+import itertools
 import logging
 import json
 import uuid
 import os
-import re
 import socket
 import sys
 import threading
 import time
 import typing
 
+from concurrent.futures import ThreadPoolExecutor
 from importlib import metadata
 
 from paho import mqtt as mqtt_module
 from paho.mqtt import client as mqtt
-from paho.mqtt.publish import single
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
 from jsonschema import ValidationError
 
 from foris_controller.app import app_info
@@ -49,6 +53,10 @@ bus_info = {"bus_thread": None}
 
 ANNOUNCER_PERIOD_DEFAULT = 1.0  # in seconds
 CLEAR_RETAIN_PERIOD = 10.0  # in seconds
+REPLY_PUBLISH_TIMEOUT = 10.0  # in seconds
+WORKERS_DEFAULT = 16
+PROTOCOL_PROBE_TIMEOUT = 5.0  # in seconds
+PROTOCOLS = {"3.1.1": mqtt.MQTTv311, "5": mqtt.MQTTv5}
 
 
 def mqtt_client_extra():
@@ -60,6 +68,88 @@ def mqtt_client_extra():
         return {}
 
 
+def broker_supports_mqtt5(
+    host: str, port: int, credentials: typing.Optional[typing.Tuple[str, str]]
+) -> bool:
+    """ Tries to connect to the broker using MQTT v5 """
+    connected = threading.Event()
+    result = {}
+
+    def on_connect(client, userdata, flags, rc, properties=None):
+        result["rc"] = rc
+        connected.set()
+
+    def on_disconnect(client, userdata, rc, properties=None):
+        connected.set()
+
+    client = mqtt.Client(
+        client_id=f"{uuid.uuid4()}-controller-probe",
+        protocol=mqtt.MQTTv5,
+        **mqtt_client_extra(),
+    )
+    client.on_connect = on_connect
+    client.on_disconnect = on_disconnect
+    if credentials:
+        client.username_pw_set(*credentials)
+    deadline = time.monotonic() + PROTOCOL_PROBE_TIMEOUT
+    try:
+        client.connect(host, port, keepalive=30)
+        while not connected.is_set() and time.monotonic() < deadline:
+            if client.loop(timeout=0.1) != mqtt.MQTT_ERR_SUCCESS:
+                break
+    except Exception as exc:
+        # MQTT v3.1.1 brokers may reply with CONNACK which can't be parsed
+        logger.debug("MQTT v5 connection failed: %r", exc)
+        return False
+    finally:
+        client.disconnect()
+    return result.get("rc") == 0
+
+
+def get_protocol(host: str, port: int, credentials: typing.Optional[typing.Tuple[str, str]]):
+    """ Returns MQTT protocol version which will be used to communicate with the broker
+
+    MQTT v5 is used when it is supported by the broker unless the version is set explicitly.
+    """
+    protocol = app_info.get("mqtt_protocol") or "auto"
+    if protocol != "auto":
+        return PROTOCOLS[protocol]
+    if broker_supports_mqtt5(host, port, credentials):
+        return mqtt.MQTTv5
+    logger.info("Broker doesn't support MQTT v5, falling back to MQTT v3.1.1.")
+    return mqtt.MQTTv311
+
+
+def response_target(
+    msg: mqtt.MQTTMessage,
+) -> typing.Tuple[typing.Optional[str], typing.Optional[Properties]]:
+    """ Reads MQTT v5 Response Topic and Correlation Data from the request
+
+    :returns: (response topic, properties of the reply) or (None, None) when the request
+              doesn't contain Response Topic (i.e. MQTT v3.1.1 client)
+    """
+    response_topic = getattr(msg.properties, "ResponseTopic", None)
+    if not response_topic:
+        return None, None
+
+    properties = Properties(PacketTypes.PUBLISH)
+    correlation_data = getattr(msg.properties, "CorrelationData", None)
+    if correlation_data is not None:
+        properties.CorrelationData = correlation_data
+    return response_topic, properties
+
+
+def reply_options(properties: typing.Optional[Properties]) -> dict:
+    """ Returns publish() arguments of a reply
+
+    MQTT v5 replies (with properties) are sent non-retained using qos=1,
+    other replies are retained till they are cleared.
+    """
+    if properties is None:
+        return {"qos": 0, "retain": True}
+    return {"qos": 1, "retain": False, "properties": properties}
+
+
 class EntryPointAnnouncer:
     def __init__(self, period: int, callback: typing.Callable[[], typing.Optional[dict]]):
         self.callback = callback
@@ -129,7 +219,7 @@ def _publish(client: mqtt.Client, msg: dict):
 def _publish_advertize(
     client: mqtt.Client,
     adv_base: AdvertizementBase,
-    working_replies: typing.Dict[str, typing.Tuple[threading.Thread, float]],
+    working_replies: typing.Dict[str, float],
     working_replies_lock: threading.Lock,
 ):
     data = adv_base.build()
@@ -198,20 +288,350 @@ def announcer_worker(host, port, working_replies, working_replies_lock):
     client.loop_stop()
 
 
+class MqttReplyPublisher:
+    """ Long-lived connection which is used to publish replies from worker threads
+
+    Connection is handled in a separate network thread which reconnects when the connection
+    is lost (e.g. due to fosquitto restart).
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        credentials: typing.Optional[typing.Tuple[str, str]],
+        protocol: int = mqtt.MQTTv311,
+    ):
+        self.connected = threading.Event()
+
+        def on_connect(client, userdata, flags, rc, properties=None):
+            if rc == 0:
+                logger.debug("Reply publisher connected.")
+                # small packets of qos=2 flow would be delayed by Nagle's algorithm
+                client.socket().setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self.connected.set()
+            else:
+                logger.error("Reply publisher failed to connect (rc=%s).", rc)
+
+        def on_disconnect(client, userdata, rc, properties=None):
+            logger.debug("Reply publisher disconnected (rc=%s).", rc)
+            self.connected.clear()
+
+        session = {} if protocol == mqtt.MQTTv5 else {"clean_session": True}
+        self.client = mqtt.Client(
+            client_id=f"{uuid.uuid4()}-controller-reply",
+            protocol=protocol,
+            **session,
+            **mqtt_client_extra(),
+        )
+        self.client.on_connect = on_connect
+        self.client.on_disconnect = on_disconnect
+        if credentials:
+            self.client.username_pw_set(*credentials)
+        self.client.reconnect_delay_set(min_delay=1, max_delay=5)
+        self.client.connect_async(host, port, keepalive=30)
+        self.client.loop_start()
+
+    def publish(
+        self,
+        topic: str,
+        payload: str,
+        qos: int,
+        retain: bool,
+        timeout: float = REPLY_PUBLISH_TIMEOUT,
+        properties: typing.Optional[Properties] = None,
+    ):
+        """ Publishes the message and waits till it is sent
+
+        :raises ConnectionError: when the message was not sent within the timeout
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not self.connected.wait(deadline - time.monotonic()):
+                break
+            info = self.client.publish(
+                topic, payload, qos=qos, retain=retain, properties=properties
+            )
+            if qos > 0 and info.rc == mqtt.MQTT_ERR_NO_CONN:
+                # the message is queued in the client and it is sent after reconnect
+                info.rc = mqtt.MQTT_ERR_SUCCESS
+            if info.rc == mqtt.MQTT_ERR_SUCCESS:
+                try:
+                    info.wait_for_publish(max(deadline - time.monotonic(), 0))
+                except RuntimeError:
+                    pass  # qos=0 message was discarded due to disconnect
+                else:
+                    if info.is_published():
+                        return
+                    # the client keeps resending the message (e.g. after reconnect)
+                    # publishing it again would lead to duplicate replies
+                    break
+            # retry in case the connection was interrupted (due to fosquitto restart)
+            logger.warning("Publishing to '%s' failed (resending)", topic)
+            time.sleep(0.3)
+
+        raise ConnectionError(f"Failed to publish message to '{topic}'")
+
+    def disconnect(self):
+        self.client.disconnect()
+        self.client.loop_stop()
+
+
+class WorkerPool:
+    """ Bounded pool of threads which process the requests
+
+    Requests which exceed the number of workers are queued.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="worker")
+        self._lock = threading.Lock()
+        self._stats = {
+            "busy": 0,
+            "queued": 0,
+            "queued_max": 0,
+            "submitted": 0,
+            "completed": 0,
+            "wait_total": 0.0,
+            "wait_max": 0.0,
+        }
+
+    def submit(self, func: typing.Callable[[], None]):
+        submitted = time.monotonic()
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._stats["queued"] += 1
+            self._stats["queued_max"] = max(self._stats["queued_max"], self._stats["queued"])
+
+        def run():
+            waited = time.monotonic() - submitted
+            with self._lock:
+                self._stats["queued"] -= 1
+                self._stats["busy"] += 1
+                self._stats["wait_total"] += waited
+                self._stats["wait_max"] = max(self._stats["wait_max"], waited)
+            try:
+                func()
+            except Exception:
+                logger.exception("Worker failed.")
+            finally:
+                with self._lock:
+                    self._stats["busy"] -= 1
+                    self._stats["completed"] += 1
+
+        self._executor.submit(run)
+
+    def stats(self) -> dict:
+        """ Returns the number of busy workers, queue depth and wait times """
+        with self._lock:
+            return dict(self._stats, size=self.size)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+class RetainClearer:
+    """ Clears retained replies after a period in a single scheduler thread
+    """
+
+    def __init__(
+        self,
+        publisher: MqttReplyPublisher,
+        period: float,
+        cleared: typing.Callable[[str], None],
+    ):
+        """
+        :param publisher: used to publish the empty retained messages
+        :param period: how long the reply stays retained (in seconds)
+        :param cleared: called with reply_id when the reply is cleared
+        """
+        self.publisher = publisher
+        self.period = period
+        self.cleared = cleared
+        self._cond = threading.Condition()
+        self._heap: typing.List[typing.Tuple[float, int, str, str]] = []
+        self._sequence = itertools.count()
+        self._thread = threading.Thread(name="retain_clearer", target=self._loop, daemon=True)
+        self._thread.start()
+
+    def schedule(self, reply_topic: str, reply_id: str):
+        with self._cond:
+            deadline = time.monotonic() + self.period
+            heapq.heappush(self._heap, (deadline, next(self._sequence), reply_topic, reply_id))
+            self._cond.notify()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def flush(self, timeout: float = REPLY_PUBLISH_TIMEOUT):
+        """ Clears all pending retained replies immediately
+
+        :param timeout: overall time limit (remaining replies are not cleared when it expires)
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            entries, self._heap = self._heap, []
+        for _, _, reply_topic, reply_id in sorted(entries):
+            remaining = deadline - time.monotonic()
+            if remaining > 0 and self.publisher.connected.is_set():
+                self._clear(reply_topic, reply_id, remaining)
+            else:
+                logger.error("Failed to clear retained messages '%s'", reply_topic)
+                self.cleared(reply_id)
+
+    def _clear(self, reply_topic: str, reply_id: str, timeout: float = REPLY_PUBLISH_TIMEOUT):
+        logger.debug("Clearing retained messages '%s'", reply_topic)
+        try:
+            self.publisher.publish(reply_topic, "", qos=2, retain=True, timeout=timeout)
+            logger.debug("Retained messages '%s' should be cleared", reply_topic)
+        except ConnectionError:
+            logger.error("Failed to clear retained messages '%s'", reply_topic)
+        self.cleared(reply_id)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                delay = self._heap[0][0] - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                _, _, reply_topic, reply_id = heapq.heappop(self._heap)
+            self._clear(reply_topic, reply_id)
+
+
+class Endpoint(typing.NamedTuple):
+    """ Handler of messages received on a topic
+
+    `respond` is called with the parsed payload and with the values of the topic wildcards
+    and it returns the response. When `in_worker` is set, it is called in the worker pool.
+    """
+
+    respond: typing.Callable[..., typing.Any]
+    in_worker: bool = False
+
+
+class TopicDispatcher:
+    """ Maps topics of the incoming messages to endpoints
+
+    Fixed topics are looked up in a dict, the request topics are split on '/'
+    (foris-controller/<id>/request/<module>/list and
+    foris-controller/<id>/request/<module>/action/<action>).
+    """
+
+    def __init__(self, controller_id: str):
+        self.prefix = f"foris-controller/{controller_id}/"
+        self.request_prefix = f"{self.prefix}request/"
+        self.exact: typing.Dict[str, Endpoint] = {}
+        self.module_endpoints: typing.Dict[str, Endpoint] = {}
+        self.action_endpoint: typing.Optional[Endpoint] = None
+
+    def add(self, name: str, endpoint: Endpoint):
+        """ Registers an endpoint for foris-controller/<id>/<name> """
+        self.exact[self.prefix + name] = endpoint
+
+    def add_module_endpoint(self, name: str, endpoint: Endpoint):
+        """ Registers an endpoint for foris-controller/<id>/request/<module>/<name> """
+        self.module_endpoints[name] = endpoint
+
+    def set_action_endpoint(self, endpoint: Endpoint):
+        """ Registers an endpoint for foris-controller/<id>/request/<module>/action/<action> """
+        self.action_endpoint = endpoint
+
+    def topics(self) -> typing.List[str]:
+        """ Returns the topics which are supposed to be subscribed """
+        res = list(self.exact.keys())
+        res += [f"{self.request_prefix}+/{name}" for name in self.module_endpoints]
+        if self.action_endpoint:
+            res.append(f"{self.request_prefix}+/action/+")
+        return res
+
+    def resolve(
+        self, topic: str
+    ) -> typing.Tuple[typing.Optional[Endpoint], typing.Tuple[str, ...]]:
+        """ Finds the endpoint of the topic
+
+        :returns: (endpoint, values of the topic wildcards) or (None, ()) when not found
+        """
+        endpoint = self.exact.get(topic)
+        if endpoint:
+            return endpoint, ()
+
+        if not topic.startswith(self.request_prefix):
+            return None, ()
+        parts = topic[len(self.request_prefix):].split("/")
+        if not all(parts):
+            return None, ()
+        if len(parts) == 2 and parts[1] in self.module_endpoints:
+            return self.module_endpoints[parts[1]], (parts[0],)
+        if len(parts) == 3 and parts[1] == "action" and self.action_endpoint:
+            return self.action_endpoint, (parts[0], parts[2])
+        return None, ()
+
+
+class SerializedReply:
+    """ Reply which is serialized only once and identified by a hash of its content
+
+    Clients which send "hash" in the request obtain {"hash": ..., "data": ...}
+    or {"hash": ..., "not_modified": true} when the hash matches the content.
+    Other clients obtain the data only.
+    """
+
+    def __init__(self, data: typing.Any):
+        self.raw = json.dumps(data).encode()
+        self.hash = hashlib.sha256(self.raw).hexdigest()
+        self.raw_with_hash = b'{"hash": "%s", "data": %s}' % (self.hash.encode(), self.raw)
+        self.raw_not_modified = b'{"hash": "%s", "not_modified": true}' % self.hash.encode()
+
+    def reply(self, parsed: dict) -> bytes:
+        if "hash" not in parsed:
+            return self.raw
+        if parsed["hash"] == self.hash:
+            return self.raw_not_modified
+        return self.raw_with_hash
+
+
+class ModuleRegistry:
+    """ Modules, their actions and schemas which are listed via MQTT
+
+    Modules can't change while running, so it is computed once at startup.
+    """
+
+    def __init__(self, modules: typing.Iterable[typing.Tuple[str, typing.Any]], schema: list):
+        """
+        :param modules: list of (module_name, module)
+        :param schema: list of all json schemas
+        """
+        listing = [
+            {"name": module_name, "actions": get_method_names_from_module(module) or []}
+            for module_name, module in modules
+        ]
+        self.modules = SerializedReply(listing)
+        self.actions = {e["name"]: SerializedReply(e["actions"]) for e in listing}
+        self.no_actions = SerializedReply([])
+        self.schema = SerializedReply(schema)
+
+    def list_actions(self, module_name: str) -> SerializedReply:
+        return self.actions.get(module_name, self.no_actions)
+
+
 class MqttListener(BaseSocketListener):
     router = Router()
     subscriptions: typing.Dict[int, bool] = {}
 
     @staticmethod
-    def handle_on_connect(client, userdata, flags, rc):
+    def handle_on_connect(client, userdata, flags, rc, properties=None):
         if rc != 0:
-            logger.error("Failed to connect to the message bus (rc=%d).", rc)
+            logger.error("Failed to connect to the message bus (rc=%s).", rc)
             sys.exit(1)  # can't connect to bus -> exitting
 
         logger.debug(
-            "Connected to mqtt server. (client='%s', userdata='%s', flags='%s', rc='%s')",
+            "Connected to mqtt server. (client='%s', flags='%s', rc='%s')",
             client,
-            userdata,
             flags,
             rc,
         )
@@ -227,29 +647,9 @@ class MqttListener(BaseSocketListener):
             check_subscription(rc, mid, topic)
             logger.debug("Subscribing to '%s'." % topic)
 
-        # subscription for listing modules
-        subscribe(f"foris-controller/{app_info['controller_id']}/list")
-
-        # subscription for listing working replies
-        subscribe(f"foris-controller/{app_info['controller_id']}/working_replies")
-
-        # subscription for obtaining the entire schema
-        subscribe(f"foris-controller/{app_info['controller_id']}/jsonschemas")
-
-        # subscription for listing module actions
-        subscribe(f"foris-controller/{app_info['controller_id']}/request/+/list")
-
-        # listen to all requests for my node
-        subscribe(f"foris-controller/{app_info['controller_id']}/request/+/action/+")
-
-    @staticmethod
-    def list_modules():
-        res = []
-        for module_name, module in get_modules(
-            app_info["filter_modules"], app_info["extra_module_paths"]
-        ):
-            res.append({"name": module_name, "actions": get_method_names_from_module(module) or []})
-        return res
+        # userdata is the dispatcher of the listener
+        for topic in userdata.topics():
+            subscribe(topic)
 
     @staticmethod
     def get_schema():
@@ -258,104 +658,130 @@ class MqttListener(BaseSocketListener):
         ]
 
     @staticmethod
-    def list_actions(module_name):
-        modules_dict = dict(get_modules(app_info["filter_modules"], app_info["extra_module_paths"]))
-        return get_method_names_from_module(modules_dict.get(module_name)) or []
+    def load_registry() -> ModuleRegistry:
+        return ModuleRegistry(
+            get_modules(app_info["filter_modules"], app_info["extra_module_paths"]),
+            MqttListener.get_schema(),
+        )
+
+    @property
+    def registry(self) -> ModuleRegistry:
+        # the modules and the validator are prepared after the listener is created
+        # (see prepare_app_modules()), so the registry is built on the first request
+        with self._registry_lock:
+            if self._registry is None:
+                self._registry = MqttListener.load_registry()
+            return self._registry
 
     def list_working_replies(self):
         with self.working_replies_lock:
             return [e for e in self.working_replies.keys()]
 
-    def start_message_worker(self, reply_topic: str, reply_id: str, msg: dict):
+    def get_worker_stats(self):
+        return dict(self.workers.stats(), retained_replies=self.retain_clearer.pending())
+
+    def _unmark_working_reply(self, reply_id: str):
+        with self.working_replies_lock:
+            self.working_replies.pop(reply_id, None)
+
+    @staticmethod
+    def process_action(parsed: dict, module_name: str, action_name: str):
+        msg = {"module": module_name, "kind": "request", "action": action_name}
+        if "data" in parsed:
+            msg["data"] = parsed["data"]
+        return MqttListener.router.process_message(msg)
+
+    def _make_dispatcher(self) -> TopicDispatcher:
+        dispatcher = TopicDispatcher(app_info["controller_id"])
+        # listing modules
+        dispatcher.add("list", Endpoint(lambda parsed: self.registry.modules.reply(parsed)))
+        # listing working replies
+        dispatcher.add("working_replies", Endpoint(lambda parsed: self.list_working_replies()))
+        # obtaining worker pool statistics
+        dispatcher.add("worker_stats", Endpoint(lambda parsed: self.get_worker_stats()))
+        # obtaining the entire schema
+        dispatcher.add("jsonschemas", Endpoint(lambda parsed: self.registry.schema.reply(parsed)))
+        # listing module actions
+        dispatcher.add_module_endpoint(
+            "list",
+            Endpoint(
+                lambda parsed, module_name: self.registry.list_actions(module_name).reply(parsed)
+            ),
+        )
+        # all requests for my node
+        dispatcher.set_action_endpoint(Endpoint(MqttListener.process_action, in_worker=True))
+        return dispatcher
+
+    def start_message_worker(
+        self,
+        reply_topic: str,
+        reply_id: str,
+        respond: typing.Callable[[], typing.Any],
+        properties: typing.Optional[Properties] = None,
+    ):
         """ Performs the work and sends the reply
         :param reply_topic: where the reply is supposed to be send
         :param reply_id: id of reply
-        :param msg: message to be processed
+        :param respond: performs the work and returns the reply
+        :param properties: MQTT v5 properties of the reply (retained reply is sent when None)
         """
-        auth: typing.Optional[typing.Dict[str, str]] = None
-        if app_info.get("mqtt_credentials", None) and app_info["mqtt_credentials"]:
-            auth = {
-                "username": app_info["mqtt_credentials"][0],
-                "password": app_info["mqtt_credentials"][1],
-            }
+
+        # mark reply_id as working reply
+        # (retained reply stays marked till it is cleared)
+        with self.working_replies_lock:
+            self.working_replies[reply_id] = time.monotonic()
 
         def work():
-            # mark reply_id as working reply
-            with self.working_replies_lock:
-                self.working_replies[reply_id] = (threading.current_thread(), time.monotonic())
-
-            response = MqttListener.router.process_message(msg)
-            raw_response = json.dumps(response)
-            kwargs = dict(
-                payload=raw_response,
-                qos=0,
-                retain=True,
-                hostname=self.host,
-                port=self.port,
-                auth=auth,
-            )
-            logger.debug("Publishing response '%s' to '%s'", response, reply_topic)
             try:
-                single(reply_topic, **kwargs)
-            except ConnectionRefusedError:
-                # retry in case the connection was interrupted (due to fosquitto restart)
-                logger.warning("Publishing response to '%s' failed (resending)", reply_topic)
-                time.sleep(0.3)
-                try:
-                    single(reply_topic, **kwargs)
-                except ConnectionAbortedError:
-                    logger.error(
-                        "Publishing response to '%s' failed (failed - message not sent))",
-                        reply_topic,
-                    )
-                    raise
+                response = respond()
+                raw_response = json.dumps(response)
+                logger.debug("Publishing response '%s' to '%s'", response, reply_topic)
+                self.reply_publisher.publish(
+                    reply_topic, raw_response, **reply_options(properties)
+                )
+            except ConnectionError:
+                logger.error(
+                    "Publishing response to '%s' failed (failed - message not sent))",
+                    reply_topic,
+                )
+                self._unmark_working_reply(reply_id)
+                raise
+            except Exception:
+                self._unmark_working_reply(reply_id)
+                raise
             logger.debug("Reply '%s' published.", reply_id)
 
-            # clear retains
-            time.sleep(CLEAR_RETAIN_PERIOD)
-            logger.debug("Clearing retained messages '%s'", reply_topic)
-            single(
-                reply_topic,
-                payload="",
-                qos=2,
-                retain=True,
-                hostname=self.host,
-                port=self.port,
-                auth=auth,
-            )
-            logger.debug("Retained messages '%s' should be cleared", reply_topic)
+            if properties is None:
+                # clear retains later
+                self.retain_clearer.schedule(reply_topic, reply_id)
+            else:
+                self._unmark_working_reply(reply_id)
 
-            # unmark reply_id as working reply
-            with self.working_replies_lock:
-                try:
-                    del self.working_replies[reply_id]
-                except KeyError:
-                    pass
-                # perform a cleanup
-                # (if corresponding thread is not alive and retain period was reached)
-                ids_to_delete = [
-                    k
-                    for k, v in self.working_replies.items()
-                    if not v[0].is_alive() and time.monotonic() - v[1] > CLEAR_RETAIN_PERIOD
-                ]
-                for del_id in ids_to_delete:
-                    del self.working_replies[del_id]
-
-        thread = threading.Thread(target=work, name=f"worker-{reply_id}", daemon=False)
-        thread.start()
+        self.workers.submit(work)
 
     def __init__(self, host: str, port: int):
         self.announcer_thread_running: bool = False
         self.mqtt_client_id: str = f"{uuid.uuid4()}-controller-request"
         self.host: str = host
         self.port: int = port
-        self.working_replies: typing.Set[typing.Dict[str, threading.Thread]] = dict()
+        self.working_replies: typing.Dict[str, float] = dict()
         self.working_replies_lock: threading.Lock = threading.Lock()
+        self.protocol = get_protocol(host, port, app_info["mqtt_credentials"])
+        self.reply_publisher = MqttReplyPublisher(
+            host, port, app_info["mqtt_credentials"], self.protocol
+        )
+        self.workers = WorkerPool(app_info.get("mqtt_workers") or WORKERS_DEFAULT)
+        self.retain_clearer = RetainClearer(
+            self.reply_publisher, CLEAR_RETAIN_PERIOD, self._unmark_working_reply
+        )
+        self._registry: typing.Optional[ModuleRegistry] = None
+        self._registry_lock = threading.Lock()
+        self.dispatcher = self._make_dispatcher()
 
         def on_publish(client, userdata, mid):
             logger.debug("Mid %s is published", mid)
 
-        def on_subscribe(client, userdata, mid, granted_qos):
+        def on_subscribe(client, userdata, mid, granted_qos, properties=None):
             MqttListener.subscriptions[mid] = True
             logger.debug("Subscribed to %d", mid)
             if not [e for e in MqttListener.subscriptions.values() if not e]:
@@ -379,84 +805,91 @@ class MqttListener(BaseSocketListener):
 
         def on_message(client, userdata, msg):
             logger.debug(
-                "Msg recieved. (client='%s', userdata='%s', topic='%s', payload='%s')",
+                "Msg recieved. (client='%s', topic='%s', payload='%s')",
                 client,
-                userdata,
                 msg.topic,
                 msg.payload,
             )
 
+            endpoint, topic_args = self.dispatcher.resolve(msg.topic)
+            if not endpoint:
+                # This should not happen
+                logger.error("Don't know how to respond.")
+                return
+
             try:
                 parsed = json.loads(msg.payload)
             except ValueError:
                 logger.warning("Payload is not a JSON (msg.payload='%s')", msg.payload)
                 return  # message in wrong format
+            if not isinstance(parsed, dict):
+                logger.warning("Payload is not a JSON object (msg.payload='%s')", msg.payload)
+                return  # message in wrong format
 
-            if "reply_msg_id" not in parsed:
+            # MQTT v5 clients set the Response Topic, others wait for a retained reply
+            reply_topic, reply_properties = response_target(msg)
+            if reply_topic:
+                reply_id = parsed.get("reply_msg_id") or str(uuid.uuid4())
+            elif "reply_msg_id" not in parsed:
                 logger.warning("Missing mandatory reply_msg_id (data='%s')", parsed)
                 return  # missing reply msg_id
-            reply_topic = (
-                f"foris-controller/{app_info['controller_id']}/reply/{parsed['reply_msg_id']}"
-            )
-
-            response = None
-
-            # parse topic
-            match = re.match(r"^foris-controller/[^/]+/list$", msg.topic)
-            if match:
-                response = MqttListener.list_modules()
-
-            match = re.match(r"^foris-controller/[^/]+/jsonschemas$", msg.topic)
-            if match:
-                response = MqttListener.get_schema()
-
-            match = re.match(r"^foris-controller/[^/]+/request/([^/]+)/list$", msg.topic)
-            if match:
-                module_name = match.group(1)
-                response = MqttListener.list_actions(module_name)
-
-            match = re.match(r"^foris-controller/[^/]+/working_replies$", msg.topic)
-            if match:
-                response = self.list_working_replies()
-
-            match = re.match(r"^foris-controller/[^/]+/request/([^/]+)/action/([^/]+)$", msg.topic)
-            if match:
-                module_name, action_name = match.group(1, 2)
-                msg = {"module": module_name, "kind": "request", "action": action_name}
-                if "data" in parsed:
-                    msg["data"] = parsed["data"]
-                self.start_message_worker(reply_topic, parsed["reply_msg_id"], msg)
-                return  # reply will be performed elsewhere
+            else:
+                reply_id = parsed["reply_msg_id"]
+                reply_topic = f"{self.dispatcher.prefix}reply/{reply_id}"
 
-            if response is not None:
-                raw_response = json.dumps(response)
-                mqtt_message = client.publish(reply_topic, raw_response, qos=0, retain=True)
-                logger.debug(
-                    "Publishing message (mid=%s) for %s: %s",
-                    mqtt_message.mid,
+            if endpoint.in_worker:
+                self.start_message_worker(
                     reply_topic,
-                    response,
+                    reply_id,
+                    lambda: endpoint.respond(parsed, *topic_args),
+                    reply_properties,
                 )
+                return  # reply will be performed elsewhere
 
-            else:
-                # This should not happen
-                logger.error("Don't know how to respond.")
+            response = endpoint.respond(parsed, *topic_args)
+            # registry listings are already serialized
+            raw_response = response if isinstance(response, bytes) else json.dumps(response)
+            mqtt_message = client.publish(
+                reply_topic, raw_response, **reply_options(reply_properties)
+            )
+            logger.debug(
+                "Publishing message (mid=%s) for %s: %s",
+                mqtt_message.mid,
+                reply_topic,
+                response,
+            )
 
+        if self.protocol == mqtt.MQTTv5:
+            # keep the session as clean_session=False does in MQTT v3.1.1
+            session = {}
+            connect_properties = Properties(PacketTypes.CONNECT)
+            connect_properties.SessionExpiryInterval = 0xFFFFFFFF
+            connect_options = {"clean_start": False, "properties": connect_properties}
+        else:
+            session = {"clean_session": False}
+            connect_options = {}
         self.client = mqtt.Client(
             client_id=self.mqtt_client_id,
-            clean_session=False,
+            protocol=self.protocol,
+            **session,
             **mqtt_client_extra(),
         )
+        self.client.user_data_set(self.dispatcher)
         self.client.on_connect = MqttListener.handle_on_connect
         self.client.on_message = on_message
         self.client.on_subscribe = on_subscribe
         self.client.on_publish = on_publish
         if app_info["mqtt_credentials"]:
             self.client.username_pw_set(*app_info["mqtt_credentials"])
-        self.client.connect(host, port, keepalive=30)
+        self.client.connect(host, port, keepalive=30, **connect_options)
 
     def serve_forever(self):
-        self.client.loop_forever()
+        try:
+            self.client.loop_forever()
+        finally:
+            self.workers.shutdown()
+            self.retain_clearer.flush()
+            self.reply_publisher.disconnect()
 
 
 class MqttNotificationSender(BaseNotificationSender):
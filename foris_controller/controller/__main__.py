@@ -33,7 +33,7 @@ from foris_controller.app import (
     prepare_app_modules,
     prepare_notification_sender,
 )
-from foris_controller.utils import LOGGER_MAX_LEN, read_passwd_file
+from foris_controller.utils import LOGGER_MAX_LEN, read_passwd_file, strtobool
 
 try:
     __import__("foris_client.buses")
@@ -97,7 +97,11 @@ def main():
         )
 
     if "mqtt" in available_buses:
-        from foris_controller.buses.mqtt import ANNOUNCER_PERIOD_DEFAULT
+        from foris_controller.buses.mqtt import (
+            ANNOUNCER_PERIOD_DEFAULT,
+            PROTOCOLS,
+            WORKERS_DEFAULT,
+        )
 
         mqtt_parser = subparsers.add_parser("mqtt", help="use mqtt recieve commands")
         mqtt_parser.add_argument("--host", default="127.0.0.1")
@@ -120,6 +124,19 @@ def main():
             "(in seconds, when set to 0 no announcments will be sent)",
             default=os.environ.get("FC_MQTT_ANNOUNCER_PERIOD", ANNOUNCER_PERIOD_DEFAULT),
         )
+        mqtt_parser.add_argument(
+            "--workers",
+            type=int,
+            help="Max number of requests which are processed at once "
+            "(other requests are queued)",
+            default=int(os.environ.get("FC_MQTT_WORKERS", WORKERS_DEFAULT)),
+        )
+        mqtt_parser.add_argument(
+            "--protocol",
+            choices=["auto", *PROTOCOLS.keys()],
+            help="MQTT protocol version (auto - MQTT v5 is used when the broker supports it)",
+            default=os.environ.get("FC_MQTT_PROTOCOL", "auto"),
+        )
         if zeroconf:
             mqtt_parser.add_argument(
                 "--zeroconf-enabled",
@@ -168,6 +185,13 @@ def main():
         help="set extra path to module (e.g. /path/module_name)",
         required=False,
     )
+    parser.add_argument(
+        "--command-launcher",
+        action="store_true",
+        default=strtobool(os.environ.get("FC_COMMAND_LAUNCHER", "0")),
+        help="spawn external commands using a separate small launcher process",
+        required=False,
+    )
     if client_modules_loaded:
         parser.add_argument(
             "-C",
@@ -199,6 +223,13 @@ def main():
 
     logger.debug("Version %s" % __version__)
     logger.info("Foris controller is starting.")
+
+    launcher = None
+    if options.command_launcher:
+        # should be started before any worker process is forked
+        from foris_controller.launcher import Launcher
+
+        launcher = Launcher.start()
     if options.bus == "ubus":
         from foris_controller.buses.ubus import UbusListener, UbusNotificationSender
 
@@ -229,6 +260,10 @@ def main():
 
         logger.info("Using OpenWRT config backend.")
         prepare_app_modules(BaseOpenwrtHandler, [e[0] for e in options.extra_module_path])
+
+        from foris_controller_backends.uci import UciBackend
+
+        UciBackend.purge_changes_dirs()
     elif options.backend == "mock":
         from foris_controller.handler_base import BaseMockHandler
 
@@ -307,6 +342,12 @@ def main():
         if zeroconf and options.zeroconf_enabled:
             # Gracefully unregisters service from zconf
             zconf_service.close()
+        if launcher:
+            launcher.stop()
+        # async commands watched from threads of this process
+        from foris_controller_backends.cmdline import AsyncCommand
+
+        AsyncCommand.kill_children()
 
 
 if __name__ == "__main__":
@@ -80,6 +80,19 @@ class UciException(ForisControllerError):
         super(UciException, self).__init__("%s: command failed (%s)" % (cmdline_args, stderr))
 
 
+class UciUndeclaredConfig(ForisControllerError):
+    def __init__(self, configs):
+        """ exception which is raised when a config which was not declared at the beginning
+        of the uci transaction can't be locked without breaking the locking order
+
+        :param configs: configs which were required
+        :type configs: list of str
+        """
+        super(UciUndeclaredConfig, self).__init__(
+            "Uci configs %s were not declared in the transaction" % configs
+        )
+
+
 class UciTypeException(ForisControllerError):
     def __init__(self, value, required_types):
         """ exception which is raised when a values are incorrectly parsed from uci
@@ -0,0 +1,370 @@
+#
+# foris-controller
+# Copyright (C) 2026 CZ.NIC, z.s.p.o. (http://www.nic.cz/)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+#
+
+""" Execution of external commands
+
+Commands are spawned directly from the current process or (when started) using a small
+launcher process. The launcher receives requests over a socketpair so that the large
+controller processes don't have to spawn the commands themselves.
+"""
+
+import errno
+import json
+import logging
+import os
+import selectors
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class CommandEnvironment(object):
+    """ Environment passed to the commands
+
+    The environment of the process is copied only when it changes
+    and per-command overrides are merged into it.
+    """
+
+    _base = None
+
+    @staticmethod
+    def get(overrides=None, environ=None):
+        """
+        :param overrides: variables which should be set for the command
+        :type overrides: dict
+        :param environ: environment which should be used instead of the one of this process
+        :type environ: dict
+        :rtype: dict
+        """
+        if environ is not None:
+            base = {os.fsencode(k): os.fsencode(v) for k, v in environ.items()}
+        else:
+            base = CommandEnvironment._base
+            if base is None or base != os.environb:
+                base = CommandEnvironment._base = dict(os.environb)
+        if not overrides:
+            return base
+        env = dict(base)
+        env.update((os.fsencode(k), os.fsencode(v)) for k, v in overrides.items())
+        return env
+
+
+# signals which are ignored in python and should be set to default in commands
+_DEFAULT_SIGNALS = tuple(
+    getattr(signal, e) for e in ("SIGPIPE", "SIGXFZ", "SIGXFSZ") if hasattr(signal, e)
+)
+
+
+def _read_available(fd, output):
+    os.set_blocking(fd, False)
+    try:
+        while True:
+            data = os.read(fd, 65536)
+            if not data:
+                break
+            output.append(data)
+    except BlockingIOError:
+        pass
+
+
+def _communicate(pid, stdin_fd, stdout_fd, stderr_fd, input_data):
+    """ Reads outputs of the process and waits till it exits
+
+    Note that reading is finished when the process exits even if the pipes are still opened
+    (e.g. a daemon started by an init script inherits them).
+    """
+    outputs = {stdout_fd: [], stderr_fd: []}
+    selector = selectors.DefaultSelector()
+    for fd in outputs:
+        selector.register(fd, selectors.EVENT_READ)
+
+    if stdin_fd is not None:
+        input_view = memoryview(input_data)
+        os.set_blocking(stdin_fd, False)
+        selector.register(stdin_fd, selectors.EVENT_WRITE)
+
+    try:
+        pidfd = os.pidfd_open(pid)
+        selector.register(pidfd, selectors.EVENT_READ)
+    except (AttributeError, OSError):
+        pidfd = None  # not supported -> poll
+
+    status = None
+    try:
+        while status is None:
+            exited = pidfd is None
+            for key, _ in selector.select(None if pidfd is not None else 0.05):
+                if key.fd == pidfd:
+                    exited = True
+                elif key.fd == stdin_fd:
+                    try:
+                        written = os.write(stdin_fd, input_view[:65536])
+                        input_view = input_view[written:]
+                    except BrokenPipeError:
+                        input_view = input_view[:0]
+                    if not input_view:
+                        selector.unregister(stdin_fd)
+                        os.close(stdin_fd)
+                        stdin_fd = None
+                elif key.fd in outputs:
+                    data = os.read(key.fd, 65536)
+                    if data:
+                        outputs[key.fd].append(data)
+                    else:
+                        selector.unregister(key.fd)
+
+            if exited:
+                waited_pid, wait_status = os.waitpid(pid, os.WNOHANG)
+                if waited_pid:
+                    status = wait_status
+
+        # process exited -> read what is left in the pipes
+        for fd, output in outputs.items():
+            _read_available(fd, output)
+    finally:
+        selector.close()
+        for fd in (stdin_fd, stdout_fd, stderr_fd, pidfd):
+            if fd is not None:
+                os.close(fd)
+        if status is None:
+            _, status = os.waitpid(pid, 0)
+
+    return os.waitstatus_to_exitcode(status), b"".join(outputs[stdout_fd]), b"".join(
+        outputs[stderr_fd]
+    )
+
+
+def run_command(args, env=None, input_data=None, environ=None):
+    """ Executes the command in this process and waits till it's finished
+
+    :param args: cmd and its arguments
+    :param env: environment variables which should be set for the command
+    :param input_data: data passed to the stdin of the command
+    :param environ: environment used instead of the environment of this process
+    :returns: (retcode, stdout, stderr)
+    :rtype: (int, bytes, bytes)
+    """
+    env = CommandEnvironment.get(env, environ)
+    stdout_read, stdout_write = os.pipe()
+    stderr_read, stderr_write = os.pipe()
+    file_actions = [
+        (os.POSIX_SPAWN_DUP2, stdout_write, 1),
+        (os.POSIX_SPAWN_DUP2, stderr_write, 2),
+    ]
+    stdin_read = stdin_write = None
+    if input_data is not None:
+        stdin_read, stdin_write = os.pipe()
+        file_actions.append((os.POSIX_SPAWN_DUP2, stdin_read, 0))
+
+    try:
+        # posix_spawn uses vfork-like approach so the memory of the controller is not copied
+        pid = os.posix_spawnp(
+            args[0], args, env, file_actions=file_actions, setsigdef=_DEFAULT_SIGNALS
+        )
+    except BaseException:
+        for fd in (stdout_read, stderr_read, stdin_write):
+            if fd is not None:
+                os.close(fd)
+        raise
+    finally:
+        for fd in (stdout_write, stderr_write, stdin_read):
+            if fd is not None:
+                os.close(fd)
+
+    return _communicate(pid, stdin_write, stdout_read, stderr_read, input_data)
+
+
+class LauncherError(Exception):
+    """ Communication with the launcher failed """
+
+
+def _send_message(sock, header, *payloads):
+    header = json.dumps(header).encode()
+    sock.sendall(struct.pack("!I", len(header)) + header)
+    for payload in payloads:
+        if payload:
+            sock.sendall(payload)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        data = sock.recv(min(size, 1 << 20))
+        if not data:
+            raise LauncherError("Connection closed")
+        chunks.append(data)
+        size -= len(data)
+    return b"".join(chunks)
+
+
+def _recv_message(sock):
+    (size,) = struct.unpack("!I", _recv_exact(sock, 4))
+    return json.loads(_recv_exact(sock, size))
+
+
+class Launcher(object):
+    """ Client of the launcher process """
+
+    instance = None
+
+    def __init__(self, control, process, environ):
+        self.control = control
+        self.process = process
+        self.environ = environ  # environment which the launcher was started with
+
+    @staticmethod
+    def start():
+        """ Starts the launcher process
+
+        It should be called early (before worker processes are started) so that all the
+        processes can share it.
+        """
+        control, remote = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        environ = dict(os.environ)
+        with remote:
+            process = subprocess.Popen(
+                # only standard library is required so the module is executed as a script
+                [sys.executable, "-I", os.path.abspath(__file__), str(remote.fileno())],
+                pass_fds=[remote.fileno()],
+                env=environ,
+            )
+        Launcher.instance = Launcher(control, process, environ)
+        logger.debug("Command launcher started (pid=%d)." % process.pid)
+        return Launcher.instance
+
+    def stop(self):
+        """ Stops the launcher (it exits when no process holds the control socket) """
+        if Launcher.instance is self:
+            Launcher.instance = None
+        self.control.close()
+        self.process.wait()
+
+    def run(self, args, env=None, input_data=None):
+        """ Executes the command via the launcher
+
+        :raises LauncherError: when the request was not delivered to the launcher
+                               (the command was not started)
+        :raises OSError: when the command failed to start or when the reply was lost
+                         (the command might have been executed)
+        """
+        local, remote = socket.socketpair()
+        with local:
+            try:
+                with remote:
+                    socket.send_fds(self.control, [b"r"], [remote.fileno()])
+                _send_message(
+                    local,
+                    {
+                        "args": list(args),
+                        "env": env,
+                        # environment of the controller is sent only when it was changed
+                        "environ": None if self.environ == os.environ else dict(os.environ),
+                        "input": None if input_data is None else len(input_data),
+                    },
+                    *([input_data] if input_data else []),
+                )
+            except (OSError, ValueError) as e:
+                raise LauncherError(str(e))
+
+            # the command might have been executed already so it can't be started again
+            try:
+                reply = _recv_message(local)
+                if "errno" not in reply:
+                    return (
+                        reply["retval"],
+                        _recv_exact(local, reply["stdout"]),
+                        _recv_exact(local, reply["stderr"]),
+                    )
+            except (OSError, ValueError, KeyError, struct.error, LauncherError) as e:
+                raise OSError(errno.EIO, f"Reply of the command launcher was lost ({e})")
+
+        raise OSError(reply["errno"], reply["strerror"], reply["filename"])
+
+
+def execute(args, env=None, input_data=None):
+    """ Executes the command using the launcher if it's running (locally otherwise)
+
+    The command is executed locally only when the request was not delivered to the launcher.
+
+    :returns: (retcode, stdout, stderr)
+    :rtype: (int, bytes, bytes)
+    """
+    launcher = Launcher.instance
+    if launcher:
+        try:
+            return launcher.run(args, env, input_data)
+        except LauncherError as e:
+            logger.warning("Command launcher failed (%s). Spawning commands directly." % e)
+            Launcher.instance = None
+    return run_command(args, env, input_data)
+
+
+def _handle_request(connection):
+    with connection:
+        try:
+            request = _recv_message(connection)
+            input_data = None
+            if request["input"] is not None:
+                input_data = _recv_exact(connection, request["input"])
+            try:
+                retval, stdout, stderr = run_command(
+                    request["args"], request["env"], input_data, request["environ"]
+                )
+            except OSError as e:
+                _send_message(
+                    connection,
+                    {"errno": e.errno, "strerror": e.strerror, "filename": e.filename},
+                )
+                return
+            _send_message(
+                connection,
+                {"retval": retval, "stdout": len(stdout), "stderr": len(stderr)},
+                stdout,
+                stderr,
+            )
+        except (ConnectionError, LauncherError, ValueError) as e:
+            logger.warning("Failed to handle launcher request (%s)." % e)
+
+
+def serve(control):
+    """ Main loop of the launcher process
+
+    It ends when all the controller processes close the control socket.
+    """
+    # spawned commands shouldn't keep the launcher alive
+    control.set_inheritable(False)
+    flags = getattr(socket, "MSG_CMSG_CLOEXEC", 0)
+    while True:
+        _, fds, _, _ = socket.recv_fds(control, 1, 1, flags)
+        if not fds:
+            break
+        os.set_inheritable(fds[0], False)
+        connection = socket.socket(fileno=fds[0])
+        threading.Thread(target=_handle_request, args=(connection,), daemon=True).start()
+
+
+if __name__ == "__main__":
+    # terminal signals are handled by the controller
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    serve(socket.socket(fileno=int(sys.argv[1])))
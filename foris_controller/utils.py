@@ -25,6 +25,8 @@ import pkgutil
 import re
 import signal
 import sys
+import threading
+import time
 import typing
 from functools import wraps
 from multiprocessing.managers import SyncManager
@@ -39,6 +41,13 @@ ListOrString = typing.NewType('ListOrString', typing.Union[str, typing.List[str]
 LOGGER_MAX_LEN = 10000
 
 
+class _Counter(object):
+    """ Mimics multiprocessing.Value for threading based locks """
+
+    def __init__(self):
+        self.value = 0
+
+
 class RWLock(object):
     """ Custom implementation of RWLock
         it can use lock for Processes as well as lock for threads
@@ -54,11 +63,20 @@ class RWLock(object):
         def __exit__(self, *args, **kwargs):
             self.release()
 
-        def acquire(self):
-            with self.parent._new_readers:
+        def acquire(self, blocking=True):
+            """
+            :param blocking: when False return immediately if the lock can't be obtained
+            :returns: True if the lock was obtained
+            """
+            if not self.parent._new_readers.acquire(blocking):
+                return False
+            try:
                 with self.parent._counter_lock:
                     self.parent._counter += 1
                     self.parent._counter_lock.notify()
+            finally:
+                self.parent._new_readers.release()
+            return True
 
         def release(self):
             with self.parent._counter_lock:
@@ -75,12 +93,24 @@ class RWLock(object):
         def __exit__(self, *args, **kwargs):
             self.release()
 
-        def acquire(self):
-            self.parent._writer_lock.acquire()
-            self.parent._new_readers.acquire()
+        def acquire(self, blocking=True):
+            """
+            :param blocking: when False return immediately if the lock can't be obtained
+            :returns: True if the lock was obtained
+            """
+            if not self.parent._writer_lock.acquire(blocking):
+                return False
+            if not self.parent._new_readers.acquire(blocking):
+                self.parent._writer_lock.release()
+                return False
             with self.parent._counter_lock:
+                if not blocking and self.parent._counter != 0:
+                    self.parent._new_readers.release()
+                    self.parent._writer_lock.release()
+                    return False
                 while self.parent._counter != 0:
                     self.parent._counter_lock.wait()
+            return True
 
         def release(self):
             self.parent._new_readers.release()
@@ -91,13 +121,24 @@ class RWLock(object):
 
         :param lock_module: module which is used as locking backend - multiprocessing/threading
         """
-        self._counter = 0
+        # reader counter has to be shared among processes as well
+        self._readers = (
+            lock_module.Value("i", 0, lock=False) if hasattr(lock_module, "Value") else _Counter()
+        )
         self._writer_lock = lock_module.Lock()
         self._new_readers = lock_module.Lock()
         self._counter_lock = lock_module.Condition(lock_module.Lock())
         self.readlock = RWLock.ReadLock(self)
         self.writelock = RWLock.WriteLock(self)
 
+    @property
+    def _counter(self):
+        return self._readers.value
+
+    @_counter.setter
+    def _counter(self, value):
+        self._readers.value = value
+
 
 def logger_wrapper(logger):
     """ Wraps funcion with some debug outputs of the logger
@@ -165,6 +206,69 @@ def writelock(lock, logger):
     return outer
 
 
+def cached(ttl=None, final=None):
+    """ Caches results of a backend method and makes sure that concurrent callers
+        with the same arguments wait for a single execution
+
+        Results are keyed by the call arguments (`self` is ignored). Exceptions
+        are not cached. The wrapped function gets an `invalidate()` attribute
+        which drops all cached results.
+
+    :param ttl: how long (in seconds) is the result valid (None = forever)
+    :type ttl: float or None
+    :param final: predicate which marks a result as valid forever regardless of ttl
+    :type final: callable or None
+    """
+
+    def outer(func):
+        lock = threading.Lock()
+        results = {}
+        running = {}
+        generation = [0]
+
+        @wraps(func)
+        def inner(*args, **kwargs):
+            key = (args[1:], tuple(sorted(kwargs.items())))
+            while True:
+                with lock:
+                    if key in results:
+                        expires, value = results[key]
+                        if expires is None or expires > time.monotonic():
+                            return value
+                        del results[key]
+                    done = running.get(key)
+                    if done is None:
+                        done = running[key] = threading.Event()
+                        started = generation[0]
+                        break
+                # another caller is performing the call
+                done.wait()
+
+            try:
+                value = func(*args, **kwargs)
+                with lock:
+                    if started == generation[0]:
+                        if ttl is None or (final and final(value)):
+                            results[key] = (None, value)
+                        else:
+                            results[key] = (time.monotonic() + ttl, value)
+                return value
+            finally:
+                with lock:
+                    del running[key]
+                done.set()
+
+        def invalidate():
+            with lock:
+                generation[0] += 1
+                results.clear()
+
+        inner.invalidate = invalidate
+        return inner
+
+    return outer
+
+
 def get_modules(filter_modules, module_paths=[]):
     """ Returns a list of modules that can be used
 
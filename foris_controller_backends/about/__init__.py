@@ -23,7 +23,7 @@ import typing
 from foris_controller.app import app_info
 from foris_controller.exceptions import FailedToParseFileContent
 from foris_controller.updater import svupdater_branch
-from foris_controller.utils import RWLock, readlock, writelock
+from foris_controller.utils import RWLock, cached, readlock, writelock
 from foris_controller_backends.cmdline import BaseCmdLine, i2c_lock
 from foris_controller_backends.files import BaseFile, server_uplink_lock
 
@@ -31,6 +31,7 @@ logger = logging.getLogger(__name__)
 
 
 class CryptoWrapperCmds(BaseCmdLine):
+    @cached()
     @writelock(i2c_lock, logger)
     def get_serial(self):
         """ Obrains serial number
@@ -44,6 +45,7 @@ class CryptoWrapperCmds(BaseCmdLine):
 
 
 class SystemInfoCmds(BaseCmdLine):
+    @cached()
     def get_kernel_version(self):
         """ Obtains kernel version
 
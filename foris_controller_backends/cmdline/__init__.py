@@ -17,6 +17,9 @@
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
 #
 
+import atexit
+import heapq
+import itertools
 import json
 import logging
 import multiprocessing
@@ -27,13 +30,14 @@ import re
 import signal
 import subprocess
 import threading
+import time
 
-from tempfile import TemporaryFile
-from collections import OrderedDict
+from collections import OrderedDict, deque
 
+from foris_controller import launcher
 from foris_controller.app import app_info
 from foris_controller.exceptions import BackendCommandFailed, FailedToParseCommandOutput
-from foris_controller.utils import RWLock, make_multiprocessing_manager
+from foris_controller.utils import RWLock
 
 
 logger = logging.getLogger(__name__)
@@ -57,34 +61,206 @@ def inject_cmdline_root(path):
     return path
 
 
-def handle_command(*args, **kwargs):
-    with TemporaryFile() as stdout, TemporaryFile() as stderr:
-        popen_kwargs = {}
-        input_data = kwargs.pop("input_data", None)
+class CommandGovernor(object):
+    """ Limits the number of external commands which are running at once in this process
+
+    Commands which exceed the limit are queued. Queued commands with a lower priority
+    number are started first, commands with the same priority are started in FIFO order.
+
+    Note that the limit is per process and it doesn't bound the whole system (e.g. each
+    module runs in a separate process on ubus bus). Only commands started via handle_command()
+    are counted, commands started in background and async commands are not.
+    """
+
+    INTERACTIVE = 0  # reads which somebody is waiting for
+    DEFAULT = 1
+    BACKGROUND = 2  # service restarts, reloads, ...
+
+    PRIORITY_NAMES = {INTERACTIVE: "interactive", DEFAULT: "default", BACKGROUND: "background"}
+
+    def __init__(self, limit=None):
+        """
+        :param limit: max number of commands running in this process (FC_PROCESS_COMMAND_LIMIT
+                      env variable is used when not set, twice the number of CPUs by default),
+                      <= 0 means no limit
+        """
+        if limit is None:
+            limit = int(os.environ.get("FC_PROCESS_COMMAND_LIMIT", 2 * (os.cpu_count() or 1)))
+        self.limit = limit
+        self._reset()
+        # commands of the parent process are not running in the child process
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._cond = threading.Condition()
+        self._running = 0
+        self._queue = []  # heap of (priority, sequence)
+        self._sequence = itertools.count()
+        self._stats = {
+            priority: {"executed": 0, "queued": 0, "wait_total": 0.0, "wait_max": 0.0}
+            for priority in self.PRIORITY_NAMES
+        }
+
+    def acquire(self, priority=DEFAULT):
+        """ Waits till the command can be started
+
+        :param priority: priority of the command
+        :type priority: int
+        :returns: time spent in the queue in seconds
+        :rtype: float
+        """
+        stats = self._stats[priority]
+        with self._cond:
+            if self.limit <= 0 or (self._running < self.limit and not self._queue):
+                self._running += 1
+                stats["executed"] += 1
+                return 0.0
+
+            entry = (priority, next(self._sequence))
+            heapq.heappush(self._queue, entry)
+            stats["queued"] += 1
+            start = time.monotonic()
+            self._cond.wait_for(
+                lambda: self._running < self.limit and self._queue[0] == entry
+            )
+            heapq.heappop(self._queue)
+            self._running += 1
+            waited = time.monotonic() - start
+            stats["queued"] -= 1
+            stats["executed"] += 1
+            stats["wait_total"] += waited
+            stats["wait_max"] = max(stats["wait_max"], waited)
+            # there might be more free slots for the following commands
+            self._cond.notify_all()
+            return waited
+
+    def release(self):
+        """ Marks that a command started via acquire() finished """
+        with self._cond:
+            self._running -= 1
+            self._cond.notify_all()
+
+    def stats(self, reset=False):
+        """ Returns current queue state and wait times per priority
+
+        :param reset: reset the counters and wait times after they are read
+        :type reset: bool
+        :rtype: dict
+        """
+        with self._cond:
+            res = {
+                "limit": self.limit,
+                "running": self._running,
+                "queued": len(self._queue),
+                "priorities": {
+                    name: dict(self._stats[priority])
+                    for priority, name in self.PRIORITY_NAMES.items()
+                },
+            }
+            if reset:
+                for stats in self._stats.values():
+                    stats.update({"executed": 0, "wait_total": 0.0, "wait_max": 0.0})
+            return res
+
+
+class CommandStats(object):
+    """ Aggregates execution metrics of external commands per executable
+    """
 
-        popen_kwargs["stderr"] = stderr
-        popen_kwargs["stdout"] = stdout
-        if input_data is not None:
-            popen_kwargs["stdin"] = subprocess.PIPE
+    SAMPLES = 256  # number of recent durations used to compute percentiles
 
-        # update env
-        env = dict(os.environ)
-        cmd_env = kwargs.get("env", {})
-        env.update(cmd_env)
-        popen_kwargs["env"] = env
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._commands = {}
+
+    def record(self, command, duration, stdout_bytes, failed):
+        """ Records a single command execution
+
+        :param command: executable (as it was passed to handle_command)
+        :type command: str
+        :param duration: how long the command was running in seconds
+        :type duration: float
+        :param stdout_bytes: size of the stdout
+        :type stdout_bytes: int
+        :param failed: the command couldn't be started or returned non-zero retval
+        :type failed: bool
+        """
+        with self._lock:
+            stats = self._commands.get(command)
+            if stats is None:
+                stats = self._commands[command] = {
+                    "count": 0,
+                    "failures": 0,
+                    "duration_total": 0.0,
+                    "duration_max": 0.0,
+                    "stdout_bytes": 0,
+                    "samples": deque(maxlen=self.SAMPLES),
+                }
+            stats["count"] += 1
+            stats["failures"] += failed
+            stats["duration_total"] += duration
+            stats["duration_max"] = max(stats["duration_max"], duration)
+            stats["stdout_bytes"] += stdout_bytes
+            stats["samples"].append(duration)
+
+    @staticmethod
+    def _percentile(samples, percent):
+        return samples[min(len(samples) - 1, len(samples) * percent // 100)]
+
+    def stats(self, reset=False):
+        """ Returns aggregated metrics sorted by the total duration
+
+        :param reset: drop all metrics after they are read
+        :type reset: bool
+        :rtype: list of dict
+        """
+        with self._lock:
+            commands = self._commands
+            if reset:
+                self._commands = {}
+            else:
+                commands = {k: dict(v, samples=list(v["samples"])) for k, v in commands.items()}
 
-        process = subprocess.Popen(args, **popen_kwargs)
+        res = []
+        for command, stats in commands.items():
+            samples = sorted(stats.pop("samples"))
+            stats["command"] = command
+            for percent in (50, 90, 99):
+                stats["duration_p%d" % percent] = self._percentile(samples, percent)
+            res.append(stats)
+        return sorted(res, key=lambda e: e["duration_total"], reverse=True)
 
-        if input_data:
-            process.communicate(input_data)
-        else:
-            process.communicate()
 
-        stdout.seek(0)
-        stdout = stdout.read()
-        stderr.seek(0)
-        stderr = stderr.read()
-    return process.returncode, stdout, stderr
+governor = CommandGovernor()
+command_stats = CommandStats()
+
+
+def handle_command(*args, **kwargs):
+    """ Executes the command and waits till it's finished
+
+    The command is started via the launcher process when it is running. Number of commands
+    running at once in this process is limited by the governor and execution metrics are
+    recorded to command_stats.
+
+    :param args: cmd and its arguments
+    :param input_data: data passed to the stdin of the command
+    :type input_data: bytes
+    :param env: environment variables which should be set for the command
+    :type env: dict
+    :param priority: priority of the command when it has to be queued (CommandGovernor.*)
+    :type priority: int
+    :returns: (retcode, stdout, stderr)
+    :rtype: (int, bytes, bytes)
+    """
+    governor.acquire(kwargs.get("priority", CommandGovernor.DEFAULT))
+    start = time.monotonic()
+    retval, stdout = None, b""
+    try:
+        retval, stdout, stderr = launcher.execute(args, kwargs.get("env"), kwargs.get("input_data"))
+        return retval, stdout, stderr
+    finally:
+        governor.release()
+        command_stats.record(args[0], time.monotonic() - start, len(stdout), retval != 0)
 
 
 class BaseCmdLine(object):
@@ -110,6 +286,7 @@ class BaseCmdLine(object):
 
         :param args: cmd and its arguments
         :type args: tuple
+        :param kwargs: passed to handle_command() (input_data, env, priority)
 
         :returns: (retcode, stdout, stderr)
         :rtype: (int, str, str)
@@ -177,44 +354,110 @@ class BaseCmdLine(object):
 
 
 class AsyncProcessData(object):
-    def __init__(self, manager):
+    def __init__(self):
         """ Initializes async process data instance.
-        Note that these data will be shared between two processes using shared memory
 
-        :param manager: multiprocessing manager
-        :type manager: multiprocessing.managers.SyncManager
+        The data are kept in the process which started the command. The worker process
+        streams its events (data records, exit) to the parent via a pipe
+        (see `open_channel()` and `apply_event()`).
         """
-        self.lock = manager.Lock()
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
         self.id = "%016x" % random.randrange(2 ** 64)
-        self._data = manager.list()
-        self._retval = manager.Value(int, 0)
-        self._exited = manager.Value(bool, False)
+        self.key = None
+        self._data = []
+        self._retval = 0
+        self._exited = False
+        self._channel = None
+
+    def open_channel(self, channel):
+        """ Forward all following changes to the other side of the channel
+        (should be called in the worker process)
+
+        :param channel: writable end of the pipe
+        :type channel: multiprocessing.connection.Connection
+        """
+        # the lock might have been held by another thread during fork()
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self._channel = channel
+
+    def _send_event(self, *event):
+        if self._channel:
+            self._channel.send_bytes(json.dumps(event).encode())
+
+    def apply_event(self, message):
+        """ Applies an event received from the worker process
+
+        :param message: encoded event
+        :type message: bytes
+        :returns: event kind
+        :rtype: str
+        """
+        kind, *args = json.loads(message)
+        if kind == "data":
+            with self.lock:
+                self._data.append(args[0])
+                self.changed.notify_all()
+        elif kind == "exit":
+            with self.lock:
+                self._retval = args[0]
+                self._exited = True
+                self.changed.notify_all()
+        return kind
+
+    def wait_for_change(self, offset=0, timeout=None):
+        """ Waits till there are some records after the offset or the process exits
+
+        :param offset: number of records which were already read
+        :type offset: int
+        :param timeout: max time to wait in seconds (None = no limit)
+        :type timeout: float or None
+        :returns: False if the timeout expired
+        :rtype: bool
+        """
+        with self.lock:
+            return self.changed.wait_for(
+                lambda: len(self._data) > offset or self._exited, timeout
+            )
+
+    def read_data(self, offset=0):
+        """ Reads data which were stored by the process starting from the offset
+
+        :param offset: number of records which were already read
+        :type offset: int
+        :returns: (records, offset of the next record)
+        :rtype: (list, int)
+        """
+        with self.lock:
+            return self._data[offset:], len(self._data)
 
     def read_all_data(self):
         """ Reads and returns all data which were stored by the process
         :returns: process data
-        :rtype: dict
+        :rtype: list
         """
-        with self.lock:
-            return [json.loads(e) for e in self._data]
+        return self.read_data()[0]
 
     def append_data(self, record):
         """ Appends a record to process data
-        :returns: process data
-        :rtype: dict
+        :param record: json serializable record
+        :type record: dict
         """
-
+        # records are stored in the same form as they are seen by the other side
+        encoded = json.dumps(record)
         with self.lock:
-            # data needed to be stored in string
-            # (shared memory migth be inconsistent when more complex types are used)
-            self._data.append(json.dumps(record))
+            self._data.append(json.loads(encoded))
+            self.changed.notify_all()
+        if self._channel:
+            self._channel.send_bytes(('["data", %s]' % encoded).encode())
 
     def set_retval(self, retval):
         """ Set the return value of the process
         :param retval: process return value
         :type retval: int
         """
-        self._retval.set(retval)
+        self._retval = retval
 
     def get_retval(self):
         """ Returns the return value of the process.
@@ -222,33 +465,59 @@ class AsyncProcessData(object):
         :returns: retval of the process
         :rtype: int
         """
-        return self._retval.get()
+        return self._retval
 
     def set_exited(self):
         """ Sets the the process exited
         """
-        self._exited.set(True)
+        with self.lock:
+            self._exited = True
+            self.changed.notify_all()
+        self._send_event("exit", self._retval)
 
     def get_exited(self):
         """ returns whether the process exited
         :returns: True if process exited False if the process is still running
         :rtype: bool
         """
-        return self._exited.get()
+        return self._exited
 
 
 class AsyncCommand(object):
     PROCESS_BUFFER = 20
+    # buses which require the command to be watched from a separate process
+    PROCESS_BUSES = ["ubus"]
 
-    manager = make_multiprocessing_manager()
+    # commands watched from threads of this process (they are killed when it exits)
+    _children = set()
+    _children_lock = threading.Lock()
 
     def __init__(self):
         self.lock = RWLock(app_info["lock_backend"])
         self.processes = OrderedDict()
 
     @staticmethod
-    def _command_worker(args, reset_notify, handler_list, handler_exit, process_data, ready):
-        """ Watch over an external command
+    def _reset_children():
+        AsyncCommand._children = set()
+        AsyncCommand._children_lock = threading.Lock()
+
+    @staticmethod
+    def kill_children():
+        """ Kills the commands (and their process groups) which are watched from threads """
+        with AsyncCommand._children_lock:
+            children = list(AsyncCommand._children)
+        for process in children:
+            logger.debug("Killing async command (pid=%d)." % process.pid)
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    @staticmethod
+    def _watch_command(
+        args, handler_list, handler_exit, process_data, started=None, kill_with_parent=True
+    ):
+        """ Runs an external command and processes its output
 
         :param args: arguments of the external commands
         :type args: list[str]
@@ -256,17 +525,17 @@ class AsyncCommand(object):
         :type handler_list: list[tuple]
         :param handler_exit: handler which is called when process finishes - handler(process_data)
         :type handler_exit: callable
-        :param reset_notify: function which is call to reset notification connection
-        :type reset_notify: callable
-        :param process_data: place where the data between the worker and the parent process
-                             are shared
+        :param process_data: place where the data of the process are stored
         :type process_data: AsyncProcessData
-        :param ready: event synchronization with parent process
-                      (tells parent process that it may continue)
+        :param started: called once the command is started
+        :type started: callable
+        :param kill_with_parent: kill the command when the calling thread dies (requires
+                                 preexec_fn which is unsafe in multithreaded programs),
+                                 otherwise the command is started in a new session and it
+                                 is killed by kill_children()
+        :type kill_with_parent: bool
         """
 
-        logger.debug("Async process started.")
-
         # args[0] should be the script path
         args = list(args)
         args[0] = inject_cmdline_root(args[0])
@@ -274,32 +543,41 @@ class AsyncCommand(object):
         # precompile regexes
         handler_list = [(re.compile(regex), handler) for regex, handler in handler_list]
 
-        # exit when parent thread dies
-        prctl.set_pdeathsig(signal.SIGKILL)
-
-        # we are in another process so it might be necessary to repopen the connection
-        if reset_notify:
-            reset_notify()
-
-        # the parent may continue
-        ready.set()
-
         logger.debug("Starting monitored process: %s" % args)
 
+        # for python programs this will force that stdout/stderr are flushed immediatelly
+        env = dict(os.environ, PYTHONUNBUFFERED="1")
+
         def preexec():
             # make sure that program dies when parent is terminated
             prctl.set_pdeathsig(signal.SIGKILL)
-            # for python programs this will force that stdout/stderr are flushed immediatelly
-            os.environ["PYTHONUNBUFFERED"] = "1"
-
-        process = subprocess.Popen(
-            args,
-            preexec_fn=preexec,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            close_fds=True,
-            universal_newlines=True,
-        )
+
+        try:
+            if kill_with_parent:
+                process = subprocess.Popen(
+                    args,
+                    env=env,
+                    preexec_fn=preexec,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    close_fds=True,
+                    universal_newlines=True,
+                )
+            else:
+                with AsyncCommand._children_lock:
+                    process = subprocess.Popen(
+                        args,
+                        env=env,
+                        start_new_session=True,  # process group can be killed at once
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.STDOUT,
+                        close_fds=True,
+                        universal_newlines=True,
+                    )
+                    AsyncCommand._children.add(process)
+        finally:
+            if started:
+                started()
 
         def process_output_line() -> bool:
             line = process.stdout.readline()
@@ -317,23 +595,107 @@ class AsyncCommand(object):
 
             return True
 
-        while process.poll() is None:
-            process_output_line()
+        try:
+            while process.poll() is None:
+                process_output_line()
 
-        while process_output_line():  # program ended, but there ca be some output left
-            pass
+            while process_output_line():  # program ended, but there ca be some output left
+                pass
+        finally:
+            with AsyncCommand._children_lock:
+                AsyncCommand._children.discard(process)
 
         process_data.set_retval(process.returncode)
         process_data.set_exited()
         if handler_exit:
             handler_exit(process_data)
+
+    @staticmethod
+    def _command_worker(args, reset_notify, handler_list, handler_exit, process_data, channel):
+        """ Watch over an external command in a separate process
+
+        :param args: arguments of the external commands
+        :type args: list[str]
+        :param handler_list: list of tuples [(regex, handler(matched, process_data)), ...]
+        :type handler_list: list[tuple]
+        :param handler_exit: handler which is called when process finishes - handler(process_data)
+        :type handler_exit: callable
+        :param reset_notify: function which is call to reset notification connection
+        :type reset_notify: callable
+        :param process_data: place where the data of the process are stored
+        :type process_data: AsyncProcessData
+        :param channel: pipe used to stream process events to the parent process
+                        (the first event tells parent process that it may continue)
+        :type channel: multiprocessing.connection.Connection
+        """
+
+        logger.debug("Async process started.")
+
+        # exit when parent thread dies
+        prctl.set_pdeathsig(signal.SIGKILL)
+
+        # we are in another process so it might be necessary to repopen the connection
+        if reset_notify:
+            reset_notify()
+
+        # the parent may continue
+        process_data.open_channel(channel)
+        process_data._send_event("ready")
+
+        AsyncCommand._watch_command(args, handler_list, handler_exit, process_data)
         logger.debug("Async process finished.")
 
-    def start_process(self, args, handler_list, handler_exit, reset_notify_function):
-        """ Starts a thread which starts a process which monitors external command.
+    def get_process_data(self, process_id):
+        """ Returns data of the process
+        :param process_id: process identifier
+        :type process_id: str
+        :returns: process data or None if the process is not found
+        :rtype: AsyncProcessData or None
+        """
+        with self.lock.readlock:
+            return self.processes.get(process_id)
+
+    def _store_process_data(self, process_data, key=None):
+        """ Stores process data to the buffer
+
+        :param process_data: data of the new process
+        :type process_data: AsyncProcessData
+        :param key: single-flight key of the process
+        :type key: tuple or None
+        :returns: data of a running process with the same key if there is any
+        :rtype: AsyncProcessData or None
+        """
+        with self.lock.writelock:
+            if key is not None:
+                for running in self.processes.values():
+                    if running.key == key and not running.get_exited():
+                        return running
+                process_data.key = key
+
+            # test whether there is still space in buffer and remove midd
+            while len(self.processes) >= self.PROCESS_BUFFER:
+                self.processes.popitem(False)
+            self.processes[process_data.id] = process_data
+
+        return None
+
+    @classmethod
+    def _use_threads(cls):
+        """ Whether the command can be watched from a thread of this process
+        :returns: True if a thread is sufficient, False if a separate process is required
+        :rtype: bool
+        """
+        return app_info.get("bus") not in cls.PROCESS_BUSES
 
-        A new process is started because ubus doesn't allow you to listen and send notification
-        at once.
+    def start_process(
+        self, args, handler_list, handler_exit, reset_notify_function, single_flight=False
+    ):
+        """ Starts a thread which monitors external command.
+
+        When ubus is used a new process which monitors the command is started from the thread,
+        because ubus doesn't allow you to listen and send notification at once.
+        Other buses watch the command directly from the thread and reset_notify_function
+        is not called (the connection is shared with the rest of the process).
 
         :param args: arguments of the external commands
         :type args: list[str]
@@ -343,14 +705,25 @@ class AsyncCommand(object):
         :type handler_exit: callable
         :param reset_notify_function: function which is call to reset notification connection
         :type reset_notify_function: callable
+        :param single_flight: when a command with the same arguments is already running
+                              no new command is started and the identifier of the running one
+                              is returned (its notifications are sent to all clients anyway)
+        :type single_flight: bool
 
         :returns: A new process identifier
         :rtype: str
         """
 
-        new_data_process = AsyncProcessData(self.manager)
+        new_data_process = AsyncProcessData()
         process_started = threading.Event()
 
+        running = self._store_process_data(
+            new_data_process, tuple(args) if single_flight else None
+        )
+        if running:
+            logger.debug("Attaching to a running async command '%s'." % running.id)
+            return running.id
+
         # process is started in another thread
         # prctl kills the child process when parent thread dies
         # and this code might be called from some handler thread which dies
@@ -361,9 +734,8 @@ class AsyncCommand(object):
 
             logger = logging.getLogger(__name__)
 
-            # Prepare ready event to wait for the process to be initialized
-            ready = multiprocessing.Event()
-            ready.clear()
+            # events of the worker are streamed via pipe
+            reader, writer = multiprocessing.Pipe(duplex=False)
 
             logger.debug("Preparing async worker process.")
             process = multiprocessing.Process(
@@ -374,24 +746,62 @@ class AsyncCommand(object):
                     handler_list,
                     handler_exit,
                     new_data_process,
-                    ready,
+                    writer,
                 ),
             )
 
-            with self.lock.writelock:
-                # test whether there is still space in buffer and remove midd
-                while len(self.processes) >= self.PROCESS_BUFFER:
-                    self.processes.popitem(False)
-                self.processes[new_data_process.id] = new_data_process
-
             logger.debug("Starting async worker process.")
             process.start()
-            ready.wait()
+            writer.close()
+
+            # note that the writer might be inherited by other forked processes
+            # so EOF can't be used to detect that the worker finished
+            while True:
+                if not reader.poll(1.0):
+                    if process.is_alive():
+                        continue
+                    if not reader.poll(0):
+                        break
+                try:
+                    kind = new_data_process.apply_event(reader.recv_bytes())
+                except EOFError:
+                    break
+                if kind == "ready":
+                    process_started.set()
+                elif kind == "exit":
+                    break
+            reader.close()
+
+            # worker died before it was ready
             process_started.set()
             process.join()
+            if not new_data_process.get_exited():
+                # worker died without reporting the result
+                new_data_process.set_retval(process.exitcode or -1)
+                new_data_process.set_exited()
             logger.debug("Async worker process finished.")
 
-        work_thread = threading.Thread(target=worker_thread, args=(process_started,))
+        def watcher_thread(process_started):
+            logger.debug("Starting async watcher thread.")
+            try:
+                # the controller is multithreaded here so preexec_fn can't be used
+                AsyncCommand._watch_command(
+                    args,
+                    handler_list,
+                    handler_exit,
+                    new_data_process,
+                    process_started.set,
+                    kill_with_parent=False,
+                )
+            except Exception:
+                logger.exception("Async command failed.")
+                if not new_data_process.get_exited():
+                    new_data_process.set_retval(-1)
+                    new_data_process.set_exited()
+            logger.debug("Async watcher thread finished.")
+
+        target = watcher_thread if self._use_threads() else worker_thread
+        work_thread = threading.Thread(target=target, args=(process_started,))
         work_thread.daemon = True
         work_thread.start()
 
@@ -399,3 +809,8 @@ class AsyncCommand(object):
         process_started.wait()
 
         return new_data_process.id
+
+
+# commands watched from threads are not killed together with the controller otherwise
+atexit.register(AsyncCommand.kill_children)
+os.register_at_fork(after_in_child=AsyncCommand._reset_children)
@@ -222,9 +222,8 @@ ca_file="/etc/ssl/certs/ca-certificates.crt"
 class DnsUciCommands(object):
     def get_settings(self):
 
-        with UciBackend() as backend:
-            resolver_data = backend.read("resolver")
-            dhcp_data = backend.read("dhcp")
+        with UciBackend(readonly=True) as backend:
+            resolver_data, dhcp_data = backend.read_many(["resolver", "dhcp"])
 
         forwarding_enabled = parse_bool(
             get_option_named(resolver_data, "resolver", "common", "forward_upstream")
@@ -264,7 +263,7 @@ class DnsUciCommands(object):
         ]:
             return False
 
-        with UciBackend() as backend:
+        with UciBackend(configs=["dhcp", "resolver"]) as backend:
             backend.set_option(
                 "resolver", "common", "forward_upstream", store_bool(forwarding_enabled)
             )
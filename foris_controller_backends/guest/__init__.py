@@ -335,19 +335,14 @@ class GuestUci:
 
     def get_settings(self):
 
-        with UciBackend() as backend:
-            firewall = backend.read("firewall")
-            network = backend.read("network")
-            sqm = backend.read("sqm")
-            dhcp = backend.read("dhcp")
-            try:
-                wireless = backend.read("wireless")
-            except UciException:
-                wireless = {}
+        with UciBackend(readonly=True) as backend:
+            firewall, network, sqm, dhcp, wireless = backend.read_many(
+                ["firewall", "network", "sqm", "dhcp", "wireless"], optional=["wireless"]
+            )
         return GuestUci.get_guest_network_settings(network, firewall, dhcp, sqm, wireless)
 
     def update_settings(self, **new_settings):
-        with UciBackend() as backend:
+        with UciBackend(configs=["dhcp", "firewall", "network", "sqm", "wireless"]) as backend:
             from foris_controller_backends.wifi import WifiUci
 
             # disable guest wifi when guest network is not enabled
@@ -325,15 +325,10 @@ class LanUci:
 
     def get_settings(self):
 
-        with UciBackend() as backend:
-            network_data = backend.read("network")
-            sqm_data = backend.read("sqm")
-            dhcp_data = backend.read("dhcp")
-            firewall_data = backend.read("firewall")
-            try:
-                wireless_data = backend.read("wireless")
-            except UciException:
-                wireless_data = {}
+        with UciBackend(readonly=True) as backend:
+            network_data, sqm_data, dhcp_data, firewall_data, wireless_data = backend.read_many(
+                ["network", "sqm", "dhcp", "firewall", "wireless"], optional=["wireless"]
+            )
 
         mode = get_option_named(network_data, "network", "lan", "_turris_mode", "managed")
 
@@ -465,7 +460,7 @@ class LanUci:
         :type qos: dict
         """
 
-        with UciBackend() as backend:
+        with UciBackend(configs=["dhcp", "firewall", "network", "sqm", "wireless"]) as backend:
 
             backend.add_section("network", "interface", "lan")
             backend.set_option("network", "lan", "_turris_mode", mode)
@@ -758,7 +753,7 @@ class LanUci:
         """
         mac = mac.upper()
 
-        with UciBackend() as backend:
+        with UciBackend(configs=["dhcp", "network"]) as backend:
             dhcp_data = backend.read("dhcp")
             network_data = backend.read("network")
 
@@ -798,7 +793,7 @@ class LanUci:
         old_mac = old_mac.upper()
         new_mac = mac.upper()
 
-        with UciBackend() as backend:
+        with UciBackend(configs=["dhcp", "network"]) as backend:
             dhcp_data = backend.read("dhcp")
             network_data = backend.read("network")
 
@@ -997,7 +992,7 @@ class LanUci:
 
     def get_port_forwardings(self) -> typing.List[typing.Dict[str,str]]:
         """ API method, gets all current forwardings. """
-        with UciBackend() as backend:
+        with UciBackend(readonly=True) as backend:
             firewall_data = backend.read("firewall")
         raw_fwds = self._get_all_forwardings(firewall_data)
         res = []
@@ -1112,10 +1107,10 @@ class LanUci:
         **kwargs,
     ) -> list:
         try:
-            with UciBackend() as backend:
-                fw_data = backend.read("firewall")
-                dhcp_data = backend.read("dhcp")
-                network_data = backend.read("network")
+            with UciBackend(configs=["dhcp", "firewall", "network"]) as backend:
+                fw_data, dhcp_data, network_data = backend.read_many(
+                    ["firewall", "dhcp", "network"]
+                )
 
                 if not kwargs.get("dest_port"):
                     # remove `"dest_port": None`
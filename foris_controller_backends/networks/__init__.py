@@ -351,13 +351,10 @@ class NetworksUci():
         ifaces, wifi_ifaces = self.detect_interfaces()
         iface_map = {e["id"]: e for e in ifaces}
 
-        with UciBackend() as backend:
-            network_data = backend.read("network")
-            firewall_data = backend.read("firewall")
-            try:
-                wireless_data = backend.read("wireless")
-            except UciException:
-                wireless_data = {}  # wireless config missing
+        with UciBackend(readonly=True) as backend:
+            network_data, firewall_data, wireless_data = backend.read_many(
+                ["network", "firewall", "wireless"], optional=["wireless"]
+            )
 
         # prepare wired intefaces...
         wan_network = self._prepare_network(network_data, "wan", iface_map)
@@ -475,7 +472,7 @@ class NetworksUci():
             net = convert_network_name(net)
             backend.replace_list("network", f"br_{net}", "ports", ifs)
 
-        with UciBackend() as backend:
+        with UciBackend(configs=["dhcp", "firewall", "network", "sqm", "wireless"]) as backend:
             # enable guest
             GuestUci.enable_guest_network(backend)
             data = backend.read("network")
@@ -28,6 +28,7 @@ from io import BytesIO
 from collections import OrderedDict
 
 from foris_controller.app import app_info
+from foris_controller.utils import cached
 
 from foris_controller_backends.cmdline import AsyncCommand, BaseCmdLine
 from foris_controller_backends.files import BaseFile, path_exists, makedirs
@@ -45,6 +46,7 @@ from foris_controller_backends.services import OpenwrtServices
 logger = logging.getLogger(__name__)
 
 NETBOOT_CONFIGURED_PATH = "/tmp/netboot-configured"
+NETBOOT_STATUS_TTL = 5.0  # "booted" may become "ready" later
 
 
 class RemoteAsync(AsyncCommand):
@@ -146,6 +148,7 @@ class RemoteCmds(BaseCmdLine):
         retval, _, _ = self._run_command("/usr/bin/turris-cagen", "drop_ca", "remote")
         return retval == 0
 
+    @cached(ttl=NETBOOT_STATUS_TTL, final=lambda status: status in ("no", "ready"))
     def get_netboot_status(self):
         output, _ = self._run_command_and_check_retval(["/bin/mount"], 0)
         for line in output.decode().split("\n"):
@@ -163,9 +166,8 @@ class RemoteUci(object):
     DEFAULTS = {"enabled": False, "wan_access": False, "port": 11883}
 
     def get_settings(self):
-        with UciBackend() as backend:
-            fosquitto_data = backend.read("fosquitto")
-            firewall_data = backend.read("firewall")
+        with UciBackend(readonly=True) as backend:
+            fosquitto_data, firewall_data = backend.read_many(["fosquitto", "firewall"])
 
         try:
             enabled = parse_bool(
@@ -197,7 +199,7 @@ class RemoteUci(object):
             enabled = False
             result = False
 
-        with UciBackend() as backend:
+        with UciBackend(configs=["firewall", "fosquitto"]) as backend:
             if enabled:
 
                 backend.add_section("firewall", "rule", "wan_fosquitto_turris_rule")
@@ -242,6 +244,7 @@ class RemoteFiles(BaseFile):
     def set_netboot_configured(self):
         makedirs(os.path.dirname(NETBOOT_CONFIGURED_PATH), exist_ok=True)
         self._store_to_file(NETBOOT_CONFIGURED_PATH, "")
+        RemoteCmds.get_netboot_status.invalidate()
         return True
 
     def detect_location(self):
@@ -277,10 +280,10 @@ class RemoteFiles(BaseFile):
                 return network_info["ipv4"]
 
         # from uci
-        with UciBackend() as backend:
-            network_data = backend.read("network")
-            system_data = backend.read("system")
-            fosquitto_data = backend.read("fosquitto")
+        with UciBackend(readonly=True) as backend:
+            network_data, system_data, fosquitto_data = backend.read_many(
+                ["network", "system", "fosquitto"]
+            )
 
         ips["wan"].extend(get_ipv4_addresses_from_uci(network_data, "wan"))
         ips["lan"].extend(get_ipv4_addresses_from_uci(network_data, "lan"))
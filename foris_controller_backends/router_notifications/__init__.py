@@ -102,7 +102,7 @@ class RouterNotificationsCmds(BaseCmdLine):
 
 class RouterNotificationsUci(object):
     def get_settings(self):
-        with UciBackend() as backend:
+        with UciBackend(readonly=True) as backend:
             data = backend.read("user_notify")
 
         res = {
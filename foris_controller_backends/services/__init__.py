@@ -25,7 +25,12 @@ from foris_controller.exceptions import ServiceCmdFailed
 from foris_controller_backends.files import BaseMatch
 from foris_controller.utils import RWLock
 
-from foris_controller_backends.cmdline import handle_command, inject_cmdline_root, BaseCmdLine
+from foris_controller_backends.cmdline import (
+    handle_command,
+    inject_cmdline_root,
+    BaseCmdLine,
+    CommandGovernor,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -60,7 +65,9 @@ class OpenwrtServices(object):
         script_path = os.path.join(self.service_scripts_path, service_name)
         logger.debug("Starting to call '%s %s'" % (script_path, cmd))
         try:
-            retval, stdout, stderr = handle_command(script_path, cmd)
+            retval, stdout, stderr = handle_command(
+                script_path, cmd, priority=CommandGovernor.BACKGROUND
+            )
 
         except OSError as e:
             if fail_on_error:
@@ -99,6 +106,7 @@ class OpenwrtServices(object):
                 "-c",
                 "( sleep %(delay)d; %(script_path)s %(cmd)s ) &"
                 % dict(delay=delay, script_path=script_path, cmd=cmd),
+                priority=CommandGovernor.BACKGROUND,
             )
         except OSError:
             raise ServiceCmdFailed(
@@ -30,7 +30,7 @@ class SystemUciCommands:
     def get_hostname() -> str:
         """ Get hostname uci setting. """
 
-        with UciBackend() as backend:
+        with UciBackend(readonly=True) as backend:
             system_data = backend.read("system")
 
         hostname = get_option_anonymous(system_data, "system", "system", 0, "hostname", "turris")
@@ -73,7 +73,7 @@ class TimeUciCommands(BaseFile):
 
     def get_settings(self):
 
-        with UciBackend() as backend:
+        with UciBackend(readonly=True) as backend:
             system_data = backend.read("system")
 
         timezone = get_option_anonymous(system_data, "system", "system", 0, "timezone")
@@ -105,7 +105,7 @@ class TimeUciCommands(BaseFile):
         :param time: Time to be set
         """
 
-        with UciBackend() as backend:
+        with UciBackend(configs=["system", "wireless"]) as backend:
             backend.set_option(
                 "system",
                 "@system[0]",
@@ -196,7 +196,7 @@ class TimeAsyncCmds(AsyncCommand):
             logger.debug("ntpd finished: (retval=%d)" % process_data.get_retval())
 
         # get all ntpserver
-        with UciBackend() as backend:
+        with UciBackend(readonly=True) as backend:
             system_data = backend.read("system")
 
         servers = get_option_named(system_data, "system", "ntp", "server", [])
@@ -206,6 +206,7 @@ class TimeAsyncCmds(AsyncCommand):
             [],
             handler_exit,
             reset_notify_function,
+            single_flight=True,
         )
         logger.debug("ntpd started in async mode '%s'." % async_id)
 
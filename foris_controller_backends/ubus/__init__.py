@@ -3,19 +3,106 @@
 
 import json
 import logging
+import os
+import threading
 import typing
 
+from foris_controller.app import app_info
+from foris_controller.utils import strtobool
 from foris_controller_backends.cmdline import BaseCmdLine
 
+try:
+    import ubus
+except ImportError:
+    ubus = None
+
 logger = logging.getLogger(__name__)
 
+# ubus_strerror() texts (reported by python-ubus) of failures caused by a broken connection
+UBUS_CONNECTION_ERRORS = ("Connection failed",)
+
+
+class UbusClient:
+    """Persistent in-process ubus connection.
+
+    python-ubus keeps a single global connection per process, so the calls are serialized
+    by a lock. The connection is not shared with the ubus bus (which owns it when it is used)
+    and a connection inherited from the parent process is never reused after fork().
+    """
+
+    lock = threading.Lock()
+    pid: typing.Optional[int] = None  # process which opened the connection
+
+    @staticmethod
+    def _reset():
+        UbusClient.lock = threading.Lock()
+
+    @staticmethod
+    def available() -> bool:
+        return (
+            ubus is not None
+            and app_info.get("bus") != "ubus"
+            and strtobool(os.environ.get("FC_UBUS_NATIVE", "1"))
+            and not os.environ.get("FORIS_CMDLINE_ROOT")  # ubus executable is mocked
+        )
+
+    @staticmethod
+    def _connect():
+        if UbusClient.pid != os.getpid():
+            if UbusClient.pid is not None and ubus.get_connected():
+                # close only our copy of the parent's socket
+                ubus.disconnect(deregister=False)
+            UbusClient.pid = None
+
+        if not ubus.get_connected():
+            logger.debug("Connecting to ubus.")
+            ubus.connect()
+            UbusClient.pid = os.getpid()
+
+    @staticmethod
+    def _connection_error(exc: RuntimeError) -> bool:
+        return any(e in str(exc) for e in UBUS_CONNECTION_ERRORS)
+
+    @staticmethod
+    def call(
+        ubus_object: str, method: str, data: typing.Optional[dict] = None
+    ) -> typing.Optional[list]:
+        """Calls ubus method using the persistent connection.
+
+        :returns: list of replies or None when the call failed
+        :raises: IOError when it is not possible to connect to ubus
+        """
+        with UbusClient.lock:
+            for retry in (False, True):
+                UbusClient._connect()
+                try:
+                    return ubus.call(ubus_object, method, data or {})
+                except RuntimeError as exc:
+                    broken = UbusClient._connection_error(exc)
+                    if broken and ubus.get_connected():
+                        # the next attempt uses a new connection
+                        ubus.disconnect(deregister=False)
+                    if retry or not broken:
+                        # e.g. object or method not found
+                        logger.warning("Failure during ubus call: %r", exc)
+                        return None
+                    logger.debug("Ubus connection broken (%r), reconnecting.", exc)
+
+
+os.register_at_fork(after_in_child=UbusClient._reset)
+
 
 class UbusBackend(BaseCmdLine):
     UBUS_CMD = "/bin/ubus"
 
     @staticmethod
-    def call_ubus(ubus_object: str, method: str, data: typing.Optional[dict] = None) -> typing.Optional[dict]:
-        """Method to call ubus executable and get data/trigger action provided by ubus objects.
+    def call_ubus(
+        ubus_object: str, method: str, data: typing.Optional[dict] = None
+    ) -> typing.Optional[dict]:
+        """Method to call ubus and get data/trigger action provided by ubus objects.
+
+        Persistent in-process connection is used when python-ubus is available,
+        ubus executable is called otherwise.
 
         Try to return:
         * data from ubus object
@@ -23,8 +110,21 @@ class UbusBackend(BaseCmdLine):
         * None in case of runtime failure during querying the ubus
 
         For example:
-        `ubus call umdns reload` does not provide any output, neither it is really expected for method 'reload'.
+        `ubus call umdns reload` does not provide any output, neither it is really expected
+        for method 'reload'.
         """
+        if UbusClient.available():
+            try:
+                replies = UbusClient.call(ubus_object, method, data)
+            except (IOError, RuntimeError) as exc:
+                logger.debug(
+                    "Unable to connect to ubus (%r), falling back to ubus executable.", exc
+                )
+            else:
+                if replies is None:
+                    return None
+                return replies[0] if replies else {}
+
         cmd = [UbusBackend.UBUS_CMD, "call", ubus_object, method]
         if data:
             cmd.append(json.dumps(data))
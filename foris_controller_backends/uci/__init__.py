@@ -17,17 +17,31 @@
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
 #
 
+import atexit
 import collections
+import functools
 import logging
 import os
 import re
+import shutil
+import tempfile
+import threading
+import time
+import zlib
 
-from foris_controller.utils import RWLock
+from foris_controller.utils import RWLock, strtobool
 
 from foris_controller.app import app_info
-from foris_controller.exceptions import UciException, UciTypeException, UciRecordNotFound
+from foris_controller.exceptions import (
+    UciUndeclaredConfig,
+    UciException,
+    UciTypeException,
+    UciRecordNotFound,
+)
 
-from foris_controller_backends.cmdline import handle_command
+from foris_controller_backends.cmdline import CommandGovernor, handle_command
+
+from . import native
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +61,63 @@ def store_bool(value):
     return value
 
 
+def _drops_index(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self._index = None
+        return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class UciConfig(list):
+    """ Parsed sections of a single config
+
+    It is a list of sections (so it can be used in the same way as a plain list),
+    but named sections and sections of the same type are indexed.
+    Indexes are created on the first lookup and they are dropped when the list is modified.
+    """
+
+    append = _drops_index(list.append)
+    extend = _drops_index(list.extend)
+    insert = _drops_index(list.insert)
+    remove = _drops_index(list.remove)
+    pop = _drops_index(list.pop)
+    clear = _drops_index(list.clear)
+    sort = _drops_index(list.sort)
+    reverse = _drops_index(list.reverse)
+    __setitem__ = _drops_index(list.__setitem__)
+    __delitem__ = _drops_index(list.__delitem__)
+    __iadd__ = _drops_index(list.__iadd__)
+    __imul__ = _drops_index(list.__imul__)
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._index = None
+
+    def _get_index(self):
+        if self._index is None:
+            by_name = {}
+            by_type = {}
+            for section in self:
+                by_name.setdefault(section["name"], section)
+                by_type.setdefault(section["type"], []).append(section)
+            self._index = (by_name, by_type)
+        return self._index
+
+    def get_named(self, name):
+        """
+        :returns: named section or None when the section is missing
+        """
+        return self._get_index()[0].get(name)
+
+    def get_by_type(self, section_type):
+        """
+        :returns: list of sections of given type (anonymous as well as named)
+        """
+        return list(self._get_index()[1].get(section_type, []))
+
+
 def get_config(data, config):
     if config not in data:
         raise UciRecordNotFound(config=config)
@@ -58,6 +129,12 @@ def get_section(data, config, section):
     named section
     """
     res = get_config(data, config)
+    if isinstance(res, UciConfig):
+        res = res.get_named(section)
+        if res is None:
+            raise UciRecordNotFound(config, section=section)
+        return res
+
     res = [e for e in res if e["name"] == section]
     if not res:
         raise UciRecordNotFound(config, section=section)
@@ -91,6 +168,8 @@ def get_sections_by_type(data, config, section_type):
     get sections of specified type (anonymous as well as named)
     """
     res = get_config(data, config)
+    if isinstance(res, UciConfig):
+        return res.get_by_type(section_type)
     res = [e for e in data[config] if e["type"] == section_type]
     return res
 
@@ -118,44 +197,379 @@ def get_option_anonymous(data, config, section_type, idx, option, default=None):
     return res
 
 
+def _copy_sections(sections):
+    """ Makes a copy of parsed sections so that the caller can't modify cached data
+    """
+    return UciConfig(
+        {
+            "type": section["type"],
+            "name": section["name"],
+            "data": collections.OrderedDict(
+                (k, list(v) if isinstance(v, list) else v) for k, v in section["data"].items()
+            ),
+            "anonymous": section["anonymous"],
+        }
+        for section in sections
+    )
+
+
+def _effective_state(sections):
+    """ Converts parsed sections to a form which ignores order of the options """
+    return [(e["type"], e["name"], dict(e["data"])) for e in sections]
+
+
+class UciConfigCache(object):
+    """ Process-wide cache of parsed uci configs
+
+    Entries are validated using stat() of the config file and of the related delta files
+    so any modification (even the one performed outside of foris-controller) is detected.
+    """
+
+    def __init__(self):
+        self.enabled = not strtobool(os.environ.get("FC_DISABLE_UCI_CACHE", "0"))
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def signature(paths):
+        """ Computes the signature of files (path, mtime_ns, size, inode)
+        Note that it has to be obtained before the files are read.
+        """
+        res = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                res.append((path, stat.st_mtime_ns, stat.st_size, stat.st_ino))
+            except FileNotFoundError:
+                res.append((path, None, None, None))
+        return tuple(res)
+
+    def get(self, key, signature):
+        """
+        :returns: cached sections or None when cache entry is missing or outdated
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == signature:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def store(self, key, signature, sections):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (signature, sections)
+
+    def invalidate(self, config_dir, config=None):
+        """ Drops entries of the config (all configs when None) read by any reader """
+        with self._lock:
+            keys = [
+                e
+                for e in self._entries
+                if e[0] == config_dir and (config is None or e[1] == config)
+            ]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+def _run_reload_config():
+    logger.debug("Running procd uci triggers")
+
+    # note that if this fails
+    # it shouldn't be fatal
+    try:
+        retval, _, _ = handle_command("reload_config", priority=CommandGovernor.BACKGROUND)
+    except (FileNotFoundError, OSError):
+        logger.warning("Missing `reload_config` command.")
+        return
+
+    if retval:
+        logger.warning("Failed to run procd uci triggers. (retval=%d)", retval)
+    else:
+        logger.debug("Procd uci triggers were triggered.")
+
+
+class ReloadScheduler(object):
+    """ Coalesces `reload_config` calls
+
+    The reload is performed synchronously by default. When a coalescing window is set,
+    the first request opens a window and all requests which arrive within the window
+    are served by a single `reload_config` call performed in a separate thread.
+    """
+
+    def __init__(self, run, window=None):
+        """
+        :param run: function which performs the reload
+        :param window: coalescing window in seconds (FC_UCI_RELOAD_WINDOW env variable is used
+                       when not set), reloads are performed synchronously when <= 0
+                       (callers which restart services right after the commit rely on it)
+        """
+        if window is None:
+            window = float(os.environ.get("FC_UCI_RELOAD_WINDOW", "0"))
+        self.window = window
+        self._run = run
+        self._reset()
+        self.requested = 0
+        self.coalesced = 0
+        self.executed = 0
+        # pending reload of the parent process is not performed in the child process
+        os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.flush)
+
+    def _reset(self):
+        self._cond = threading.Condition()
+        self._thread = None
+        self._window_start = None  # set when a reload is pending
+        self._scheduled = 0  # number of the last request
+        self._done = 0  # last request which was served by a finished reload
+
+    def schedule(self):
+        """ Requests `reload_config`
+
+        :returns: ticket which can be passed to wait()
+        :rtype: int
+        """
+        with self._cond:
+            self.requested += 1
+            self._scheduled += 1
+            ticket = self._scheduled
+            if self._window_start is None:
+                self._window_start = time.monotonic()
+            else:
+                self.coalesced += 1
+
+            if self.window > 0:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        name="uci-reload", target=self._loop, daemon=True
+                    )
+                    self._thread.start()
+                self._cond.notify_all()
+                return ticket
+
+        self._execute()
+        return ticket
+
+    def wait(self, ticket, timeout=None):
+        """ Waits till the reload related to the ticket is performed
+
+        :returns: False if the timeout expired
+        :rtype: bool
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._done >= ticket, timeout)
+
+    def flush(self):
+        """ Performs pending reload immediately """
+        with self._cond:
+            pending = self._window_start is not None
+        if pending:
+            self._execute()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "requested": self.requested,
+                "coalesced": self.coalesced,
+                "executed": self.executed,
+                "pending": self._window_start is not None,
+            }
+
+    def _execute(self):
+        with self._cond:
+            ticket = self._scheduled
+            self._window_start = None
+        try:
+            self._run()
+        finally:
+            with self._cond:
+                self.executed += 1
+                self._done = max(self._done, ticket)
+                self._cond.notify_all()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                if self._window_start is None:
+                    self._cond.wait()
+                    continue
+                delay = self._window_start + self.window - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+            try:
+                self._execute()
+            except Exception:
+                logger.exception("Failed to reload uci configs.")
+
+
+_EXPORT_PACKAGE_RE = re.compile(r"^package ([^\s]+)$")
+_EXPORT_CONFIG_RE = re.compile(r"^config ([^\s]+) '([^\s]+)'$")
+_EXPORT_OPTION_RE = re.compile(r"^\s*(option|list) ([^\s]+) ('.*')$")
+_EXPORT_ANONYMOUS_RE = re.compile(r"^cfg[0-9a-f]{6}$")
+_EXPORT_VALUE_RE = re.compile(r"('[^']*'|\\')")
+
+
 class UciBackend(object):
     CHANGES_DIR = "/tmp/.uci-foris-controller"
     DEFAULT_CONFIG_DIR = "/etc/config/"
-    uci_lock = RWLock(app_info["lock_backend"])
-
-    def __init__(self, config_dir=None):
+    # configs are locked using a fixed set of locks (config name is hashed to lock index)
+    # the locks need to be created in advance to be shared among processes
+    LOCK_COUNT = 16
+    uci_locks = [RWLock(app_info["lock_backend"]) for _ in range(LOCK_COUNT)]
+    config_cache = UciConfigCache()
+    reload_scheduler = ReloadScheduler(_run_reload_config)
+
+    def __init__(
+        self, config_dir=None, native_read=None, readonly=False, configs=None, wait_reload=False
+    ):
+        """
+        :param config_dir: directory containing uci configs
+        :param native_read: parse configs in-process instead of calling `uci export`
+                            (FC_UCI_NATIVE_READ env variable is used when not set)
+        :param readonly: only reads are permitted within the transaction
+                         (shared lock is used so read-only transactions may run in parallel)
+        :param configs: configs which are going to be used within the transaction
+                        (they are locked in advance, all configs are locked when None)
+        :param wait_reload: wait till `reload_config` triggered by the commit is finished
+        """
         if not config_dir:
             config_dir = os.environ.get("DEFAULT_UCI_CONFIG_DIR", UciBackend.DEFAULT_CONFIG_DIR)
         logger.debug("Using uci config dir '%s'" % config_dir)
 
+        if native_read is None:
+            native_read = strtobool(os.environ.get("FC_UCI_NATIVE_READ", "0"))
+
         self.affected_configs = set()
         self.config_dir = config_dir
+        self.native_read = native_read
+        self.readonly = readonly
+        self.wait_reload = wait_reload
+        self.changes_dir = None  # created for each (not read-only) transaction
+        self._configs = configs
+        self._locked = []  # indexes of obtained locks (ascending)
+        self.changed_configs = set()  # configs which were actually modified by the commit
+        self._pending = []  # commands waiting for `uci batch`
+        self._staged = {}  # configs with queued changes applied
+        self._snapshots = {}  # exported configs before the first change
+
+    @staticmethod
+    def _lock_index(config):
+        return zlib.crc32(config.encode()) % UciBackend.LOCK_COUNT
+
+    def _get_lock(self, idx):
+        lock = UciBackend.uci_locks[idx]
+        return lock.readlock if self.readonly else lock.writelock
+
+    def _lock_configs(self, configs=None):
+        """ Makes sure that the locks of the configs are obtained
+
+        Locks of the declared configs (all locks when no configs were declared) are obtained
+        in ascending order at the beginning of the transaction so that transactions can't
+        deadlock. A config which was not declared can be locked later only when its lock
+        follows the already obtained ones.
+
+        :param configs: configs to lock (all locks are obtained when None)
+        :raises UciUndeclaredConfig: when the lock can't be obtained without breaking the order
+        """
+        if configs is None:
+            required = set(range(UciBackend.LOCK_COUNT))
+        else:
+            required = {UciBackend._lock_index(e) for e in configs}
+        missing = sorted(required.difference(self._locked))
+        if not missing:
+            return
 
-    def _cleanup(self):
-        logger.debug("Clearing %s." % UciBackend.CHANGES_DIR)
-        try:
-            os.makedirs(UciBackend.CHANGES_DIR)
-        except OSError:
-            pass
-        for file_path in os.listdir(UciBackend.CHANGES_DIR):
-            os.remove(os.path.join(UciBackend.CHANGES_DIR, file_path))
+        if self._locked and missing[0] < self._locked[-1]:
+            raise UciUndeclaredConfig(configs or "all")
+
+        for idx in missing:
+            self._get_lock(idx).acquire()
+            self._locked.append(idx)
+        logger.debug("UCI locks %s obtained.", self._locked)
+
+    def _unlock_configs(self):
+        for idx in reversed(self._locked):
+            self._get_lock(idx).release()
+        self._locked = []
 
     def __enter__(self):
-        logger.debug("Starting uci transaction.")
-        UciBackend.uci_lock.writelock.acquire()
-        logger.debug("UCI lock obtained.")
-        self._cleanup()
+        logger.debug("Starting uci transaction%s." % (" (readonly)" if self.readonly else ""))
+        self._lock_configs(self._configs)
+        if not self.readonly:
+            os.makedirs(UciBackend.CHANGES_DIR, exist_ok=True)
+            # pid is a part of the name so the directories of dead processes can be purged
+            self.changes_dir = tempfile.mkdtemp(
+                prefix="%d-" % os.getpid(), dir=UciBackend.CHANGES_DIR
+            )
         return self
 
     def __exit__(self, exc_type, value, traceback):
-        if exc_type is None:
-            if self.affected_configs:
-                self.commit()
-            logger.debug("Uci transaction ended.")
+        try:
+            if exc_type is None:
+                if self.affected_configs:
+                    self.commit()
+                logger.debug("Uci transaction ended.")
+            else:
+                logger.error("Uci transaction terminated.")
+        finally:
+            if self.changes_dir:
+                shutil.rmtree(self.changes_dir, ignore_errors=True)
+                self.changes_dir = None
+            self._unlock_configs()
+            logger.debug("UCI locks released.")
+
+    @staticmethod
+    def purge_changes_dirs():
+        """ Removes the changes directories left behind by processes which are not running
+
+        It is supposed to be called on startup (directories of crashed processes would
+        accumulate in /tmp otherwise).
+        """
+        try:
+            names = os.listdir(UciBackend.CHANGES_DIR)
+        except FileNotFoundError:
+            return
+
+        for name in names:
+            try:
+                os.kill(int(name.split("-", 1)[0]), 0)
+                continue
+            except ValueError:
+                pass  # not tagged with a pid (left by an older version)
+            except ProcessLookupError:
+                pass
+            except PermissionError:
+                continue  # running under a different user
+            logger.debug("Removing stale uci changes directory '%s'.", name)
+            shutil.rmtree(os.path.join(UciBackend.CHANGES_DIR, name), ignore_errors=True)
+
+    def _uci_cmdline(self, *args):
+        export_anonymous = ["-n"] if args[0] == "export" else []
+        if self.changes_dir:
+            changes_path = ["-p" if args[0] == "commit" else "-P", self.changes_dir]
         else:
-            logger.error("Uci transaction terminated.")
-        UciBackend.uci_lock.writelock.release()
-        logger.debug("UCI lock released.")
+            changes_path = []
+        return ["uci"] + export_anonymous + ["-c", self.config_dir] + changes_path + list(args)
+
+    def _check_writable(self, *args):
+        if self.readonly:
+            raise UciException(self._uci_cmdline(*args), "Read-only uci transaction")
 
     def _run_uci_command(self, *args, **kwargs):
         """
@@ -163,17 +577,12 @@ class UciBackend(object):
         :rtype: str
         """
         fail_on_error = kwargs["fail_on_error"] if "fail_on_error" in kwargs else True
-        changes_path_option = "-p" if args[0] == "commit" else "-P"
-        export_anonymous = ["-n"] if args[0] == "export" else []
-        cmdline_args = (
-            ["uci"]
-            + export_anonymous
-            + ["-c", self.config_dir, changes_path_option, UciBackend.CHANGES_DIR]
-            + list(args)
-        )
+        cmdline_args = self._uci_cmdline(*args)
         logger.debug("uci cmd '%s'" % str(args))
         retval, stdout, stderr = handle_command(
-            *cmdline_args, input_data=kwargs.pop("input_data", None)
+            *cmdline_args,
+            input_data=kwargs.pop("input_data", None),
+            priority=kwargs.get("priority", CommandGovernor.DEFAULT),
         )
         logger.debug("retcode: %d" % retval)
         logger.debug("stdout: %s" % stdout)
@@ -182,21 +591,80 @@ class UciBackend(object):
             raise UciException(cmdline_args, stderr)
         return stdout.decode("utf-8")
 
-    def _run_reload_config(self):
-        logger.debug("Running procd uci triggers")
+    def _staged_package(self, config):
+        """ Returns the config as it looks like with all queued changes applied
 
-        # note that if this fails
-        # it shouldn't be fatal
-        try:
-            retval, _, _ = handle_command("reload_config")
-        except (FileNotFoundError, OSError):
-            logger.warning("Missing `reload_config` command.")
+        :returns: staged config or None if it can't be parsed in-process
+        :rtype: foris_controller_backends.uci.native.UciPackage
+        """
+        if config not in self._staged:
+            if not os.path.isfile(os.path.join(self.config_dir, config)):
+                # uci fails to modify missing configs
+                raise UciException(self._uci_cmdline("set", config), "Entry not found")
+            try:
+                self._staged[config] = native.load_package(
+                    self.config_dir, config, self._delta_dirs(config)
+                )
+                self._snapshots.setdefault(config, self._staged[config].export())
+            except UciException as e:
+                logger.warning("Failed to stage uci config '%s' (%s).", config, e)
+                self._staged[config] = None
+        return self._staged[config]
+
+    def _queue(self, config, command, target, value=None):
+        """ Validates the change on the staged config and queues it for `uci batch`
+
+        :param config: uci config
+        :param command: uci command (set, delete, add_list, del_list)
+        :param target: section or section.option within the config
+        :param value: value to be set (None for delete)
+        """
+        argument = "%s.%s" % (config, target)
+        if value is not None:
+            argument += "=%s" % value
+        self._check_writable(command, argument)
+        self._lock_configs([config])
+
+        package = self._staged_package(config)
+        if package is None or "\n" in argument:
+            # can't be validated or passed to batch -> run it directly
+            self._flush()
+            self._run_uci_command(command, argument)
+            if package is not None:
+                self._staged.pop(config)
+        else:
+            section_name, _, option_name = target.partition(".")
+            option_name = option_name or None
+            if command == "set":
+                package.set(section_name, option_name, value)
+            elif command == "delete":
+                package.delete(section_name, option_name)
+            elif command == "add_list":
+                package.add_list(section_name, option_name, value)
+            elif command == "del_list":
+                package.del_list(section_name, option_name, value)
+            self._pending.append("%s '%s'" % (command, argument.replace("'", "'\\''")))
+
+        self.affected_configs.add(config)
+
+    def _flush(self):
+        """ Performs all queued changes using a single `uci batch` call
+        """
+        if not self._pending:
             return
 
-        if retval:
-            logger.warning("Failed to run procd uci triggers. (retval=%d)", retval)
-        else:
-            logger.debug("Procd uci triggers were triggered.")
+        pending, self._pending = self._pending, []
+        cmdline_args = self._uci_cmdline("batch")
+        logger.debug("uci batch of %d commands", len(pending))
+        retval, stdout, stderr = handle_command(
+            *cmdline_args, input_data=("\n".join(pending) + "\n").encode("utf-8")
+        )
+        logger.debug("retcode: %d" % retval)
+        logger.debug("stderr: %s" % stderr)
+        if retval or stderr.strip():
+            # staged data are no longer valid
+            self._staged = {}
+            raise UciException(cmdline_args, stderr)
 
     def add_section(self, config, section_type, section_name=None):
         """
@@ -205,10 +673,20 @@ class UciBackend(object):
         """
         retval = None
         if section_name is None:
+            # name is generated by uci
+            self._check_writable("add", config, section_type)
+            self._lock_configs([config])
+            try:
+                self._staged_package(config)  # to take the snapshot before the change
+            except UciException:
+                pass  # missing config
+            self._flush()
             retval = self._run_uci_command("add", config, section_type, fail_on_error=False)
             retval = retval.strip()
+            if retval and self._staged.get(config):
+                self._staged[config].set(retval, None, section_type)
         else:
-            self._run_uci_command("set", "%s.%s=%s" % (config, section_name, section_type))
+            self._queue(config, "set", section_name, section_type)
 
         self.affected_configs.add(config)
         return retval
@@ -218,25 +696,24 @@ class UciBackend(object):
         """
         :param section_name: anonymous or named (@anonymous[1], named)
         """
-        self._run_uci_command("delete", "%s.%s" % (config, section_name))
-        self.affected_configs.add(config)
+        self._queue(config, "delete", section_name)
 
     def set_option(self, config, section_name, option_name, value):
-        self._run_uci_command("set", "%s.%s.%s=%s" % (config, section_name, option_name, value))
-        self.affected_configs.add(config)
+        self._queue(config, "set", "%s.%s" % (section_name, option_name), "%s" % value)
 
     def del_option(self, config, section_name, option_name, fail_on_error=True):
-        self._run_uci_command("delete", "%s.%s.%s" % (config, section_name, option_name), fail_on_error=fail_on_error)
-        self.affected_configs.add(config)
+        try:
+            self._queue(config, "delete", "%s.%s" % (section_name, option_name))
+        except UciException:
+            if fail_on_error:
+                raise
 
     def add_to_list(self, config, section_name, list_name, values):
         """
         merges with previous values
         """
         for value in values:
-            self._run_uci_command(
-                "add_list", "%s.%s.%s=%s" % (config, section_name, list_name, value)
-            )
+            self._queue(config, "add_list", "%s.%s" % (section_name, list_name), "%s" % value)
 
         self.affected_configs.add(config)
 
@@ -246,11 +723,9 @@ class UciBackend(object):
         """
         if values:
             for value in values:
-                self._run_uci_command(
-                    "del_list", "%s.%s.%s=%s" % (config, section_name, list_name, value)
-                )
+                self._queue(config, "del_list", "%s.%s" % (section_name, list_name), "%s" % value)
         else:
-            self._run_uci_command("delete", "%s.%s.%s" % (config, section_name, list_name))
+            self._queue(config, "delete", "%s.%s" % (section_name, list_name))
         self.affected_configs.add(config)
 
     def replace_list(self, config, section_name, list_name, values):
@@ -258,22 +733,54 @@ class UciBackend(object):
         replaces all list items (list may not be present)
         """
         try:
-            self._run_uci_command("delete", "%s.%s.%s" % (config, section_name, list_name))
+            self._queue(config, "delete", "%s.%s" % (section_name, list_name))
         except UciException:
             pass  # option is missing
 
         self.add_to_list(config, section_name, list_name, values)
         self.affected_configs.add(config)
 
+    def _is_changed(self, config):
+        """ Compares the config with all changes applied to the snapshot
+        taken before the first change
+        """
+        snapshot = self._snapshots.get(config)
+        if snapshot is None:
+            return True
+        package = self._staged.get(config)
+        try:
+            if package is None:
+                package = native.load_package(self.config_dir, config, self._delta_dirs(config))
+        except UciException:
+            return True
+        return _effective_state(package.export()) != _effective_state(snapshot)
+
     def commit(self):
-        logger.debug("Preparing commit for configs %s" % ", ".join(self.affected_configs))
+        self._flush()
+        changed = {e for e in self.affected_configs if self._is_changed(e)}
+        logger.debug("Preparing commit for configs %s" % ", ".join(changed))
         for config in self.affected_configs:
-            self._run_uci_command("commit", config)
-            # This revert should clean the changes directory
-            self._run_uci_command("revert", config)
+            if config in changed:
+                self._run_uci_command("commit", config)
+                # This revert should clean the changes directory
+                self._run_uci_command("revert", config)
+                UciBackend.config_cache.invalidate(self.config_dir, config)
+                # next change will take a new snapshot
+                self._staged.pop(config, None)
+                self._snapshots.pop(config, None)
+            else:
+                logger.debug("Config '%s' was not changed." % config)
+                try:
+                    os.remove(os.path.join(self.changes_dir, config))
+                except FileNotFoundError:
+                    pass
 
-        if self.affected_configs:
-            self._run_reload_config()
+        self.affected_configs = set()
+        self.changed_configs.update(changed)
+        if changed:
+            ticket = UciBackend.reload_scheduler.schedule()
+            if self.wait_reload:
+                UciBackend.reload_scheduler.wait(ticket)
 
         logger.debug("Uci configs updates were commited.")
 
@@ -281,90 +788,164 @@ class UciBackend(object):
         """ Converts value to originall value which is was put to uci
             "'Tom'\''sNet'" -> "Tom'sNet"
         """
+        if value.count("'") == 2 and value[0] == "'" and value[-1] == "'":
+            return value[1:-1]  # the most common case (no escaped quotes)
         return "".join(
-            ["'" if e == "\\'" else e.strip("'") for e in re.split(r"('[^']*'|\\')", value) if e]
+            ["'" if e == "\\'" else e.strip("'") for e in _EXPORT_VALUE_RE.split(value) if e]
         )
 
-    def _parse_section(self, lines):
-        result = collections.OrderedDict()
-        try:
-            while True:
-                if lines[0].startswith("package") or lines[0].startswith("config"):
-                    break
-
-                match = re.match(r"^\s*option ([^\s]+) ('.+')$", lines[0])
-                if match:
-                    result[match.group(1)] = self._convert_value(match.group(2))
-                else:
-                    match = re.match(r"^\s*list ([^\s]+) ('.+')$", lines[0])
-                    if match:
-                        list_name, value = match.group(1, 2)
-                        result[list_name] = result.get(list_name, [])
-                        result[list_name].append(self._convert_value(value))
-                lines.pop(0)
-
-        except IndexError:
-            pass
-
-        return result
+    def _parse_packages(self, lines):
+        """ Parses the output of `uci export` in a single pass
 
-    def _parse_package(self, lines):
-        result = []
-        try:
-            while True:
-                if lines[0].startswith("config"):
-                    line = lines.pop(0)
-                    matched = re.match(r"^config ([^\s]+) '([^\s]+)'$", line)
-                    section_type, section_name = matched.group(1, 2)
-                    section = {
+        :param lines: lines of the export output
+        :type lines: iterable
+        """
+        result = {}
+        sections = None  # sections of the current package
+        data = None  # options of the current section
+        for line in lines:
+            if line.startswith("package"):
+                sections = result[_EXPORT_PACKAGE_RE.match(line).group(1)] = []
+                data = None
+            elif sections is None:
+                continue  # not within a package
+            elif line.startswith("config"):
+                section_type, section_name = _EXPORT_CONFIG_RE.match(line).group(1, 2)
+                data = collections.OrderedDict()
+                sections.append(
+                    {
                         "type": section_type,
                         "name": section_name,
-                        "data": self._parse_section(lines),
-                        "anonymous": True
-                        if re.search(r"^cfg[0-9a-f]{6}$", section_name)
-                        else False,
+                        "data": data,
+                        "anonymous": bool(_EXPORT_ANONYMOUS_RE.match(section_name)),
                     }
-                    result.append(section)
-                elif lines[0].startswith("package"):
-                    # next package
-                    break
-                else:
-                    line = lines.pop(0)
-        except IndexError:
-            pass
+                )
+            elif data is not None:
+                match = _EXPORT_OPTION_RE.match(line)
+                if match:
+                    kind, name, value = match.group(1, 2, 3)
+                    if kind == "option":
+                        data[name] = self._convert_value(value)
+                    else:
+                        data.setdefault(name, []).append(self._convert_value(value))
 
         return result
 
-    def _parse_packages(self, lines):
+    @staticmethod
+    def reload_stats():
+        """ Returns counters of `reload_config` calls
+        :rtype: dict
         """
-        :param lines: lines of the export output
-        :type lines: list
+        return UciBackend.reload_scheduler.stats()
+
+    @staticmethod
+    def cache_stats():
+        """ Returns counters of the shared config cache
+        :rtype: dict
         """
-        result = {}
-        if not lines:
-            return result
-        try:
-            while True:
-                package_line = lines.pop(0)
-                while not package_line.startswith("package"):
-                    package_line = lines.pop(0)
-                result[
-                    re.match(r"^package ([^\s]+)$", package_line).group(1)
-                ] = self._parse_package(lines)
+        return UciBackend.config_cache.stats()
 
-        except IndexError:
-            pass
+    def _delta_dirs(self, config):
+        if config in self.affected_configs:
+            # only changed configs have deltas in the changes dir of the transaction
+            return [native.SAVE_DIR, self.changes_dir]
+        return [native.SAVE_DIR]
 
-        return result
+    def _fetch_configs(self, configs):
+        """ Reads configs using a single `uci` call (or in-process parser)
+        """
+        if self.native_read:
+            return {
+                e: native.load_package(self.config_dir, e, self._delta_dirs(e)).export()
+                for e in configs
+            }
+        if len(configs) == 1:
+            output = self.export_data(configs[0])
+        else:
+            output = self._export_many(configs)
+        parsed = self._parse_packages(output.splitlines())
+        return {e: parsed.get(e, []) for e in configs}
+
+    def _export_many(self, configs):
+        cmdline_args = ["uci", "-n"] + self._uci_cmdline("batch")[1:]
+        logger.debug("uci export of %s" % ", ".join(configs))
+        retval, stdout, stderr = handle_command(
+            *cmdline_args,
+            input_data="".join("export %s\n" % e for e in configs).encode(),
+            priority=CommandGovernor.INTERACTIVE,
+        )
+        logger.debug("retcode: %d" % retval)
+        logger.debug("stderr: %s" % stderr)
+        if retval or stderr.strip():
+            raise UciException(cmdline_args, stderr)
+        return stdout.decode("utf-8")
+
+    def _read_configs(self, configs):
+        self._lock_configs(configs)
+        self._flush()
+
+        result = {}
+        signatures = {}
+        for config in configs:
+            if config in self.affected_configs:
+                # data containing changes of this transaction are not shared
+                continue
+            paths = [os.path.join(self.config_dir, config)] + [
+                os.path.join(e, config) for e in self._delta_dirs(config)
+            ]
+            signatures[config] = UciConfigCache.signature(paths)
+            # readers may differ in corner cases so their results are not mixed
+            key = (self.config_dir, config, self.native_read)
+            sections = UciBackend.config_cache.get(key, signatures[config])
+            if sections is not None:
+                result[config] = sections
+
+        missing = [e for e in configs if e not in result]
+        if missing:
+            logger.debug("Uci configs %s are not cached." % ", ".join(missing))
+            for config, sections in self._fetch_configs(missing).items():
+                if config in signatures:
+                    UciBackend.config_cache.store(
+                        (self.config_dir, config, self.native_read), signatures[config], sections
+                    )
+                result[config] = sections
+
+        return {e: _copy_sections(result[e]) for e in configs}
 
     def read(self, config=None):
+        if config:
+            return self._read_configs([config])
+        self._lock_configs()
+        if self.native_read:
+            return self._read_configs(native.list_configs(self.config_dir))
         output = self.export_data(config)
         lines = output.splitlines()
-        return self._parse_packages(lines)
+        return {k: UciConfig(v) for k, v in self._parse_packages(lines).items()}
+
+    def read_many(self, configs, optional=()):
+        """ Reads several configs at once
+
+        :param configs: configs to be read
+        :param optional: configs which may be missing
+        :returns: list of dicts in the same format as read() returns
+                  (empty dict for a missing optional config)
+        :rtype: list
+        """
+        present = [
+            e
+            for e in configs
+            if e not in optional or os.path.isfile(os.path.join(self.config_dir, e))
+        ]
+        data = self._read_configs(present) if present else {}
+        return [{e: data[e]} if e in data else {} for e in configs]
 
     def export_data(self, config=None):
+        self._lock_configs([config] if config else None)
+        self._flush()
         output = (
-            self._run_uci_command("export", config) if config else self._run_uci_command("export")
+            self._run_uci_command("export", config, priority=CommandGovernor.INTERACTIVE)
+            if config
+            else self._run_uci_command("export", priority=CommandGovernor.INTERACTIVE)
         )
         return output
 
@@ -378,4 +959,9 @@ class UciBackend(object):
         :type config: string
         """
         data = data if data else ""
+        self._check_writable("import", config)
+        self._lock_configs([config])
+        self._flush()
         self._run_uci_command("import", config, input_data=data.encode())
+        self._staged.pop(config, None)
+        UciBackend.config_cache.invalidate(self.config_dir, config)
@@ -0,0 +1,421 @@
+#
+# foris-controller
+# Copyright (C) 2026 CZ.NIC, z.s.p.o. (http://www.nic.cz/)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+#
+
+""" In-process reader of uci configs
+
+It parses config files and applies pending delta files the same way libuci does,
+so the data can be obtained without running `uci export`.
+"""
+
+import collections
+import logging
+import os
+import platform
+import re
+import typing
+
+from foris_controller.exceptions import UciException
+
+logger = logging.getLogger(__name__)
+
+# default directory where uci stores its pending changes
+SAVE_DIR = "/tmp/.uci"
+
+_ANONYMOUS_RE = re.compile(r"^cfg[0-9a-f]{6}$")
+_NAME_RE = re.compile(r"^[a-zA-Z0-9_]+$")
+_PACKAGE_RE = re.compile(r"^[a-zA-Z0-9_\-]+$")
+_TYPE_RE = re.compile(r"^[\x21-\x7e]+$")
+_EXTENDED_RE = re.compile(r"^@([^\[\]]*)\[(-?[0-9]+)\]$")
+_INVALID_TEXT_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>(?:[ \t\r\f\v]|\\\n)+)
+    |(?P<nl>\n)
+    |(?P<comment>\#[^\n]*)
+    |(?P<word>
+        (?:[^\s'"\\\#]|'[^']*'|"(?:[^"\\]|\\.)*"|\\.)
+        (?:[^\s'"\\]|'[^']*'|"(?:[^"\\]|\\.)*"|\\.)*
+    )
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+_PIECE_RE = re.compile(r"""'([^']*)'|"((?:[^"\\]|\\.)*)"|\\(.)|([^'"\\]+)""", re.DOTALL)
+_ESCAPE_RE = re.compile(r"\\(.)", re.DOTALL)
+
+# libuci hashes plain `char` which signedness depends on the platform
+_SIGNED_CHAR = not platform.machine().lower().startswith(
+    ("arm", "aarch64", "ppc", "powerpc", "s390", "riscv")
+)
+
+
+def _unquote(word: str) -> str:
+    """ Converts a token to its value (quotes and escapes are resolved)
+        "'Tom'\\''sNet'" -> "Tom'sNet"
+    """
+    if not any(c in word for c in "'\"\\"):
+        return word
+
+    res = []
+    for single, double, escaped, plain in _PIECE_RE.findall(word):
+        if plain:
+            res.append(plain)
+        elif escaped:
+            if escaped != "\n":  # line continuation
+                res.append(escaped)
+        elif double:
+            res.append(_ESCAPE_RE.sub(lambda m: "" if m.group(1) == "\n" else m.group(1), double))
+        else:
+            res.append(single)
+    return "".join(res)
+
+
+def _tokenize(text: str, path: str) -> typing.Iterator[typing.Tuple[int, typing.List[str]]]:
+    """ Splits the content of uci file into statements
+
+    :returns: generator of (line_number, [token, ...])
+    """
+    line = 1
+    statement_line = 1
+    statement = []
+    pos = 0
+    end = len(text)
+    while pos < end:
+        match = _TOKEN_RE.match(text, pos)
+        if not match:
+            raise UciException([path], "parse error (unterminated quote) at line %d" % line)
+        kind = match.lastgroup
+        if kind == "nl":
+            if statement:
+                yield statement_line, statement
+                statement = []
+            line += 1
+        elif kind == "word":
+            if not statement:
+                statement_line = line
+            token = match.group(kind)
+            statement.append(_unquote(token))
+            line += token.count("\n")
+        elif kind == "ws":
+            line += match.group(kind).count("\n")
+        pos = match.end()
+
+    if statement:
+        yield statement_line, statement
+
+
+def _djbhash(hash_value: int, string: str) -> int:
+    if hash_value == 0xFFFFFFFF:
+        hash_value = 5381
+    for char in string.encode("utf-8", errors="surrogateescape"):
+        if _SIGNED_CHAR and char > 127:
+            char -= 256
+        hash_value = (hash_value * 33 + char) & 0xFFFFFFFF
+    return hash_value & 0x7FFFFFFF
+
+
+class UciSection(object):
+    __slots__ = ("name", "type", "options")
+
+    def __init__(self, section_type: str, name: typing.Optional[str]):
+        self.type = section_type
+        self.name = name
+        self.options = collections.OrderedDict()
+
+    def export(self) -> dict:
+        data = collections.OrderedDict()
+        for option_name, value in self.options.items():
+            if isinstance(value, list) and not value:
+                continue
+            data[option_name] = value
+        return {
+            "type": self.type,
+            "name": self.name,
+            "data": data,
+            "anonymous": bool(_ANONYMOUS_RE.match(self.name)),
+        }
+
+
+class UciPackage(object):
+    """ Parsed uci config with libuci-compatible modification operations
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.sections: typing.List[UciSection] = []
+        self._by_name: typing.Dict[str, UciSection] = {}
+        self._counter = 0
+
+    def _error(self, path: str, msg: str = "Entry not found"):
+        raise UciException(["%s.%s" % (self.name, path)], msg)
+
+    def _fixup_anonymous(self, section: UciSection):
+        """ Generates a name of the anonymous section in the same way as libuci """
+        hash_value = _djbhash(0xFFFFFFFF, section.type)
+        for option_name, value in section.options.items():
+            hash_value = _djbhash(hash_value, option_name)
+            if not isinstance(value, list):
+                hash_value = _djbhash(hash_value, value)
+        section.name = "cfg%02x%04x" % (self._counter, hash_value % (1 << 16))
+        self._by_name[section.name] = section
+
+    def _append_section(self, section_type: str, name: str) -> UciSection:
+        self._counter += 1
+        section = UciSection(section_type, name)
+        self.sections.append(section)
+        if name:
+            self._by_name[name] = section
+        return section
+
+    def lookup(self, section_name: str) -> UciSection:
+        """ Finds section by its name or by extended syntax (@type[idx])
+        """
+        section = self._by_name.get(section_name)
+        if section:
+            return section
+        match = _EXTENDED_RE.match(section_name)
+        if match:
+            section_type, idx = match.group(1), int(match.group(2))
+            sections = [e for e in self.sections if not section_type or e.type == section_type]
+            try:
+                return sections[idx]
+            except IndexError:
+                pass
+        self._error(section_name)
+
+    def _set_option(self, section: UciSection, option_name: str, value: str):
+        if not _NAME_RE.match(option_name) or _INVALID_TEXT_RE.search(value):
+            self._error("%s.%s" % (section.name, option_name), "Invalid argument")
+        if not value:
+            # libuci deletes the option when an empty value is set
+            section.options.pop(option_name, None)
+        else:
+            section.options[option_name] = value
+
+    def _add_list(self, section: UciSection, option_name: str, value: str):
+        if not _NAME_RE.match(option_name) or _INVALID_TEXT_RE.search(value):
+            self._error("%s.%s" % (section.name, option_name), "Invalid argument")
+        current = section.options.get(option_name)
+        if current is None:
+            section.options[option_name] = [value]
+        elif isinstance(current, list):
+            current.append(value)
+        else:
+            section.options[option_name] = [current, value]
+
+    def set(self, section_name: str, option_name: typing.Optional[str], value: str):
+        if option_name is not None:
+            self._set_option(self.lookup(section_name), option_name, value)
+            return
+
+        if not _TYPE_RE.match(value):
+            self._error(section_name, "Invalid argument")
+        if section_name.startswith("@"):
+            section = self.lookup(section_name)
+        else:
+            section = self._by_name.get(section_name)
+        if section:
+            section.type = value
+        elif _NAME_RE.match(section_name):
+            self._append_section(value, section_name)
+        else:
+            self._error(section_name, "Invalid argument")
+
+    def add_list(self, section_name: str, option_name: str, value: str):
+        self._add_list(self.lookup(section_name), option_name, value)
+
+    def del_list(self, section_name: str, option_name: str, value: str):
+        section = self.lookup(section_name)
+        current = section.options.get(option_name)
+        # libuci ignores the command when the option is not a list
+        if isinstance(current, list):
+            section.options[option_name] = [e for e in current if e != value]
+
+    def delete(self, section_name: str, option_name: typing.Optional[str] = None):
+        section = self.lookup(section_name)
+        if option_name is None:
+            self.sections.remove(section)
+            del self._by_name[section.name]
+            return
+        if option_name not in section.options:
+            self._error("%s.%s" % (section_name, option_name))
+        del section.options[option_name]
+
+    def rename(self, section_name: str, option_name: typing.Optional[str], new_name: str):
+        section = self.lookup(section_name)
+        if option_name is None:
+            del self._by_name[section.name]
+            section.name = new_name
+            self._by_name[new_name] = section
+            return
+        if option_name not in section.options:
+            self._error("%s.%s" % (section_name, option_name))
+        section.options = collections.OrderedDict(
+            (new_name if k == option_name else k, v) for k, v in section.options.items()
+        )
+
+    def reorder(self, section_name: str, position: int):
+        section = self.lookup(section_name)
+        self.sections.remove(section)
+        self.sections.insert(position, section)
+
+    def parse(self, text: str, path: str):
+        """ Parses content of uci config file
+        """
+
+        def error(line, msg):
+            raise UciException([path], "parse error at line %d (%s)" % (line, msg))
+
+        section = None
+        for line, tokens in _tokenize(text, path):
+            keyword, args = tokens[0], tokens[1:]
+            if keyword == "package":
+                if len(args) != 1:
+                    error(line, "invalid package statement")
+
+            elif keyword == "config":
+                if section and section.name is None:
+                    self._fixup_anonymous(section)
+                if len(args) not in (1, 2) or not _TYPE_RE.match(args[0]):
+                    error(line, "invalid config statement")
+                name = args[1] if len(args) == 2 and args[1] else None
+                if name is not None and not _NAME_RE.match(name):
+                    error(line, "invalid character in name field")
+                section = self._by_name.get(name) if name else None
+                if section:
+                    section.type = args[0]
+                else:
+                    section = self._append_section(args[0], name)
+
+            elif keyword in ("option", "list"):
+                if section is None:
+                    error(line, "%s command found before the first section" % keyword)
+                if len(args) != 2:
+                    error(line, "invalid %s statement" % keyword)
+                try:
+                    if keyword == "list":
+                        self._add_list(section, *args)
+                    else:
+                        self._set_option(section, *args)
+                except UciException:
+                    error(line, "invalid character in name field")
+
+            else:
+                error(line, "invalid command '%s'" % keyword)
+
+        if section and section.name is None:
+            self._fixup_anonymous(section)
+
+    def apply_delta(self, text: str, path: str):
+        """ Applies content of uci delta file (pending changes)
+
+        Lines which can't be applied are skipped the same way as libuci does.
+        """
+        for line in text.splitlines():
+            if not line:
+                continue
+            command, line = (line[0], line[1:]) if line[0] in "-@^+|~" else ("", line)
+            try:
+                tokens = [e for _, statement in _tokenize(line, path) for e in statement]
+                if len(tokens) != 1:
+                    continue
+                target, separator, value = tokens[0].partition("=")
+                parts = target.split(".")
+                if len(parts) not in (2, 3) or parts[0] != self.name:
+                    continue
+                section_name = parts[1]
+                option_name = parts[2] if len(parts) == 3 else None
+
+                if command == "-":
+                    self.delete(section_name, option_name)
+                elif command == "@":
+                    self.rename(section_name, option_name, value)
+                elif command == "^":
+                    self.reorder(section_name, int(value))
+                elif command == "|":
+                    self.add_list(section_name, option_name, value)
+                elif command == "~":
+                    self.del_list(section_name, option_name, value)
+                elif separator:
+                    self.set(section_name, option_name, value)
+            except (UciException, ValueError) as exc:
+                logger.debug("Skipping delta line '%s' of %s (%s)", line, path, exc)
+
+    def export(self) -> typing.List[dict]:
+        return [section.export() for section in self.sections]
+
+
+def _read_file(path: str) -> typing.Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            return f.read().decode("utf-8", errors="surrogateescape")
+    except FileNotFoundError:
+        return None
+
+
+def load_package(
+    config_dir: str, config: str, delta_dirs: typing.Iterable[str] = ()
+) -> UciPackage:
+    """ Loads uci config and applies pending changes
+
+    :param config_dir: directory containing uci configs
+    :param config: name of the config
+    :param delta_dirs: directories with delta files (applied in the given order)
+    :returns: parsed config
+    :raises: UciException when the config is missing or can't be parsed
+    """
+    path = os.path.join(config_dir, config)
+    if not _PACKAGE_RE.match(config):
+        raise UciException([path], "Invalid argument")
+    content = _read_file(path)
+    if content is None:
+        raise UciException([path], "Entry not found")
+
+    package = UciPackage(config)
+    package.parse(content, path)
+    for delta_dir in delta_dirs:
+        delta_path = os.path.join(delta_dir, config)
+        delta = _read_file(delta_path)
+        if delta:
+            package.apply_delta(delta, delta_path)
+
+    return package
+
+
+def list_configs(config_dir: str) -> typing.List[str]:
+    """ Lists names of the configs in the same order as `uci export` does
+    """
+    return sorted(
+        e for e in os.listdir(config_dir)
+        if _PACKAGE_RE.match(e) and os.path.isfile(os.path.join(config_dir, e))
+    )
+
+
+def read(
+    config_dir: str, config: typing.Optional[str] = None, delta_dirs: typing.Iterable[str] = ()
+) -> dict:
+    """ Reads uci data in the same format as UciBackend.read()
+
+    :param config_dir: directory containing uci configs
+    :param config: name of the config (all configs are read if None)
+    :param delta_dirs: directories with delta files (applied in the given order)
+    :returns: {config: [section, ...]}
+    """
+    configs = [config] if config else list_configs(config_dir)
+    return {e: load_package(config_dir, e, delta_dirs).export() for e in configs}
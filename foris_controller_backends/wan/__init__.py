@@ -41,13 +41,10 @@ class WanUci:
     _LNAME = "wan_limit_turris"
 
     def get_settings(self):
-        with UciBackend() as backend:
-            network_data = backend.read("network")
-            sqm_data = backend.read("sqm")
-            try:
-                wireless_data = backend.read("wireless")
-            except UciException:
-                wireless_data = {}
+        with UciBackend(readonly=True) as backend:
+            network_data, sqm_data, wireless_data = backend.read_many(
+                ["network", "sqm", "wireless"], optional=["wireless"]
+            )
 
         # WAN
         wan_settings = {}
@@ -184,7 +181,7 @@ class WanUci:
         return get_option_named(network_data, "network", "wan", "macaddr", "")
 
     def update_settings(self, wan_settings, wan6_settings, mac_settings, qos=None, vlan_settings=None):
-        with UciBackend() as backend:
+        with UciBackend(configs=["firewall", "network", "resolver", "sqm"]) as backend:
 
             # WAN
             wan_type = wan_settings["wan_type"]
@@ -404,7 +401,7 @@ class WanUci:
 
         :returns: True if wan configuration was changed
         """
-        with UciBackend() as backend:
+        with UciBackend(readonly=True) as backend:
             network_data = backend.read("network")
             wan_proto = get_option_named(network_data, "network", "wan", "proto")
             wan_device = get_option_named(network_data, "network", "wan", "device", "")
@@ -436,27 +433,42 @@ class WanTestCommands(AsyncCommand):
         "dns": ["IP4GATE", "IP4", "IP6GATE", "IP6", "DNS", "DNSSEC"],  # IP has to be working
     }
 
-    def connection_test_status(self, process_id):
+    def connection_test_status(self, process_id, offset=0, wait_for_change=False, timeout=None):
         """ Get the status of some connection test
         :param process_id: test process identifier
         :type process_id: str
+        :param offset: only records after the offset are taken into account
+        :type offset: int
+        :param wait_for_change: wait till there are new records or the test finishes
+        :type wait_for_change: bool
+        :param timeout: max time to wait for the change in seconds
+        :type timeout: float
         :returns: data about test process
         :rtype: dict
         """
 
-        with self.lock.readlock:
-            if process_id not in self.processes:
-                return {"status": "not_found"}
-            process_data = self.processes[process_id]
+        process_data = self.get_process_data(process_id)
+        if not process_data:
+            return {"status": "not_found"}
 
+        if wait_for_change:
+            process_data.wait_for_change(offset, timeout)
+
+        # all records are stored before the process is marked as exited
         exited = process_data.get_exited()
+        records, next_offset = process_data.read_data(offset)
 
-        data = {e: False for e in WanTestCommands.FIELDS} if exited else {}
-        for record in process_data.read_all_data():
+        # missing results are filled only when the whole test is returned
+        data = {e: False for e in WanTestCommands.FIELDS} if exited and offset == 0 else {}
+        for record in records:
             for option, res in record["data"].items():
                 data[option] = res or data.get(option, False)
 
-        return {"status": "finished" if process_data.get_exited() else "running", "data": data}
+        return {
+            "status": "finished" if exited else "running",
+            "data": data,
+            "offset": next_offset,
+        }
 
     def connection_test_trigger(
         self, test_kinds, notify_function, exit_notify_function, reset_notify_function
@@ -512,7 +524,7 @@ class WanTestCommands(AsyncCommand):
             cmd_line_kinds.extend(self.TEST_KIND_MAP[kind])
 
         process_id = self.start_process(
-            ["/sbin/check_connection"] + list(set(cmd_line_kinds)),
+            ["/sbin/check_connection"] + sorted(set(cmd_line_kinds)),
             [
                 handler_gen(r"^IPv6: (\w+)", "ipv6"),
                 handler_gen(r"^IPv6 Gateway: (\w+)", "ipv6_gateway"),
@@ -523,6 +535,7 @@ class WanTestCommands(AsyncCommand):
             ],
             handler_exit,
             reset_notify_function,
+            single_flight=True,
         )
 
         logger.debug("Connection test started '%s'." % process_id)
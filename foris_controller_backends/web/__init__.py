@@ -55,7 +55,7 @@ class WebUciCommands:
         if language not in Languages.list_languages():
             return False
 
-        with UciBackend() as backend:
+        with UciBackend(configs=["foris", "luci"]) as backend:
             backend.add_section("foris", "config", "settings")
             backend.set_option("foris", "settings", "lang", language)
             # try to update LUCI as well (best effort)
@@ -166,7 +166,7 @@ class WebUciCommands:
         return True
 
     def get_data(self):
-        with UciBackend() as backend:
+        with UciBackend(readonly=True) as backend:
             data = backend.read("foris")
 
         return {
@@ -193,7 +193,7 @@ class WebUciCommands:
                 backend.set_option("foris", "wizard", "finished", store_bool(True))
 
     def get_guide(self):
-        with UciBackend() as backend:
+        with UciBackend(readonly=True) as backend:
             data = backend.read("foris")
         current_workflow = get_option_named(
             data, "foris", "wizard", "workflow", WebUciCommands._detect_basic_workflow()
@@ -324,7 +324,7 @@ config wifi-device 'radio0'
         """
         devices = []
         try:
-            with UciBackend() as backend:
+            with UciBackend(readonly=True) as backend:
                 data = backend.read("wireless")
             device_sections = self._get_device_sections(data)
             for device_section in device_sections:
@@ -459,7 +459,9 @@ config wifi-device 'radio0'
         "rtype: bool
         """
         try:
-            with UciBackend() as backend:
+            with UciBackend(
+                configs=["dhcp", "firewall", "network", "sqm", "system", "wireless"]
+            ) as backend:
                 data = backend.read("wireless")  # data were read to find corresponding sections
                 device_sections = self._get_device_sections(data)
 
@@ -33,7 +33,27 @@ class IntrospectModule(BaseModule):
         """
         return {"modules": self.handler.list_modules()}
 
+    def action_get_command_stats(self, data):
+        """
+        :param data: supposed to be {} or {'reset': True/False}
+        :type data: dict
+        :returns: execution metrics of external commands and command queue state
+                  (of this process only, other modules run in separate processes on ubus)
+        :rtype: dict
+        """
+        return self.handler.get_command_stats(data.get("reset", False))
+
+    def action_get_uci_stats(self, data):
+        """
+        :param data: supposed to be {}
+        :type data: dict
+        :returns: counters of uci config reloads and of the uci config cache
+                  (of this process only, other modules run in separate processes on ubus)
+        :rtype: dict
+        """
+        return self.handler.get_uci_stats()
+
 
-@wrap_required_functions(["list_modules"])
+@wrap_required_functions(["list_modules", "get_command_stats", "get_uci_stats"])
 class Handler:
     pass
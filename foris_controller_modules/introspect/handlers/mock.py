@@ -52,3 +52,41 @@ class MockIntrospectHandler(Handler, BaseMockHandler):
     @logger_wrapper(logger)
     def list_modules():
         return FORIS_CONTROLLER_MODULES
+
+    @staticmethod
+    @logger_wrapper(logger)
+    def get_command_stats(reset):
+        priority = {"executed": 0, "queued": 0, "wait_total": 0.0, "wait_max": 0.0}
+        return {
+            "commands": [
+                {
+                    "command": "uci",
+                    "count": 10,
+                    "failures": 1,
+                    "duration_total": 0.1,
+                    "duration_max": 0.03,
+                    "duration_p50": 0.005,
+                    "duration_p90": 0.02,
+                    "duration_p99": 0.03,
+                    "stdout_bytes": 10240,
+                }
+            ],
+            "queue": {
+                "limit": 4,
+                "running": 0,
+                "queued": 0,
+                "priorities": {
+                    "interactive": dict(priority, executed=8),
+                    "default": dict(priority, executed=2),
+                    "background": dict(priority),
+                },
+            },
+        }
+
+    @staticmethod
+    @logger_wrapper(logger)
+    def get_uci_stats():
+        return {
+            "reload": {"requested": 5, "coalesced": 0, "executed": 5, "pending": False},
+            "cache": {"entries": 3, "hits": 20, "misses": 4, "invalidations": 1},
+        }
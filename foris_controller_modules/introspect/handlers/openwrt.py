@@ -22,6 +22,8 @@ import logging
 from foris_controller.app import app_info
 from foris_controller.handler_base import BaseOpenwrtHandler
 from foris_controller.utils import get_modules, logger_wrapper
+from foris_controller_backends.cmdline import command_stats, governor
+from foris_controller_backends.uci import UciBackend
 
 from .. import Handler
 
@@ -35,3 +37,15 @@ class OpenwrtIntrospectHandler(Handler, BaseOpenwrtHandler):
         modules = get_modules(app_info["filter_modules"], app_info["extra_module_paths"])
 
         return [mod[0] for mod in modules]
+
+    @staticmethod
+    @logger_wrapper(logger)
+    def get_command_stats(reset):
+        # metrics are kept in memory of each process (incomplete on ubus)
+        return {"commands": command_stats.stats(reset), "queue": governor.stats(reset)}
+
+    @staticmethod
+    @logger_wrapper(logger)
+    def get_uci_stats():
+        # counters are kept in memory of each process (incomplete on ubus)
+        return {"reload": UciBackend.reload_stats(), "cache": UciBackend.cache_stats()}
@@ -19,6 +19,7 @@
 
 import logging
 
+from foris_controller.app import app_info
 from foris_controller.module_base import BaseModule
 from foris_controller.handler_base import wrap_required_functions
 
@@ -26,6 +27,12 @@ from foris_controller.handler_base import wrap_required_functions
 class WanModule(BaseModule):
     logger = logging.getLogger(__name__)
 
+    # default time limit for connection_test_status with wait_for_change (in seconds)
+    # it is kept short because the waiting request occupies a worker of the bus
+    STATUS_WAIT_TIMEOUT = 5
+    # buses which process requests of a module one by one (waiting would block other requests)
+    STATUS_WAIT_BLOCKING_BUSES = ["ubus"]
+
     def action_get_settings(self, data):
         """ Get current wan settings
         :param data: supposed to be {}
@@ -75,12 +82,23 @@ class WanModule(BaseModule):
 
     def action_connection_test_status(self, data):
         """ Reads connection test data
-        :param data: supposed to be {'test_id': 'xxxx'}
+        :param data: supposed to be {'test_id': 'xxxx'} (optionally 'offset', 'wait_for_change'
+                     and 'timeout')
         :type data: dict
-        :returns: data about connection test {'status': 'xxxx', 'data': {...}}
+        :returns: data about connection test {'status': 'xxxx', 'data': {...}, 'offset': n}
         :rtype: dict
         """
-        return self.handler.connection_test_status(data["test_id"])
+        # the current status is returned right away when waiting would block the bus
+        wait_for_change = data.get("wait_for_change", False)
+        if app_info["bus"] in self.STATUS_WAIT_BLOCKING_BUSES:
+            wait_for_change = False
+
+        return self.handler.connection_test_status(
+            data["test_id"],
+            data.get("offset", 0),
+            wait_for_change,
+            data.get("timeout", self.STATUS_WAIT_TIMEOUT),
+        )
 
     def action_get_wan_status(self, data):
         """ Obtains info regarding wan interface status
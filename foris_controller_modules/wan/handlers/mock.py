@@ -230,15 +230,22 @@ class MockWanHandler(Handler, BaseMockHandler):
         return new_test_id
 
     @logger_wrapper(logger)
-    def connection_test_status(self, test_id):
+    def connection_test_status(self, test_id, offset=0, wait_for_change=False, timeout=None):
         """ Mocks connection test status
         :param test_id: id of the test to display
         :type test_id: str
+        :param offset: only records after the offset are returned
+        :type offset: int
+        :param wait_for_change: wait till there are new records or the test finishes
+        :type wait_for_change: bool
+        :param timeout: max time to wait in seconds
+        :type timeout: float
         :returns: connection test status + test data
         :rtype: dict
         """
         if test_id in MockWanHandler.test_id_set:
-            return {"status": "running", "data": {"ipv4": "OK", "ipv6": "FAILED"}}
+            data = {"ipv4": "OK", "ipv6": "FAILED"} if offset < 2 else {}
+            return {"status": "running", "data": data, "offset": 2}
         else:
             return {"status": "not_found"}
 
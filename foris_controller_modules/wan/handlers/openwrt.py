@@ -76,14 +76,22 @@ class OpenwrtWanHandler(Handler, BaseOpenwrtHandler):
         )
 
     @logger_wrapper(logger)
-    def connection_test_status(self, test_id):
+    def connection_test_status(self, test_id, offset=0, wait_for_change=False, timeout=None):
         """ Connection test status
         :param test_id: id of the test to display
         :type test_id: str
+        :param offset: only records after the offset are returned
+        :type offset: int
+        :param wait_for_change: wait till there are new records or the test finishes
+        :type wait_for_change: bool
+        :param timeout: max time to wait in seconds
+        :type timeout: float
         :returns: connection test status + test data
         :rtype: dict
         """
-        return OpenwrtWanHandler.test_cmds.connection_test_status(test_id)
+        return OpenwrtWanHandler.test_cmds.connection_test_status(
+            test_id, offset, wait_for_change, timeout
+        )
 
     @logger_wrapper(logger)
     def get_wan_status(self):
@@ -0,0 +1,123 @@
+#
+# foris-controller
+# Copyright (C) 2026 CZ.NIC, z.s.p.o. (http://www.nic.cz/)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+#
+
+""" Compares handle_command with the former Popen + TemporaryFile implementation
+and with handle_command routed through the launcher process
+
+Both implementations are measured with a small and with a large parent process
+(--ballast MiB of allocated memory) to show the cost of copying the parent on fork.
+Each measurement runs in a separate interpreter.
+
+Usage: python -m tests.benchmarks.bench_handle_command [--count 500] [--ballast 256]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+from tempfile import TemporaryFile
+
+from foris_controller.app import app_info
+from foris_controller.launcher import Launcher
+
+app_info.setdefault("lock_backend", threading)
+
+from foris_controller_backends.cmdline import handle_command  # noqa: E402
+
+
+def legacy_handle_command(*args, **kwargs):
+    with TemporaryFile() as stdout, TemporaryFile() as stderr:
+        popen_kwargs = {"stdout": stdout, "stderr": stderr}
+        input_data = kwargs.pop("input_data", None)
+        if input_data is not None:
+            popen_kwargs["stdin"] = subprocess.PIPE
+        env = dict(os.environ)
+        env.update(kwargs.get("env", {}))
+        popen_kwargs["env"] = env
+        process = subprocess.Popen(args, **popen_kwargs)
+        process.communicate(input_data)
+        stdout.seek(0)
+        stdout = stdout.read()
+        stderr.seek(0)
+        stderr = stderr.read()
+    return process.returncode, stdout, stderr
+
+
+def measure(function, count):
+    start = time.monotonic()
+    for _ in range(count):
+        function("true")
+        function("cat", input_data=b"data\n")
+    return count * 2 / (time.monotonic() - start)
+
+
+def worker(implementation, count, ballast_size):
+    """ Runs in a separate interpreter so that the resource usage is not mixed """
+    if implementation == "launcher":
+        Launcher.start()
+    ballast = bytearray(ballast_size * 1024 * 1024)
+    for idx in range(0, len(ballast), 4096):
+        ballast[idx] = 1  # make sure that pages are really allocated
+
+    function = legacy_handle_command if implementation == "legacy" else handle_command
+    rate = measure(function, count)
+    print(
+        json.dumps(
+            {
+                "rate": rate,
+                "parent_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024,
+                "children_rss": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // 1024,
+            }
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--ballast", type=int, default=256, help="MiB")
+    parser.add_argument(
+        "--worker", choices=["legacy", "current", "launcher"], help=argparse.SUPPRESS
+    )
+    options = parser.parse_args()
+
+    if options.worker:
+        worker(options.worker, options.count, options.ballast)
+        return
+
+    for ballast in (0, options.ballast):
+        for implementation in ("legacy", "current", "launcher"):
+            output = subprocess.check_output(
+                [sys.executable, "-m", __spec__.name, "--worker", implementation]
+                + ["--count", str(options.count), "--ballast", str(ballast)]
+            )
+            res = json.loads(output)
+            print(
+                "%-8s parent RSS %4d MiB  %6.0f commands/s  max RSS of children %4d MiB"
+                % (implementation, res["parent_rss"], res["rate"], res["children_rss"])
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#
+# foris-controller
+# Copyright (C) 2026 CZ.NIC, z.s.p.o. (http://www.nic.cz/)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+#
+""" Compares routing of incoming MQTT topics using a chain of re.match() calls (as done
+previously in MqttListener.on_message) with TopicDispatcher
+
+Usage: python -m tests.benchmarks.bench_mqtt_dispatch [--number 100000]
+"""
+
+import argparse
+import re
+import threading
+import timeit
+
+from foris_controller.app import app_info
+
+app_info.setdefault("lock_backend", threading)
+
+from foris_controller.buses.mqtt import Endpoint, TopicDispatcher  # noqa: E402
+
+CONTROLLER_ID = "0000000000000001"
+
+TOPICS = [
+    f"foris-controller/{CONTROLLER_ID}/request/about/action/get",
+    f"foris-controller/{CONTROLLER_ID}/request/wan/list",
+    f"foris-controller/{CONTROLLER_ID}/working_replies",
+    f"foris-controller/{CONTROLLER_ID}/list",
+]
+
+
+def route_regex(topic):
+    res = None
+    match = re.match(r"^foris-controller/[^/]+/list$", topic)
+    if match:
+        res = ("list",)
+    match = re.match(r"^foris-controller/[^/]+/jsonschemas$", topic)
+    if match:
+        res = ("jsonschemas",)
+    match = re.match(r"^foris-controller/[^/]+/request/([^/]+)/list$", topic)
+    if match:
+        res = ("module_list", match.group(1))
+    match = re.match(r"^foris-controller/[^/]+/working_replies$", topic)
+    if match:
+        res = ("working_replies",)
+    match = re.match(r"^foris-controller/[^/]+/worker_stats$", topic)
+    if match:
+        res = ("worker_stats",)
+    match = re.match(r"^foris-controller/[^/]+/request/([^/]+)/action/([^/]+)$", topic)
+    if match:
+        res = ("action",) + match.group(1, 2)
+    return res
+
+
+def make_dispatcher():
+    dispatcher = TopicDispatcher(CONTROLLER_ID)
+    for name in ["list", "working_replies", "worker_stats", "jsonschemas"]:
+        dispatcher.add(name, Endpoint(lambda parsed: None))
+    dispatcher.add_module_endpoint("list", Endpoint(lambda parsed, module: None))
+    dispatcher.set_action_endpoint(Endpoint(lambda parsed, module, action: None, in_worker=True))
+    return dispatcher
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    dispatcher = make_dispatcher()
+    for name, route in [("re.match", route_regex), ("dispatcher", dispatcher.resolve)]:
+        print(name)
+        for topic in TOPICS:
+            result = min(
+                timeit.repeat(
+                    lambda: route(topic), number=options.number, repeat=options.repeat
+                )
+            )
+            print("  %-60s %8.0f ns" % (topic, result / options.number * 1e9))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#
+# foris-controller
+# Copyright (C) 2026 CZ.NIC, z.s.p.o. (http://www.nic.cz/)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+#
+
+""" Compares publishing MQTT replies via paho.mqtt.publish.single() (a new connection
+for each message) with the persistent MqttReplyPublisher
+
+Each retained reply consists of the reply itself (qos=0) and of the message which clears
+the retained reply (qos=2). MQTT v5 replies (sent to the Response Topic) consist of a single
+non-retained qos=1 message. A minimal MQTT broker stand-in (tests/mqtt_broker.py) is started
+locally.
+
+Usage: python -m tests.benchmarks.bench_mqtt_reply [--count 300] [--threads 1,8]
+"""
+
+import argparse
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from paho.mqtt.client import MQTTv5
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+from paho.mqtt.publish import single
+
+from foris_controller.app import app_info
+
+app_info.setdefault("lock_backend", threading)
+app_info.setdefault("mqtt_credentials", None)
+
+from foris_controller.buses.mqtt import MqttReplyPublisher, reply_options  # noqa: E402
+from tests.mqtt_broker import Broker  # noqa: E402
+
+def reply_single(host, port, topic):
+    single(topic, payload='{"result": true}', qos=0, retain=True, hostname=host, port=port)
+    single(topic, payload="", qos=2, retain=True, hostname=host, port=port)
+
+
+def measure(reply, count, threads):
+    start = time.monotonic()
+    with ThreadPoolExecutor(threads) as executor:
+        for future in [
+            executor.submit(reply, f"foris-controller/bench/reply/{idx}") for idx in range(count)
+        ]:
+            future.result()
+    return count / (time.monotonic() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=300)
+    parser.add_argument("--threads", default="1,8")
+    options = parser.parse_args()
+
+    broker = Broker()
+    threading.Thread(target=broker.serve_forever, daemon=True).start()
+    host, port = broker.server_address
+
+    publisher = MqttReplyPublisher(host, port, None)
+    publisher_v5 = MqttReplyPublisher(host, port, None, MQTTv5)
+
+    def reply_persistent(topic):
+        publisher.publish(topic, '{"result": true}', qos=0, retain=True)
+        publisher.publish(topic, "", qos=2, retain=True)
+
+    def reply_v5(topic):
+        properties = Properties(PacketTypes.PUBLISH)
+        properties.CorrelationData = topic.encode()
+        publisher_v5.publish(topic, '{"result": true}', **reply_options(properties))
+
+    for threads in [int(e) for e in options.threads.split(",")]:
+        for name, reply in [
+            ("single()", lambda topic: reply_single(host, port, topic)),
+            ("persistent", reply_persistent),
+            ("v5", reply_v5),
+        ]:
+            published = broker.published
+            rate = measure(reply, options.count, threads)
+            print(
+                "%-10s threads=%-2d %8.0f replies/s %6.1f messages/reply"
+                % (name, threads, rate, (broker.published - published) / options.count)
+            )
+
+    publisher.disconnect()
+    publisher_v5.disconnect()
+    broker.shutdown()
+    print("messages received by the broker: %d" % broker.published)
+
+
+if __name__ == "__main__":
+    main()
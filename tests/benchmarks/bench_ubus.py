@@ -0,0 +1,85 @@
+#
+# foris-controller
+# Copyright (C) 2026 CZ.NIC, z.s.p.o. (http://www.nic.cz/)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+#
+
+""" Compares UbusBackend.call_ubus via the ubus executable with the persistent
+in-process connection (python-ubus)
+
+The native part requires python-ubus and a running ubusd, it is skipped otherwise.
+`--ubus-cmd` may point to a stand-in executable (e.g. tests/blackbox/test_root/bin/ubus-cli.py)
+to measure the executable path on a machine without ubus.
+
+Usage: python -m tests.benchmarks.bench_ubus [--count 500] [--object system] [--method board]
+                                              [--data '{}'] [--ubus-cmd /bin/ubus]
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+
+from foris_controller.app import app_info
+
+app_info.setdefault("lock_backend", threading)
+app_info.setdefault("bus", "unix-socket")
+
+from foris_controller_backends.ubus import UbusBackend, UbusClient  # noqa: E402
+
+
+def measure(count, ubus_object, method, data):
+    result = UbusBackend.call_ubus(ubus_object, method, data)  # warm up (connect)
+    start = time.monotonic()
+    for _ in range(count):
+        UbusBackend.call_ubus(ubus_object, method, data)
+    return count / (time.monotonic() - start), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--object", default="system")
+    parser.add_argument("--method", default="board")
+    parser.add_argument("--data", type=json.loads, default=None)
+    parser.add_argument("--ubus-cmd", default=UbusBackend.UBUS_CMD)
+    options = parser.parse_args()
+
+    UbusBackend.UBUS_CMD = options.ubus_cmd
+    call = (options.count, options.object, options.method, options.data)
+
+    os.environ["FC_UBUS_NATIVE"] = "0"
+    rate, cli_result = measure(*call)
+    print("executable %8.0f calls/s  (%.3f ms/call)" % (rate, 1000 / rate))
+
+    os.environ["FC_UBUS_NATIVE"] = "1"
+    if not UbusClient.available():
+        print("native     skipped (python-ubus is not available)")
+        return
+    try:
+        UbusClient.call(options.object, options.method, options.data)
+    except (IOError, RuntimeError) as e:
+        print("native     skipped (unable to connect to ubus: %s)" % e)
+        return
+    rate, native_result = measure(*call)
+    print("native     %8.0f calls/s  (%.3f ms/call)" % (rate, 1000 / rate))
+    if native_result != cli_result:
+        print("WARNING: results differ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#
+# foris-controller
+# Copyright (C) 2026 CZ.NIC, z.s.p.o. (http://www.nic.cz/)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+#
+
+""" Compares section lookups in plain lists and in indexed UciConfig
+
+Usage: python -m tests.benchmarks.bench_uci_config [--sections 5000]
+"""
+
+import argparse
+import collections
+import threading
+import timeit
+
+from foris_controller.app import app_info
+
+app_info.setdefault("lock_backend", threading)
+
+from foris_controller_backends.uci import (  # noqa: E402
+    UciConfig,
+    get_option_named,
+    get_section,
+    get_sections_by_type,
+)
+
+
+def make_sections(count):
+    sections = []
+    for idx in range(count):
+        if idx % 2:
+            section_type, name, anonymous = "host", "cfg%06x" % idx, True
+        else:
+            section_type, name, anonymous = "redirect", "redirect_%d" % idx, False
+        ip = "10.%d.%d.%d" % (idx >> 16, idx >> 8 & 255, idx & 255)
+        data = collections.OrderedDict([("name", "host%d" % idx), ("ip", ip)])
+        sections.append({"type": section_type, "name": name, "data": data, "anonymous": anonymous})
+    return sections
+
+
+def lookups(data, names):
+    for name in names:
+        get_section(data, "dhcp", name)
+        get_option_named(data, "dhcp", name, "ip")
+        get_sections_by_type(data, "dhcp", "host")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sections", type=int, default=5000)
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    sections = make_sections(options.sections)
+    names = [e["name"] for e in sections if not e["anonymous"]][-options.lookups:]
+
+    results = {}
+    for kind, config_class in (("list", list), ("UciConfig", UciConfig)):
+        # new object is created each time (indexes are built within the measured time)
+        results[kind] = min(
+            timeit.repeat(
+                lambda: lookups({"dhcp": config_class(sections)}, names),
+                number=1,
+                repeat=options.repeat,
+            )
+        )
+        print("%-10s %8.2f ms" % (kind, results[kind] * 1000))
+
+    print("speedup    %8.1fx" % (results["list"] / results["UciConfig"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#
+# foris-controller
+# Copyright (C) 2026 CZ.NIC, z.s.p.o. (http://www.nic.cz/)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+#
+
+""" Measures parsing of `uci export` output of large firewall and dhcp configs
+
+Usage: python -m tests.benchmarks.bench_uci_export [--sections 2000] [--export-file FILE]
+(FILE can be obtained using e.g. `uci -n export > FILE` on the router)
+"""
+
+import argparse
+import threading
+import timeit
+
+from foris_controller.app import app_info
+
+app_info.setdefault("lock_backend", threading)
+
+from foris_controller_backends.uci import UciBackend  # noqa: E402
+
+
+def make_export(count):
+    lines = ["package firewall", ""]
+    for idx in range(count):
+        lines += [
+            "config redirect 'cfg%06x'" % idx,
+            "\toption name 'Forward port %d'" % idx,
+            "\toption src 'wan'",
+            "\toption dest 'lan'",
+            "\toption proto 'tcp udp'",
+            "\toption src_dport '%d'" % (1024 + idx),
+            "\toption dest_ip '192.168.%d.%d'" % (idx >> 8 & 255, idx & 255),
+            "\toption dest_port '%d'" % (1024 + idx),
+            "\toption target 'DNAT'",
+            "\toption comment 'Mike'\\''s \"server\"'",
+            "",
+        ]
+    lines += ["package dhcp", ""]
+    for idx in range(count):
+        lines += [
+            "config host 'cfg%06x'" % idx,
+            "\toption name 'host-%d'" % idx,
+            "\toption mac '00:11:22:33:%02x:%02x'" % (idx >> 8 & 255, idx & 255),
+            "\toption ip '10.0.%d.%d'" % (idx >> 8 & 255, idx & 255),
+            "\tlist tag 'known'",
+            "\tlist tag 'static'",
+            "",
+        ]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sections", type=int, default=2000)
+    parser.add_argument("--export-file", default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    if options.export_file:
+        with open(options.export_file) as f:
+            output = f.read()
+    else:
+        output = make_export(options.sections)
+
+    backend = UciBackend("/nonexisting")
+    lines = output.splitlines()
+    parsed = backend._parse_packages(lines)
+    result = min(
+        timeit.repeat(
+            lambda: backend._parse_packages(lines), number=1, repeat=options.repeat
+        )
+    )
+    print("lines      %8d" % len(lines))
+    print("sections   %8d" % sum(len(e) for e in parsed.values()))
+    print("parse      %8.2f ms" % (result * 1000))
+    print("throughput %8.0f lines/s" % (len(lines) / result))
+
+
+if __name__ == "__main__":
+    main()
@@ -30,3 +30,32 @@ def test_list_modules(infrastructure):
     assert "error" not in res
     assert "data" in res
     assert isinstance(res["data"]["modules"], list)
+
+
+def test_get_command_stats(infrastructure):
+    res = infrastructure.process_message(
+        {"module": "introspect", "action": "get_command_stats", "kind": "request"}
+    )
+    assert "error" not in res
+    assert isinstance(res["data"]["commands"], list)
+    assert set(res["data"]["queue"]["priorities"]) == {"interactive", "default", "background"}
+
+    res = infrastructure.process_message(
+        {
+            "module": "introspect",
+            "action": "get_command_stats",
+            "kind": "request",
+            "data": {"reset": True},
+        }
+    )
+    assert "error" not in res
+    assert "commands" in res["data"]
+
+
+def test_get_uci_stats(infrastructure):
+    res = infrastructure.process_message(
+        {"module": "introspect", "action": "get_uci_stats", "kind": "request"}
+    )
+    assert "error" not in res
+    assert set(res["data"]["reload"]) == {"requested", "coalesced", "executed", "pending"}
+    assert set(res["data"]["cache"]) == {"entries", "hits", "misses", "invalidations"}
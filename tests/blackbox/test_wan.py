@@ -18,6 +18,8 @@
 #
 
 import os
+import threading
+import time
 
 import pytest
 from foris_controller_testtools.fixtures import UCI_CONFIG_DIR_PATH
@@ -1578,6 +1580,89 @@ def _connection_test(infrastructure, test_kind, expected):
     return True
 
 
+@pytest.mark.parametrize("check_connection_mock", ["success"], indirect=True)
+@pytest.mark.only_backends(["openwrt"])
+def test_connection_test_openwrt_wait_for_change(
+    check_connection_mock, uci_configs_init, infrastructure
+):
+    res = infrastructure.process_message(
+        {
+            "module": "wan",
+            "action": "connection_test_trigger",
+            "kind": "request",
+            "data": {"test_kinds": ["dns"]}
+        }
+    )
+    test_id = res["data"]["test_id"]
+
+    data = {}
+    offset = 0
+    status = None
+    while status != "finished":
+        res = infrastructure.process_message(
+            {
+                "module": "wan",
+                "action": "connection_test_status",
+                "kind": "request",
+                "data": {
+                    "test_id": test_id,
+                    "offset": offset,
+                    "wait_for_change": True,
+                    "timeout": 5,
+                },
+            }
+        )
+        assert res["data"]["offset"] >= offset
+        offset = res["data"]["offset"]
+        status = res["data"]["status"]
+        data.update(res["data"]["data"])
+
+    assert data["dns"] == "OK"
+
+
+@pytest.mark.parametrize("check_connection_mock", ["success"], indirect=True)
+@pytest.mark.only_backends(["openwrt"])
+def test_connection_test_openwrt_wait_for_change_not_blocking(
+    check_connection_mock, uci_configs_init, infrastructure
+):
+    res = infrastructure.process_message(
+        {
+            "module": "wan",
+            "action": "connection_test_trigger",
+            "kind": "request",
+            "data": {"test_kinds": ["dns"]}
+        }
+    )
+    test_id = res["data"]["test_id"]
+
+    long_poll = {}
+
+    def wait():
+        long_poll["res"] = infrastructure.process_message(
+            {
+                "module": "wan",
+                "action": "connection_test_status",
+                "kind": "request",
+                "data": {"test_id": test_id, "wait_for_change": True, "timeout": 5},
+            }
+        )
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+    time.sleep(0.5)
+
+    # the first results of the test are available after ~2 seconds
+    start = time.monotonic()
+    res = infrastructure.process_message(
+        {"module": "wan", "action": "get_wan_status", "kind": "request"}
+    )
+    assert time.monotonic() - start < 1.0
+    assert "errors" not in res
+
+    thread.join()
+    assert long_poll["res"]["data"]["status"] in ["running", "finished"]
+
+
 @pytest.mark.parametrize("check_connection_mock", ["success"], indirect=True)
 @pytest.mark.only_backends(["openwrt"])
 def test_connection_test_openwrt_ok(check_connection_mock, uci_configs_init, infrastructure):
@@ -0,0 +1,110 @@
+#
+# foris-controller
+# Copyright (C) 2026 CZ.NIC, z.s.p.o. (http://www.nic.cz/)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+#
+
+""" Minimal MQTT broker stand-in which is used in tests and benchmarks
+
+It accepts connections and publishes (MQTT v3.1.1 and v5) but it doesn't route messages anywhere.
+"""
+
+import socket
+import socketserver
+import struct
+import threading
+
+CONNECT, PUBLISH, PUBREL, SUBSCRIBE, PINGREQ, DISCONNECT = 1, 3, 6, 8, 12, 14
+
+
+class BrokerHandler(socketserver.BaseRequestHandler):
+    """ Accepts connections and publishes, it doesn't route messages anywhere """
+
+    def recv_exact(self, size):
+        data = b""
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                raise EOFError()
+            data += chunk
+        return data
+
+    def read_packet(self):
+        header = self.recv_exact(1)[0]
+        length, shift = 0, 0
+        while True:
+            byte = self.recv_exact(1)[0]
+            length += (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                break
+        return header >> 4, header & 0x0F, self.recv_exact(length)
+
+    def handle(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.lock:
+            self.server.clients.add(self.request)
+        try:
+            while True:
+                kind, flags, body = self.read_packet()
+                if kind == CONNECT:
+                    with self.server.lock:
+                        self.server.connects += 1
+                    if body[6] == 5:  # protocol level of MQTT v5 (empty properties)
+                        self.request.sendall(b"\x20\x03\x00\x00\x00")
+                    else:
+                        self.request.sendall(b"\x20\x02\x00\x00")
+                elif kind == PUBLISH:
+                    topic_length = struct.unpack("!H", body[:2])[0]
+                    with self.server.lock:
+                        self.server.published += 1
+                        self.server.topics.append(body[2:2 + topic_length].decode())
+                    qos = (flags >> 1) & 0x03
+                    if qos:
+                        packet_id = body[2 + topic_length:4 + topic_length]
+                        self.request.sendall((b"\x40\x02" if qos == 1 else b"\x50\x02") + packet_id)
+                elif kind == PUBREL:
+                    self.request.sendall(b"\x70\x02" + body[:2])
+                elif kind == SUBSCRIBE:
+                    self.request.sendall(b"\x90\x03" + body[:2] + b"\x00")
+                elif kind == PINGREQ:
+                    self.request.sendall(b"\xd0\x00")
+                elif kind == DISCONNECT:
+                    return
+        except (EOFError, OSError):
+            pass
+        finally:
+            with self.server.lock:
+                self.server.clients.discard(self.request)
+
+
+class Broker(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), BrokerHandler)
+        self.lock = threading.Lock()
+        self.clients = set()
+        self.connects = 0
+        self.published = 0
+        self.topics = []
+
+    def drop_clients(self):
+        """ Closes connections of all clients (e.g. as restarted broker does) """
+        with self.lock:
+            for client in self.clients:
+                client.shutdown(socket.SHUT_RDWR)
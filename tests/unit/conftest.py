@@ -19,6 +19,9 @@
 
 import os
 import pytest
+import threading
+
+from tests.mqtt_broker import Broker
 
 
 @pytest.fixture(scope="session")
@@ -30,3 +33,12 @@ def uci_config_default_path():
 def file_root():
     # default src dirctory will be the same as for the scripts  (could be override later)
     return os.path.join(os.path.dirname(os.path.realpath(__file__)), "test_root")
+
+
+@pytest.fixture
+def mqtt_broker():
+    broker = Broker()
+    threading.Thread(target=broker.serve_forever, daemon=True).start()
+    yield broker
+    broker.shutdown()
+    broker.server_close()
@@ -39,11 +39,12 @@ def get_data(old_data=None):
     return last_data
 
 
-@pytest.fixture(scope="function")
-def async_infrastructure(lock_backend):
+@pytest.fixture(params=["ubus", "unix-socket"], scope="function")
+def async_infrastructure(request, lock_backend):
     from foris_controller.app import app_info
 
     app_info["lock_backend"] = lock_backend
+    app_info["bus"] = request.param
 
     os.environ["FORIS_CMDLINE_ROOT"] = os.path.join(
         os.path.dirname(os.path.realpath(__file__)), "test_root"
@@ -67,6 +68,8 @@ def async_infrastructure(lock_backend):
 
         yield notify, AsyncCommand
 
+    del app_info["bus"]
+
     for path in [NOTIFICATION_PATH, RESET_PATH]:
         try:
             os.unlink(path)
@@ -133,5 +136,120 @@ def test_async_complex(async_infrastructure):
     assert data[3] == "%s: exited 10" % cmd_id
 
     assert command.read_data(cmd_id) == ("finished", 10, ["11", "22", "33"])
+    assert command.processes[cmd_id].read_data(1) == (["22", "33"], 3)
+    assert command.processes[cmd_id].read_data(3) == ([], 3)
+
+    # notification connection is reset only in a separate process
+    assert os.path.exists(RESET_PATH) == (not AsyncCommand._use_threads())
+
+
+def test_async_single_flight(async_infrastructure):
+    notify, AsyncCommand = async_infrastructure
+
+    class TestCommand(AsyncCommand):
+        def start(self, retval):
+            def exit_handler(process_data):
+                notify("%s: exited %d" % (process_data.id, process_data.get_retval()))
+
+            return self.start_process(
+                [SCRIPT_PATH, retval, "11", "22", "33"], [], exit_handler, None, single_flight=True
+            )
+
+    command = TestCommand()
 
-    assert os.path.exists(RESET_PATH)
+    data = get_data()
+    first_id = command.start("1")
+    assert command.start("1") == first_id
+    other_id = command.start("2")
+    assert other_id != first_id
+
+    while len(data) < 2:
+        data = get_data(data)
+    assert sorted(data) == sorted(["%s: exited 1" % first_id, "%s: exited 2" % other_id])
+
+    # finished command is not reused
+    assert command.start("1") != first_id
+
+
+def test_async_wait_for_change(async_infrastructure):
+    notify, AsyncCommand = async_infrastructure
+
+    class TestCommand(AsyncCommand):
+        def start(self):
+            def handler(matched, process_data):
+                process_data.append_data(matched.group(1))
+
+            return self.start_process(
+                [SCRIPT_PATH, "0", "11", "22", "33"], [(r"\w+ (\w+)", handler)], None, None
+            )
+
+    command = TestCommand()
+    process_data = command.get_process_data(command.start())
+    assert command.get_process_data("unknown") is None
+
+    assert process_data.wait_for_change(0, 5)
+    assert process_data.read_data(0) == (["11"], 1)
+
+    assert not process_data.wait_for_change(1, 0.1)
+
+    offset = 1
+    while not process_data.get_exited():
+        assert process_data.wait_for_change(offset, 5)
+        _, offset = process_data.read_data(offset)
+
+    assert process_data.read_data(1) == (["22", "33"], 3)
+    assert process_data.wait_for_change(3, 0)
+
+
+def test_async_no_preexec_in_threads(async_infrastructure, monkeypatch):
+    notify, AsyncCommand = async_infrastructure
+
+    import subprocess
+
+    popen_kwargs = []
+    original_popen = subprocess.Popen
+
+    def popen(*args, **kwargs):
+        popen_kwargs.append(kwargs)
+        return original_popen(*args, **kwargs)
+
+    monkeypatch.setattr(subprocess, "Popen", popen)
+
+    class TestCommand(AsyncCommand):
+        def start(self):
+            return self.start_process([SCRIPT_PATH, "0", "11"], [], None, None)
+
+    command = TestCommand()
+    process_data = command.get_process_data(command.start())
+    while not process_data.get_exited():
+        time.sleep(0.1)
+    assert process_data.get_retval() == 0
+
+    if AsyncCommand._use_threads():
+        # preexec_fn is not safe in a multithreaded controller
+        assert popen_kwargs[0].get("preexec_fn") is None
+        assert popen_kwargs[0]["start_new_session"]
+        assert popen_kwargs[0]["env"]["PYTHONUNBUFFERED"] == "1"
+
+
+def test_async_kill_children(async_infrastructure):
+    notify, AsyncCommand = async_infrastructure
+    if not AsyncCommand._use_threads():
+        pytest.skip("command is killed together with the worker process")
+
+    class TestCommand(AsyncCommand):
+        def start(self):
+            return self.start_process(["sh", "-c", "sleep 30 & wait"], [], None, None)
+
+    command = TestCommand()
+    process_data = command.get_process_data(command.start())
+    assert len(AsyncCommand._children) == 1
+
+    # e.g. when the controller exits
+    AsyncCommand.kill_children()
+    start = time.monotonic()
+    while not process_data.get_exited():
+        assert time.monotonic() - start < 5
+        time.sleep(0.1)
+    assert process_data.get_retval() == -9
+    assert len(AsyncCommand._children) == 0
@@ -0,0 +1,105 @@
+#
+# foris-controller
+# Copyright (C) 2026 CZ.NIC, z.s.p.o. (http://www.nic.cz/)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+#
+
+import pytest
+import threading
+import time
+
+from foris_controller.utils import cached
+
+
+class Cmds(object):
+    def __init__(self):
+        self.calls = []
+
+    @cached()
+    def forever(self, arg):
+        self.calls.append(arg)
+        return arg
+
+    @cached(ttl=0.2, final=lambda res: res == "final")
+    def expiring(self, res):
+        self.calls.append(res)
+        return res
+
+    @cached()
+    def slow(self):
+        self.calls.append("slow")
+        time.sleep(0.3)
+        return "slow"
+
+    @cached()
+    def failing(self):
+        self.calls.append("failing")
+        raise RuntimeError("failed")
+
+
+@pytest.fixture
+def cmds():
+    for func in (Cmds.forever, Cmds.expiring, Cmds.slow, Cmds.failing):
+        func.invalidate()
+    yield Cmds()
+
+
+def test_cached_forever(cmds):
+    assert cmds.forever(1) == 1
+    assert cmds.forever(1) == 1
+    assert cmds.forever(2) == 2
+    assert cmds.calls == [1, 2]
+
+    # self is not a part of the key
+    assert Cmds().forever(1) == 1
+    assert cmds.calls == [1, 2]
+
+    Cmds.forever.invalidate()
+    assert cmds.forever(1) == 1
+    assert cmds.calls == [1, 2, 1]
+
+
+def test_cached_ttl(cmds):
+    cmds.expiring("booted")
+    cmds.expiring("booted")
+    cmds.expiring("final")
+    assert cmds.calls == ["booted", "final"]
+
+    time.sleep(0.3)
+    cmds.expiring("booted")
+    cmds.expiring("final")
+    assert cmds.calls == ["booted", "final", "booted"]
+
+
+def test_cached_single_flight(cmds):
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cmds.slow())) for _ in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["slow"] * 10
+    assert cmds.calls == ["slow"]
+
+
+def test_cached_exception(cmds):
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            cmds.failing()
+    assert cmds.calls == ["failing", "failing"]
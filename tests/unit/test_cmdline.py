@@ -0,0 +1,206 @@
+#
+# foris-controller
+# Copyright (C) 2026 CZ.NIC, z.s.p.o. (http://www.nic.cz/)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+#
+
+import pytest
+import socket
+import threading
+import time
+
+
+@pytest.fixture(params=["direct", "launcher"], scope="function")
+def handle_command(request, lock_backend):
+    from foris_controller.app import app_info
+
+    app_info["lock_backend"] = lock_backend
+
+    from foris_controller.launcher import Launcher
+    from foris_controller_backends.cmdline import handle_command
+
+    if request.param == "launcher":
+        launcher = Launcher.start()
+        yield handle_command
+        assert Launcher.instance is launcher  # launcher was not disabled due to a failure
+        launcher.stop()
+    else:
+        yield handle_command
+
+
+def test_output(handle_command):
+    assert handle_command("sh", "-c", "echo out; echo err >&2; exit 3") == (3, b"out\n", b"err\n")
+    assert handle_command("sh", "-c", "kill -9 $$")[0] == -9
+
+
+def test_input(handle_command):
+    data = b"0123456789" * 100000
+    assert handle_command("cat", input_data=data) == (0, data, b"")
+    # command doesn't read the whole input
+    assert handle_command("head", "-c", "1", input_data=data) == (0, b"0", b"")
+
+
+def test_env(handle_command):
+    assert handle_command("sh", "-c", "echo $FC_TEST_VAR", env={"FC_TEST_VAR": "value"})[1] == (
+        b"value\n"
+    )
+    assert handle_command("sh", "-c", "echo $FC_TEST_VAR")[1] == b"\n"
+
+
+def test_env_changed(handle_command, monkeypatch):
+    monkeypatch.setenv("FC_TEST_VAR", "first")
+    assert handle_command("sh", "-c", "echo $FC_TEST_VAR")[1] == b"first\n"
+    # number of variables is not changed
+    monkeypatch.setenv("FC_TEST_VAR", "second")
+    assert handle_command("sh", "-c", "echo $FC_TEST_VAR")[1] == b"second\n"
+    monkeypatch.delenv("FC_TEST_VAR")
+    assert handle_command("sh", "-c", "echo $FC_TEST_VAR")[1] == b"\n"
+
+
+def test_background_process(handle_command):
+    # process which keeps stdout opened shouldn't block the command
+    start = time.monotonic()
+    assert handle_command("sh", "-c", "sleep 5 & echo started") == (0, b"started\n", b"")
+    assert time.monotonic() - start < 4
+
+
+def test_missing_command(handle_command):
+    with pytest.raises(FileNotFoundError):
+        handle_command("/non/existing/command")
+
+
+def test_launcher_fallback(lock_backend):
+    from foris_controller.app import app_info
+
+    app_info["lock_backend"] = lock_backend
+
+    from foris_controller.launcher import Launcher
+    from foris_controller_backends.cmdline import handle_command
+
+    launcher = Launcher.start()
+    launcher.process.kill()
+    launcher.process.wait()
+    assert handle_command("echo", "direct") == (0, b"direct\n", b"")
+    assert Launcher.instance is None
+
+
+def test_launcher_reply_lost(lock_backend, monkeypatch, tmp_path):
+    from foris_controller.app import app_info
+
+    app_info["lock_backend"] = lock_backend
+
+    from foris_controller import launcher as launcher_module
+    from foris_controller.launcher import Launcher, LauncherError
+    from foris_controller_backends.cmdline import handle_command
+
+    def recv_message(sock):
+        # wait till the command is finished and pretend that the connection was broken
+        sock.recv(1, socket.MSG_PEEK)
+        raise LauncherError("Connection closed")
+
+    monkeypatch.setattr(launcher_module, "_recv_message", recv_message)
+
+    launcher = Launcher.start()
+    try:
+        path = tmp_path / "executed"
+        with pytest.raises(OSError):
+            handle_command("sh", "-c", f"echo executed >> {path}")
+        # the command is not executed again
+        assert path.read_text() == "executed\n"
+        assert Launcher.instance is launcher
+    finally:
+        launcher.stop()
+
+
+def test_governor(lock_backend):
+    from foris_controller_backends.cmdline import CommandGovernor
+
+    governor = CommandGovernor(limit=1)
+    order = []
+
+    def run(priority, name):
+        governor.acquire(priority)
+        order.append(name)
+        governor.release()
+
+    governor.acquire(CommandGovernor.DEFAULT)
+    threads = []
+    for priority, name in [
+        (CommandGovernor.BACKGROUND, "restart"),
+        (CommandGovernor.DEFAULT, "set"),
+        (CommandGovernor.INTERACTIVE, "read1"),
+        (CommandGovernor.INTERACTIVE, "read2"),
+    ]:
+        thread = threading.Thread(target=run, args=(priority, name))
+        thread.start()
+        threads.append(thread)
+        while governor.stats()["queued"] < len(threads):
+            time.sleep(0.01)
+
+    stats = governor.stats()
+    assert stats["running"] == 1
+    assert stats["priorities"]["interactive"]["queued"] == 2
+
+    governor.release()
+    for thread in threads:
+        thread.join()
+
+    assert order == ["read1", "read2", "set", "restart"]
+    stats = governor.stats()
+    assert (stats["running"], stats["queued"]) == (0, 0)
+    assert stats["priorities"]["default"]["executed"] == 2
+    assert stats["priorities"]["background"]["wait_max"] > 0
+
+
+def test_governor_limit(handle_command):
+    from foris_controller_backends.cmdline import governor
+
+    limit = governor.limit
+    governor.limit = 2
+    try:
+        start = time.monotonic()
+        threads = [
+            threading.Thread(target=handle_command, args=("sleep", "0.3")) for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert time.monotonic() - start >= 0.6
+    finally:
+        governor.limit = limit
+
+
+def test_command_stats(handle_command):
+    from foris_controller_backends.cmdline import command_stats
+
+    command_stats.stats(reset=True)
+    for _ in range(3):
+        handle_command("sh", "-c", "echo out")
+    handle_command("sh", "-c", "exit 1")
+    with pytest.raises(OSError):
+        handle_command("/non/existing/command")
+
+    stats = {e["command"]: e for e in command_stats.stats()}
+    assert set(stats) == {"sh", "/non/existing/command"}
+    assert stats["sh"]["count"] == 4
+    assert stats["sh"]["failures"] == 1
+    assert stats["sh"]["stdout_bytes"] == 12
+    assert stats["sh"]["duration_p50"] <= stats["sh"]["duration_p99"] == stats["sh"]["duration_max"]
+    assert stats["/non/existing/command"]["failures"] == 1
+
+    assert len(command_stats.stats(reset=True)) == 2
+    assert command_stats.stats() == []
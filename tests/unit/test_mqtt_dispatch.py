@@ -0,0 +1,80 @@
+#
+# foris-controller
+# Copyright (C) 2026 CZ.NIC, z.s.p.o. (http://www.nic.cz/)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+#
+
+from foris_controller.buses.mqtt import Endpoint, TopicDispatcher
+
+PREFIX = "foris-controller/0000000000000001"
+
+
+def _dispatcher():
+    dispatcher = TopicDispatcher("0000000000000001")
+    dispatcher.add("list", Endpoint(lambda parsed: "modules"))
+    dispatcher.add("jsonschemas", Endpoint(lambda parsed: "schemas"))
+    dispatcher.add_module_endpoint("list", Endpoint(lambda parsed, module: f"actions {module}"))
+    dispatcher.set_action_endpoint(
+        Endpoint(lambda parsed, module, action: f"{module} {action}", in_worker=True)
+    )
+    return dispatcher
+
+
+def test_topics():
+    assert _dispatcher().topics() == [
+        f"{PREFIX}/list",
+        f"{PREFIX}/jsonschemas",
+        f"{PREFIX}/request/+/list",
+        f"{PREFIX}/request/+/action/+",
+    ]
+
+
+def test_resolve():
+    dispatcher = _dispatcher()
+
+    endpoint, args = dispatcher.resolve(f"{PREFIX}/list")
+    assert endpoint.respond({}, *args) == "modules"
+    assert not endpoint.in_worker
+
+    endpoint, args = dispatcher.resolve(f"{PREFIX}/jsonschemas")
+    assert endpoint.respond({}, *args) == "schemas"
+
+    endpoint, args = dispatcher.resolve(f"{PREFIX}/request/about/list")
+    assert args == ("about",)
+    assert endpoint.respond({}, *args) == "actions about"
+
+    endpoint, args = dispatcher.resolve(f"{PREFIX}/request/about/action/get")
+    assert args == ("about", "get")
+    assert endpoint.in_worker
+    assert endpoint.respond({}, *args) == "about get"
+
+
+def test_resolve_unknown():
+    dispatcher = _dispatcher()
+    for topic in [
+        "foris-controller/0000000000000002/list",
+        f"{PREFIX}/unknown",
+        f"{PREFIX}/list/extra",
+        f"{PREFIX}/request/about",
+        f"{PREFIX}/request//list",
+        f"{PREFIX}/request/about/unknown",
+        f"{PREFIX}/request/about/action",
+        f"{PREFIX}/request/about/action/",
+        f"{PREFIX}/request/about/other/get",
+        f"{PREFIX}/request/about/action/get/extra",
+        f"{PREFIX}/reply/1",
+    ]:
+        assert dispatcher.resolve(topic) == (None, ()), topic
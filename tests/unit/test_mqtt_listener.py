@@ -0,0 +1,90 @@
+#
+# foris-controller
+# Copyright (C) 2026 CZ.NIC, z.s.p.o. (http://www.nic.cz/)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+#
+
+import json
+
+import paho.mqtt.client as mqtt
+import pytest
+
+from foris_controller.app import app_info, prepare_app_modules
+from foris_controller.buses.mqtt import MqttListener
+from foris_controller.handler_base import BaseMockHandler
+
+CONTROLLER_ID = "0000000000000001"
+
+
+@pytest.fixture
+def listener_app_info(monkeypatch, lock_backend):
+    for key, value in {
+        "bus": "mqtt",
+        "lock_backend": lock_backend,
+        "backend": "mock",
+        "controller_id": CONTROLLER_ID,
+        "filter_modules": ["introspect"],
+        "extra_module_paths": [],
+        "mqtt_credentials": None,
+        "mqtt_workers": 2,
+        "mqtt_protocol": "3.1.1",
+    }.items():
+        monkeypatch.setitem(app_info, key, value)
+
+    # modules and the validator are prepared later
+    for key in ["modules", "validator"]:
+        monkeypatch.setitem(app_info, key, None)
+        del app_info[key]
+
+
+def test_listener_startup_order(mqtt_broker, listener_app_info):
+    # the same order as in foris_controller/controller/__main__.py
+    listener = MqttListener(*mqtt_broker.server_address)
+    try:
+        prepare_app_modules(BaseMockHandler)
+
+        endpoint, args = listener.dispatcher.resolve(f"foris-controller/{CONTROLLER_ID}/list")
+        modules = json.loads(endpoint.respond({}, *args))
+        assert [e["name"] for e in modules] == ["introspect"]
+        assert "list_modules" in modules[0]["actions"]
+
+        endpoint, args = listener.dispatcher.resolve(
+            f"foris-controller/{CONTROLLER_ID}/jsonschemas"
+        )
+        assert json.loads(endpoint.respond({}, *args))
+    finally:
+        listener.workers.shutdown()
+        listener.reply_publisher.disconnect()
+        listener.client.disconnect()
+
+
+@pytest.mark.parametrize("payload", [b"[]", b'["reply_msg_id"]', b"1", b'"reply_msg_id"', b"null"])
+def test_listener_payload_not_object(mqtt_broker, listener_app_info, monkeypatch, payload):
+    listener = MqttListener(*mqtt_broker.server_address)
+    try:
+        started = []
+        monkeypatch.setattr(listener, "start_message_worker", lambda *args: started.append(args))
+
+        topic = f"foris-controller/{CONTROLLER_ID}/request/introspect/action/list_modules"
+        msg = mqtt.MQTTMessage(topic=topic.encode())
+        msg.payload = payload
+        # the message is dropped instead of raising an exception in the client loop
+        listener.client.on_message(listener.client, None, msg)
+        assert started == []
+    finally:
+        listener.workers.shutdown()
+        listener.reply_publisher.disconnect()
+        listener.client.disconnect()
@@ -0,0 +1,106 @@
+#
+# foris-controller
+# Copyright (C) 2026 CZ.NIC, z.s.p.o. (http://www.nic.cz/)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+#
+
+import socket
+import time
+
+import pytest
+
+from foris_controller.buses.mqtt import MqttReplyPublisher, RetainClearer
+
+
+@pytest.fixture
+def publisher(mqtt_broker):
+    publisher = MqttReplyPublisher(*mqtt_broker.server_address, None)
+    yield publisher
+    publisher.disconnect()
+
+
+def test_publish(mqtt_broker, publisher):
+    for i in range(3):
+        publisher.publish(f"reply/{i}", "{}", qos=2, retain=True)
+    publisher.publish("reply/3", "{}", qos=0, retain=False)
+
+    assert mqtt_broker.topics == ["reply/0", "reply/1", "reply/2", "reply/3"]
+    # the connection is reused
+    assert mqtt_broker.connects == 1
+
+
+def test_publish_reconnect(mqtt_broker, publisher):
+    publisher.publish("reply/1", "{}", qos=2, retain=True)
+
+    # e.g. broker restart
+    mqtt_broker.drop_clients()
+    while publisher.connected.is_set():
+        time.sleep(0.05)
+
+    publisher.publish("reply/2", "{}", qos=2, retain=True)
+    assert mqtt_broker.topics == ["reply/1", "reply/2"]
+    assert mqtt_broker.connects == 2
+
+
+def test_publish_queued(mqtt_broker, publisher):
+    publisher.publish("reply/1", "{}", qos=1, retain=False)
+
+    mqtt_broker.drop_clients()
+    while publisher.connected.is_set():
+        time.sleep(0.05)
+    # disconnection was not noticed yet
+    publisher.connected.set()
+
+    # the message is queued in the client and it is sent only once after reconnect
+    publisher.publish("reply/2", "{}", qos=1, retain=False)
+    assert mqtt_broker.topics == ["reply/1", "reply/2"]
+
+
+def _unreachable_publisher():
+    # nothing is listening on the port
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        address = sock.getsockname()
+    return MqttReplyPublisher(*address, None)
+
+
+def test_publish_not_connected():
+    publisher = _unreachable_publisher()
+    try:
+        start = time.monotonic()
+        with pytest.raises(ConnectionError):
+            publisher.publish("reply/1", "{}", qos=2, retain=True, timeout=0.5)
+        assert 0.5 <= time.monotonic() - start < 2.0
+    finally:
+        publisher.disconnect()
+
+
+def test_flush_not_connected():
+    publisher = _unreachable_publisher()
+    try:
+        cleared = []
+        clearer = RetainClearer(publisher, 60, cleared.append)
+        for i in range(5):
+            clearer.schedule(f"reply/{i}", str(i))
+
+        # shutdown is not blocked when the broker is not available
+        start = time.monotonic()
+        clearer.flush(timeout=1.0)
+        assert time.monotonic() - start < 1.0
+        assert cleared == ["0", "1", "2", "3", "4"]
+        assert clearer.pending() == 0
+    finally:
+        publisher.disconnect()
@@ -0,0 +1,111 @@
+#
+# foris-controller
+# Copyright (C) 2026 CZ.NIC, z.s.p.o. (http://www.nic.cz/)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+#
+
+import hashlib
+import json
+import types
+
+from paho.mqtt.client import MQTTMessage
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+
+from foris_controller.buses.mqtt import (
+    ModuleRegistry,
+    SerializedReply,
+    reply_options,
+    response_target,
+)
+from foris_controller.module_base import BaseModule
+
+
+def _message(**properties):
+    msg = MQTTMessage(topic=b"foris-controller/0000000000000001/request/about/action/get")
+    if properties:
+        msg.properties = Properties(PacketTypes.PUBLISH)
+        for name, value in properties.items():
+            setattr(msg.properties, name, value)
+    return msg
+
+
+def test_response_target_mqtt311():
+    topic, properties = response_target(_message())
+    assert topic is None
+    assert properties is None
+    assert reply_options(properties) == {"qos": 0, "retain": True}
+
+
+def test_response_target_mqtt5():
+    topic, properties = response_target(
+        _message(ResponseTopic="client/replies", CorrelationData=b"\x01\x02")
+    )
+    assert topic == "client/replies"
+    assert properties.CorrelationData == b"\x01\x02"
+    assert reply_options(properties) == {"qos": 1, "retain": False, "properties": properties}
+
+    # correlation data is optional
+    topic, properties = response_target(_message(ResponseTopic="client/replies"))
+    assert topic == "client/replies"
+    assert not hasattr(properties, "CorrelationData")
+
+
+def test_response_target_mqtt5_without_response_topic():
+    # v5 requests without Response Topic use the retained reply as well
+    topic, properties = response_target(_message(CorrelationData=b"\x01"))
+    assert topic is None
+    assert properties is None
+
+
+def test_serialized_reply():
+    data = [{"name": "about", "actions": ["get"]}]
+    reply = SerializedReply(data)
+    content_hash = hashlib.sha256(json.dumps(data).encode()).hexdigest()
+    assert reply.hash == content_hash
+
+    # clients which don't send hash obtain only the data
+    assert json.loads(reply.reply({"reply_msg_id": "1"})) == data
+    assert json.loads(reply.reply({"reply_msg_id": "1", "hash": None})) == {
+        "hash": content_hash,
+        "data": data,
+    }
+    assert json.loads(reply.reply({"reply_msg_id": "1", "hash": "other"})) == {
+        "hash": content_hash,
+        "data": data,
+    }
+    assert json.loads(reply.reply({"reply_msg_id": "1", "hash": content_hash})) == {
+        "hash": content_hash,
+        "not_modified": True,
+    }
+
+
+def test_module_registry():
+    class SampleModule(BaseModule):
+        def action_get(self, data):
+            pass
+
+        def action_update(self, data):
+            pass
+
+    module = types.ModuleType("sample")
+    module.SampleModule = SampleModule
+    registry = ModuleRegistry([("sample", module)], [{"id": "sample"}])
+
+    assert json.loads(registry.modules.raw) == [{"name": "sample", "actions": ["get", "update"]}]
+    assert json.loads(registry.list_actions("sample").raw) == ["get", "update"]
+    assert json.loads(registry.list_actions("missing").raw) == []
+    assert json.loads(registry.schema.raw) == [{"id": "sample"}]
@@ -0,0 +1,103 @@
+#
+# foris-controller
+# Copyright (C) 2026 CZ.NIC, z.s.p.o. (http://www.nic.cz/)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+#
+
+import threading
+import time
+
+from foris_controller.buses.mqtt import RetainClearer, WorkerPool
+
+
+class FakePublisher:
+    def __init__(self):
+        self.published = []
+        self.connected = threading.Event()
+        self.connected.set()
+
+    def publish(self, topic, payload, qos=0, retain=False, timeout=None):
+        self.published.append((topic, payload, qos, retain))
+
+
+def test_worker_pool_bounded():
+    pool = WorkerPool(2)
+    release = threading.Event()
+    running = []
+    lock = threading.Lock()
+
+    def work():
+        with lock:
+            running.append(threading.current_thread().name)
+        release.wait()
+
+    for _ in range(5):
+        pool.submit(work)
+
+    time.sleep(0.2)
+    stats = pool.stats()
+    assert len(running) == 2
+    assert stats["size"] == 2
+    assert stats["busy"] == 2
+    assert stats["queued"] == 3
+    assert stats["queued_max"] >= 3
+    assert stats["submitted"] == 5
+
+    release.set()
+    pool.shutdown()
+    stats = pool.stats()
+    assert len(running) == 5
+    assert stats["busy"] == 0
+    assert stats["queued"] == 0
+    assert stats["completed"] == 5
+    assert stats["wait_max"] > 0.0
+
+
+def test_worker_pool_failure():
+    pool = WorkerPool(1)
+    done = []
+
+    def fail():
+        raise RuntimeError("failed")
+
+    pool.submit(fail)
+    pool.submit(lambda: done.append(True))
+    pool.shutdown()
+    assert done == [True]
+    assert pool.stats()["completed"] == 2
+
+
+def test_retain_clearer():
+    publisher = FakePublisher()
+    cleared = []
+    clearer = RetainClearer(publisher, 0.2, cleared.append)
+
+    clearer.schedule("reply/1", "1")
+    time.sleep(0.05)
+    clearer.schedule("reply/2", "2")
+    assert clearer.pending() == 2
+    assert cleared == []
+
+    time.sleep(0.4)
+    assert cleared == ["1", "2"]
+    assert publisher.published == [("reply/1", "", 2, True), ("reply/2", "", 2, True)]
+    assert clearer.pending() == 0
+
+    # pending retains are cleared on flush
+    clearer.schedule("reply/3", "3")
+    clearer.flush()
+    assert cleared == ["1", "2", "3"]
+    assert clearer.pending() == 0
@@ -31,7 +31,8 @@ def test_ubus_call_with_return_value(custom_cmdline_root, ubus_backend):
     data = ubus_backend.call_ubus(ubus_object="iwinfo", method="info", data={"device": "radio0"})
 
     assert isinstance(data, dict)
-    assert bool(data)  # we don't care about particular values, there just have to be something in dict
+    # we don't care about particular values, there just have to be something in dict
+    assert bool(data)
 
 
 def test_ubus_call_without_return_value(custom_cmdline_root, ubus_backend):
@@ -53,3 +54,90 @@ def test_ubus_call_nonexisting_object(custom_cmdline_root, ubus_backend):
     data = ubus_backend.call_ubus(ubus_object="nonsense", method="foomethod")
 
     assert data is None
+
+
+class FakeUbus:
+    """Minimal stand-in for python-ubus global connection"""
+
+    def __init__(self, fail_calls=0):
+        self.connected = False
+        self.connects = 0
+        self.fail_calls = fail_calls
+
+    def get_connected(self):
+        return self.connected
+
+    def connect(self, socket_path=None):
+        self.connected = True
+        self.connects += 1
+
+    def disconnect(self, deregister=True):
+        self.connected = False
+
+    def call(self, ubus_object, method, data):
+        if self.fail_calls:
+            self.fail_calls -= 1
+            raise RuntimeError("ubus error occurred: Connection failed")
+        if ubus_object == "nonsense":
+            raise RuntimeError("ubus error occurred: Not found")
+        if method == "reload":
+            return []
+        return [{"object": ubus_object, "method": method, "data": data}]
+
+
+@pytest.fixture
+def native_ubus(ubus_backend, monkeypatch):
+    from foris_controller_backends import ubus
+
+    fake = FakeUbus()
+    monkeypatch.setattr(ubus, "ubus", fake)
+    monkeypatch.setattr(ubus.UbusClient, "pid", None)
+    monkeypatch.delenv("FORIS_CMDLINE_ROOT", raising=False)
+    monkeypatch.delenv("FC_UBUS_NATIVE", raising=False)
+    yield fake
+
+
+def test_ubus_native_call(native_ubus, ubus_backend):
+    data = ubus_backend.call_ubus("iwinfo", "info", {"device": "radio0"})
+    assert data == {"object": "iwinfo", "method": "info", "data": {"device": "radio0"}}
+    assert ubus_backend.call_ubus("dummy_noreturn", "reload") == {}
+
+    # connection is reused
+    assert native_ubus.connects == 1
+
+
+def test_ubus_native_failures(native_ubus, ubus_backend):
+    # failed call doesn't close the connection
+    ubus_backend.call_ubus("iwinfo", "info")
+    assert ubus_backend.call_ubus("nonsense", "foomethod") is None
+    assert native_ubus.connects == 1
+    assert native_ubus.get_connected()
+
+    # broken connection is reopened
+    native_ubus.fail_calls = 1
+    data = ubus_backend.call_ubus("iwinfo", "info")
+    assert data == {"object": "iwinfo", "method": "info", "data": {}}
+    assert native_ubus.connects == 2
+
+    # only once
+    native_ubus.fail_calls = 2
+    assert ubus_backend.call_ubus("iwinfo", "info") is None
+    assert native_ubus.connects == 3
+    assert not native_ubus.get_connected()
+
+
+def test_ubus_native_fork(native_ubus, ubus_backend, monkeypatch):
+    from foris_controller_backends import ubus
+
+    ubus_backend.call_ubus("iwinfo", "info")
+    # pretend that we are in a forked child process
+    monkeypatch.setattr(ubus.UbusClient, "pid", os.getpid() + 1)
+    ubus_backend.call_ubus("iwinfo", "info")
+    assert native_ubus.connects == 2
+    assert ubus.UbusClient.pid == os.getpid()
+
+
+def test_ubus_native_disabled(native_ubus, ubus_backend, custom_cmdline_root):
+    # mocked ubus executable is used
+    assert ubus_backend.call_ubus("dummy_noreturn", "reload") == {}
+    assert native_ubus.connects == 0
@@ -23,10 +23,17 @@ import pytest
 import subprocess
 import re
 import os
+import threading
+import time
 
 from collections import OrderedDict
 
-from foris_controller.exceptions import UciException, UciTypeException, UciRecordNotFound
+from foris_controller.exceptions import (
+    UciException,
+    UciTypeException,
+    UciRecordNotFound,
+    UciUndeclaredConfig,
+)
 
 from foris_controller_testtools.utils import get_uci_module
 
@@ -508,3 +515,345 @@ def test_strange_chars_in_value(uci_configs_init, lock_backend):
     assert [e for e in SPECIAL_VALUES] == uci.get_option_named(
         data, "test1", "special_values", "my_list"
     )
+
+
+@pytest.mark.uci_config_path(CONFIG_PATH)
+def test_read_cache(uci_configs_init, lock_backend):
+    config_dir, _ = uci_configs_init
+    uci = get_uci_module(lock_backend)
+    backend_class = uci.UciBackend
+
+    with backend_class(config_dir) as backend:
+        data1 = backend.read("test2")
+
+    hits = backend_class.cache_stats()["hits"]
+    with backend_class(config_dir) as backend:
+        data2 = backend.read("test2")
+    assert data1 == data2
+    assert backend_class.cache_stats()["hits"] == hits + 1
+
+    # cached data can't be modified by the caller
+    uci.get_section(data2, "test2", "named1")["data"]["modified"] = "1"
+    with backend_class(config_dir) as backend:
+        data3 = backend.read("test2")
+    assert data1 == data3
+
+    # modification outside of the backend
+    with open(os.path.join(config_dir, "test2"), "a") as f:
+        f.write("\nconfig named 'external'\n\toption option1 'ext'\n")
+    with backend_class(config_dir) as backend:
+        data4 = backend.read("test2")
+    assert uci.get_option_named(data4, "test2", "external", "option1") == "ext"
+
+    # changes within transaction and commit
+    with backend_class(config_dir) as backend:
+        backend.set_option("test2", "named1", "option1", "pending")
+        data5 = backend.read("test2")
+    assert uci.get_option_named(data5, "test2", "named1", "option1") == "pending"
+    with backend_class(config_dir) as backend:
+        data6 = backend.read("test2")
+    assert uci.get_option_named(data6, "test2", "named1", "option1") == "pending"
+
+    # results of the native reader are cached separately
+    with backend_class(config_dir, native_read=False) as backend:
+        backend.read("test2")
+    hits = backend_class.cache_stats()["hits"]
+    with backend_class(config_dir, native_read=True) as backend:
+        data7 = backend.read("test2")
+    assert backend_class.cache_stats()["hits"] == hits
+    with backend_class(config_dir, native_read=True) as backend:
+        data8 = backend.read("test2")
+    assert backend_class.cache_stats()["hits"] == hits + 1
+    assert data6 == data7 == data8
+
+
+@pytest.mark.uci_config_path(CONFIG_PATH)
+def test_batched_changes(uci_configs_init, lock_backend):
+    config_dir, _ = uci_configs_init
+    uci = get_uci_module(lock_backend)
+    backend_class = uci.UciBackend
+
+    with backend_class(config_dir) as backend:
+        backend.set_option("test2", "named1", "option1", "first")
+        backend.replace_list("test2", "named1", "list1", ["a", "b", "c"])
+        backend.del_from_list("test2", "named1", "list1", ["b"])
+        with pytest.raises(UciException):
+            backend.set_option("test2", "named3", "option1", "non-existing")
+        # read-after-write
+        data = backend.read("test2")
+        assert uci.get_option_named(data, "test2", "named1", "option1") == "first"
+        assert uci.get_option_named(data, "test2", "named1", "list1") == ["a", "c"]
+
+        backend.set_option("test2", "named1", "option1", "second")
+        name = backend.add_section("test2", "anonymous")
+        backend.set_option("test2", name, "option1", "new")
+        backend.set_option("test2", "named1", "multiline", "line1\nline2")
+
+    assert "test2.named1.option1='second'" in show(config_dir)
+    assert "test2.named1.list1='a' 'c'" in show(config_dir)
+    assert "test2.@anonymous[2].option1='new'" in show(config_dir)
+    assert "test2.named3" not in show(config_dir)
+
+
+@pytest.mark.uci_config_path(CONFIG_PATH)
+def test_readonly(uci_configs_init, lock_backend):
+    config_dir, _ = uci_configs_init
+    uci = get_uci_module(lock_backend)
+    backend_class = uci.UciBackend
+
+    with backend_class(config_dir, readonly=True) as backend:
+        data = backend.read("test2")
+
+        with pytest.raises(UciException):
+            backend.set_option("test2", "named1", "option1", "readonly")
+        with pytest.raises(UciException):
+            backend.add_section("test2", "anonymous")
+        with pytest.raises(UciException):
+            backend.import_data("", "test2")
+
+    assert "test2.named1.option1='readonly'" not in show(config_dir)
+
+    # leftovers of terminated transactions are not visible
+    with pytest.raises(RuntimeError):
+        with backend_class(config_dir) as backend:
+            backend.set_option("test2", "named1", "option1", "terminated")
+            backend.read("test2")
+            raise RuntimeError()
+    with backend_class(config_dir, readonly=True) as backend:
+        assert backend.read("test2") == data
+
+
+@pytest.mark.uci_config_path(CONFIG_PATH)
+def test_config_locks(uci_configs_init, lock_backend):
+    config_dir, _ = uci_configs_init
+    uci = get_uci_module(lock_backend)
+    backend_class = uci.UciBackend
+    assert backend_class._lock_index("test1") < backend_class._lock_index("test2")
+
+    with backend_class(config_dir, configs=["test1"]) as outer:
+        outer.add_section("test1", "outer", "outer")
+        # transaction working with a different config is not blocked
+        with backend_class(config_dir, configs=["test2"]) as inner:
+            inner.set_option("test2", "named1", "option1", "inner")
+            assert inner.changes_dir != outer.changes_dir
+        assert "test2.named1.option1='inner'" in show(config_dir)
+        assert "test1.outer" not in show(config_dir)
+
+        # lock which follows the obtained ones is obtained on first use
+        outer.set_option("test2", "named1", "option1", "outer")
+
+    assert "test1.outer=outer" in show(config_dir)
+    assert "test2.named1.option1='outer'" in show(config_dir)
+    assert outer.changes_dir is None
+
+    # locking order can't be broken
+    with pytest.raises(UciUndeclaredConfig):
+        with backend_class(config_dir, configs=["test2"]) as backend:
+            backend.set_option("test2", "named1", "option1", "undeclared")
+            backend.add_section("test1", "undeclared", "undeclared")
+    assert "undeclared" not in show(config_dir)
+
+
+@pytest.mark.uci_config_path(CONFIG_PATH)
+def test_config_locks_writers(uci_configs_init, lock_backend):
+    config_dir, _ = uci_configs_init
+    uci = get_uci_module(lock_backend)
+    backend_class = uci.UciBackend
+
+    first_locked = threading.Event()
+    failures = []
+
+    def writer(name, configs, locked=None):
+        try:
+            with backend_class(config_dir, configs=configs) as backend:
+                if locked:
+                    locked.set()
+                    time.sleep(0.3)  # the other writers are waiting meanwhile
+                for config in configs or ["test1"]:
+                    backend.add_section(config, "writer", name)
+        except Exception as e:
+            failures.append(e)
+
+    threads = [
+        threading.Thread(target=writer, args=("first", ["test1", "test2"], first_locked)),
+        threading.Thread(target=writer, args=("second", ["test2", "test1"])),
+        threading.Thread(target=writer, args=("third", None)),
+    ]
+    threads[0].start()
+    first_locked.wait()
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # writers are serialized and all of them succeed
+    assert failures == []
+    data = show(config_dir)
+    for name in ["first", "second"]:
+        assert f"test1.{name}=writer" in data
+        assert f"test2.{name}=writer" in data
+    assert "test1.third=writer" in data
+
+
+def test_purge_changes_dirs(lock_backend, monkeypatch, tmp_path):
+    uci = get_uci_module(lock_backend)
+    changes_dir = str(tmp_path / "changes")
+    monkeypatch.setattr(uci.UciBackend, "CHANGES_DIR", changes_dir)
+
+    with uci.UciBackend(str(tmp_path), configs=[]) as backend:
+        assert os.path.basename(backend.changes_dir).startswith("%d-" % os.getpid())
+    assert os.listdir(changes_dir) == []
+
+    process = subprocess.Popen(["true"])
+    process.wait()
+    stale = ["%d-crashed" % process.pid, "tmpold"]
+    for name in stale + ["%d-running" % os.getpid()]:
+        os.makedirs(os.path.join(changes_dir, name, "test1"))
+
+    uci.UciBackend.purge_changes_dirs()
+    assert os.listdir(changes_dir) == ["%d-running" % os.getpid()]
+
+    # directory doesn't exist
+    monkeypatch.setattr(uci.UciBackend, "CHANGES_DIR", str(tmp_path / "missing"))
+    uci.UciBackend.purge_changes_dirs()
+
+
+def test_reload_scheduler(lock_backend):
+    uci = get_uci_module(lock_backend)
+    calls = []
+
+    scheduler = uci.ReloadScheduler(lambda: calls.append(time.monotonic()), window=0.2)
+    tickets = [scheduler.schedule() for _ in range(3)]
+    assert scheduler.stats()["pending"]
+    assert scheduler.wait(tickets[-1], timeout=5)
+    assert len(calls) == 1
+    assert scheduler.stats() == {
+        "requested": 3,
+        "coalesced": 2,
+        "executed": 1,
+        "pending": False,
+    }
+
+    # new window is opened
+    assert scheduler.wait(scheduler.schedule(), timeout=5)
+    assert len(calls) == 2
+
+    # synchronous mode
+    scheduler = uci.ReloadScheduler(lambda: calls.append(time.monotonic()), window=0)
+    scheduler.schedule()
+    assert len(calls) == 3
+
+
+@pytest.mark.uci_config_path(CONFIG_PATH)
+def test_noop_commit(uci_configs_init, lock_backend):
+    config_dir, _ = uci_configs_init
+    uci = get_uci_module(lock_backend)
+    backend_class = uci.UciBackend
+
+    with backend_class(config_dir) as backend:
+        data = backend.read("test2")
+        option1 = uci.get_option_anonymous(data, "test2", "anonymous", 1, "option1")
+        list2 = uci.get_option_anonymous(data, "test2", "anonymous", 1, "list2")
+
+    stats = backend_class.reload_stats()
+    with backend_class(config_dir) as backend:
+        # same values are written
+        backend.set_option("test2", "@anonymous[1]", "option1", option1)
+        backend.replace_list("test2", "@anonymous[1]", "list2", list2)
+        # set and removed back
+        backend.set_option("test2", "named1", "new_option", "value")
+        backend.del_option("test2", "named1", "new_option")
+    assert backend.changed_configs == set()
+    assert backend_class.reload_stats()["requested"] == stats["requested"]
+
+    with backend_class(config_dir) as backend:
+        backend.set_option("test2", "@anonymous[1]", "option1", option1)
+        backend.set_option("test2", "named1", "new_option", "value")
+    assert backend.changed_configs == {"test2"}
+    assert backend_class.reload_stats()["requested"] == stats["requested"] + 1
+    assert "test2.named1.new_option='value'" in show(config_dir)
+
+
+def test_indexed_config(lock_backend):
+    uci = get_uci_module(lock_backend)
+
+    def section(section_type, name):
+        return {"type": section_type, "name": name, "data": {"option": name}, "anonymous": False}
+
+    config = uci.UciConfig([section("a", "first"), section("b", "second"), section("a", "third")])
+    data = {"test": config}
+    assert config == [section("a", "first"), section("b", "second"), section("a", "third")]
+    assert uci.get_section(data, "test", "second") == section("b", "second")
+    assert uci.get_option_named(data, "test", "third", "option") == "third"
+    assert uci.get_sections_by_type(data, "test", "a") == [
+        section("a", "first"),
+        section("a", "third"),
+    ]
+    assert uci.get_option_anonymous(data, "test", "a", 1, "option") == "third"
+    assert not uci.section_exists(data, "test", "fourth")
+
+    # indexes are updated when the list is modified
+    config.append(section("b", "fourth"))
+    del config[0]
+    assert uci.section_exists(data, "test", "fourth")
+    assert not uci.section_exists(data, "test", "first")
+    assert [e["name"] for e in uci.get_sections_by_type(data, "test", "b")] == ["second", "fourth"]
+
+
+def test_parse_export(lock_backend):
+    uci = get_uci_module(lock_backend)
+    backend = uci.UciBackend("/nonexisting")
+
+    output = "\n".join(
+        [
+            "package first",
+            "",
+            "config type1 'cfg012345'",
+            "\toption simple 'value'",
+            "\toption quoted 'Mike'\\''s '\\'''\\''",
+            "\tlist items 'a'",
+            "\tlist items 'b c'",
+            "",
+            "config type2 'named'",
+            "",
+            "package second",
+            "",
+            "config type3 'other'",
+            "\toption multiline 'line1",
+            "line2'",
+        ]
+    )
+    assert backend._parse_packages(output.splitlines()) == {
+        "first": [
+            {
+                "type": "type1",
+                "name": "cfg012345",
+                "data": {"simple": "value", "quoted": "Mike's ''", "items": ["a", "b c"]},
+                "anonymous": True,
+            },
+            {"type": "type2", "name": "named", "data": {}, "anonymous": False},
+        ],
+        # multiline values are skipped
+        "second": [{"type": "type3", "name": "other", "data": {}, "anonymous": False}],
+    }
+
+
+@pytest.mark.uci_config_path(CONFIG_PATH)
+@pytest.mark.parametrize("native_read", [False, True])
+def test_read_many(uci_configs_init, lock_backend, native_read):
+    config_dir, _ = uci_configs_init
+    uci = get_uci_module(lock_backend)
+    backend_class = uci.UciBackend
+
+    with backend_class(config_dir, native_read=native_read) as backend:
+        backend.set_option("test2", "named1", "option1", "pending")
+        test1, test2, missing = backend.read_many(
+            ["test1", "test2", "missing"], optional=["missing"]
+        )
+        assert test1 == backend.read("test1")
+        assert test2 == backend.read("test2")
+        assert missing == {}
+        assert uci.get_option_named(test2, "test2", "named1", "option1") == "pending"
+
+        with pytest.raises(UciException):
+            backend.read_many(["test1", "missing"])
@@ -0,0 +1,160 @@
+#
+# foris-controller
+# Copyright (C) 2026 CZ.NIC, z.s.p.o. (http://www.nic.cz/)
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+#
+
+import os
+import pytest
+
+from foris_controller.exceptions import UciException
+
+from foris_controller_testtools.utils import get_uci_module
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "uci_configs")
+BLACKBOX_CONFIG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.realpath(__file__))),
+    "blackbox",
+    "uci_configs",
+    "defaults",
+)
+
+
+def native_export(uci_module, config, delta=""):
+    """ Parses the config and applies the delta without touching the filesystem """
+    package = uci_module.native.UciPackage("test")
+    package.parse(config, "test")
+    package.apply_delta(delta, "delta")
+    return {"test": package.export()}
+
+
+def parse_export(uci_module, output):
+    """ Parses the output of `uci export` which was recorded on the router """
+    return uci_module.UciBackend("/tmp")._parse_packages(output.splitlines())
+
+
+def read_both(backend, config=None):
+    """ Reads data using `uci export` as well as using the native parser """
+    backend.native_read = False
+    exported = backend.read(config)
+    backend.native_read = True
+    native = backend.read(config)
+    return exported, native
+
+
+def check_conformance(config_dir, backend_class):
+    with backend_class(config_dir) as backend:
+        exported, native = read_both(backend)
+        assert exported == native
+
+        for config in os.listdir(config_dir):
+            exported, native = read_both(backend, config)
+            assert exported == native
+
+
+@pytest.mark.uci_config_path(CONFIG_PATH)
+def test_native_read(uci_configs_init, lock_backend):
+    config_dir, _ = uci_configs_init
+    check_conformance(config_dir, get_uci_module(lock_backend).UciBackend)
+
+
+@pytest.mark.uci_config_path(BLACKBOX_CONFIG_PATH)
+def test_native_read_blackbox_defaults(uci_configs_init, lock_backend):
+    config_dir, _ = uci_configs_init
+    check_conformance(config_dir, get_uci_module(lock_backend).UciBackend)
+
+
+@pytest.mark.uci_config_path(CONFIG_PATH)
+def test_native_read_missing(uci_configs_init, lock_backend):
+    config_dir, _ = uci_configs_init
+    backend_class = get_uci_module(lock_backend).UciBackend
+
+    with backend_class(config_dir, native_read=True) as backend:
+        with pytest.raises(UciException):
+            backend.read("non-existing")
+
+
+@pytest.mark.uci_config_path(CONFIG_PATH)
+def test_native_read_pending_changes(uci_configs_init, lock_backend):
+    config_dir, _ = uci_configs_init
+    backend_class = get_uci_module(lock_backend).UciBackend
+
+    SPECIAL_VALUES = ["Mike's place", "Kick''is ''' pl ' howgh", "Dick\\''", '"quoted"']
+
+    with backend_class(config_dir) as backend:
+        backend.add_section("test1", "special_values", "special_values")
+        for idx, value in enumerate(SPECIAL_VALUES):
+            backend.set_option("test1", "special_values", "val_%d" % idx, value)
+        backend.replace_list("test1", "special_values", "my_list", SPECIAL_VALUES)
+
+        backend.set_option("test2", "@anonymous[1]", "option1", "changed")
+        backend.del_option("test2", "@anonymous[1]", "option2")
+        backend.del_from_list("test2", "named2", "list2", ["item 2", "item 4"])
+        backend.add_to_list("test2", "named2", "list1", ["new item"])
+        backend.del_section("test2", "@anonymous[0]")
+        name = backend.add_section("test2", "anonymous")
+        backend.set_option("test2", name, "new_option", "new value")
+        backend.set_option("test2", "named1", "option1", "string")
+        backend.add_to_list("test2", "named1", "option1", ["converted"])
+
+        exported, native = read_both(backend)
+        assert exported == native
+
+
+def test_native_del_list_not_list(lock_backend):
+    uci_module = get_uci_module(lock_backend)
+    config = """
+config section 'named'
+	option string 'value'
+	list items 'value'
+"""
+    # `uci del_list` on a plain option is ignored by libuci
+    delta = "~test.named.string='value'\n~test.named.items='value'\n"
+    expected = parse_export(uci_module, """package test
+
+config section 'named'
+	option string 'value'
+
+""")
+    assert native_export(uci_module, config, delta) == expected
+    assert expected["test"][0]["data"] == {"string": "value"}
+
+
+def test_native_empty_list_items(lock_backend):
+    uci_module = get_uci_module(lock_backend)
+    config = """
+config section 'named'
+	list items ''
+	list items 'item'
+	list empty ''
+"""
+    delta = "|test.named.items=''\n|test.named.added=''\n"
+    expected = parse_export(uci_module, """package test
+
+config section 'named'
+	list items ''
+	list items 'item'
+	list items ''
+	list empty ''
+	list added ''
+
+""")
+    assert native_export(uci_module, config, delta) == expected
+    assert expected["test"][0]["data"] == {
+        "items": ["", "item", ""],
+        "empty": [""],
+        "added": [""],
+    }